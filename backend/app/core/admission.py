@@ -0,0 +1,218 @@
+"""
+Admission control for embedding-heavy requests
+
+Every search and write embeds text on the worker's CPU, so under a burst
+requests queue on the model and latency grows until clients time out.
+AdmissionController admits a bounded number of requests at a time and
+lets a bounded number more wait; anything beyond that is refused at once
+with Overloaded, which the API turns into 503 with Retry-After.
+
+Waiters are served by priority, then arrival order: searches before
+interactive writes before bulk ingestion. When the wait queue is full, a
+new request may take the place of a lower-priority waiter, which is then
+refused instead. Ingestion workers wait without a bound (their own queue
+already bounds them) and never take part in shedding; they simply yield
+to interactive requests.
+
+Only the embedding itself holds a slot. A request declares its priority
+with admission_scope; DocumentStore takes a slot from that controller
+around each model call (embedding_slot), so database and graph work before
+and after the embedding never counts against the limit.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from app.core.metrics import (
+    ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, ADMISSION_WAIT_SECONDS,
+)
+
+# Lower value is served first
+PRIORITIES = {"search": 0, "write": 1, "ingest": 2}
+
+_scope: ContextVar[Optional[Tuple["AdmissionController", str, bool]]] = ContextVar("admission_scope", default=None)
+
+
+class Overloaded(Exception):
+    """Raised when a request is refused admission"""
+
+    def __init__(self, message: str, retry_after_s: int):
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+class _Waiter:
+    """A request waiting for a slot"""
+
+    __slots__ = ("rank", "seq", "priority", "bounded", "future")
+
+    def __init__(self, priority: str, seq: int, bounded: bool, future: asyncio.Future):
+        self.rank = PRIORITIES[priority]
+        self.seq = seq
+        self.priority = priority
+        self.bounded = bounded
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+
+class AdmissionController:
+    """Bounded in-flight requests with a bounded, prioritised wait queue"""
+
+    def __init__(self, name: str, max_in_flight: int = 4, max_queued: int = 32, retry_after_s: int = 1):
+        """
+        Args:
+            name: Controller name used in metrics
+            max_in_flight: Requests running at once; 0 disables admission control
+            max_queued: Requests that may wait for a slot (ingestion workers not counted)
+            retry_after_s: Retry-After suggested to refused clients
+        """
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.retry_after_s = retry_after_s
+        self.in_flight = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    @property
+    def queued(self) -> int:
+        """Waiters counted against max_queued"""
+        return sum(1 for waiter in self._waiters if waiter.bounded)
+
+    def stats(self) -> dict:
+        """In-flight and waiting requests by priority"""
+        waiting = {priority: 0 for priority in PRIORITIES}
+        for waiter in self._waiters:
+            waiting[waiter.priority] += 1
+        return {"name": self.name, "in_flight": self.in_flight, "max_in_flight": self.max_in_flight,
+                "max_queued": self.max_queued, "waiting": waiting}
+
+    @asynccontextmanager
+    async def admit(self, priority: str = "search", bounded: bool = True) -> AsyncIterator[None]:
+        """
+        Hold a slot for the enclosed block
+
+        Args:
+            priority: "search", "write" or "ingest"
+            bounded: Whether the wait counts against max_queued and may be
+                refused; ingestion workers pass False and just wait
+
+        Raises:
+            Overloaded: The wait queue is full, or this request was shed
+                for a higher-priority one
+        """
+        if not self.enabled:
+            yield
+            return
+        await self._acquire(priority, bounded)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: str, bounded: bool) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self._set_in_flight(self.in_flight + 1)
+            return
+        if bounded and self.queued >= self.max_queued:
+            self._make_room(priority)
+
+        waiter = _Waiter(priority, next(self._seq), bounded, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, waiter)
+        self._update_depth()
+        started = time.perf_counter()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed over just as the request went away
+                self._release()
+            else:
+                self._remove(waiter)
+            raise
+        finally:
+            ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, controller=self.name, priority=priority)
+
+    def _make_room(self, priority: str) -> None:
+        """Shed the lowest-priority bounded waiter for a more urgent request, or refuse the request"""
+        victim: Optional[_Waiter] = max((w for w in self._waiters if w.bounded), default=None)
+        if victim is None or victim.rank <= PRIORITIES[priority]:
+            ADMISSION_REJECTIONS.inc(controller=self.name, priority=priority, reason="queue_full")
+            raise Overloaded(f"Too many requests waiting ({self.queued})", self.retry_after_s)
+        self._remove(victim)
+        ADMISSION_REJECTIONS.inc(controller=self.name, priority=victim.priority, reason="shed")
+        victim.future.set_exception(Overloaded("Shed for a higher-priority request", self.retry_after_s))
+
+    def _release(self) -> None:
+        """Hand the slot to the best waiter, or free it"""
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+                self._update_depth()
+                return
+        self._update_depth()
+        self._set_in_flight(self.in_flight - 1)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+            self._update_depth()
+
+    def _set_in_flight(self, value: int) -> None:
+        self.in_flight = value
+        ADMISSION_IN_FLIGHT.set(value, controller=self.name)
+
+    def _update_depth(self) -> None:
+        for priority, count in self.stats()["waiting"].items():
+            ADMISSION_QUEUE_DEPTH.set(count, controller=self.name, priority=priority)
+
+
+@contextmanager
+def admission_scope(controller: AdmissionController, priority: str, bounded: bool = True) -> Iterator[None]:
+    """
+    Admit the embeddings computed in the enclosed block through a controller
+
+    The scope follows the request's task and any tasks it starts (a
+    contextvar), so it also covers embeddings run by the store layers.
+
+    Args:
+        controller: Controller whose slots the embeddings take
+        priority: "search", "write" or "ingest"
+        bounded: See AdmissionController.admit
+    """
+    token = _scope.set((controller, priority, bounded))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+@asynccontextmanager
+async def embedding_slot() -> AsyncIterator[None]:
+    """
+    Hold a slot of the current admission scope around an embedding
+
+    Does nothing outside admission_scope (jobs, scripts, reads by ID).
+
+    Raises:
+        Overloaded: As AdmissionController.admit
+    """
+    scope = _scope.get()
+    if scope is None:
+        yield
+        return
+    controller, priority, bounded = scope
+    async with controller.admit(priority, bounded):
+        yield
@@ -0,0 +1,331 @@
+"""
+Result caches with generation-based invalidation
+
+Cached values are stored under keys that embed a generation number. Writes
+bump the generation of the scopes they touch (e.g. a document category), so
+readers immediately start using new keys and entries computed from older
+data are never served again; they simply age out through the TTL and the
+size bound. A result computed while a write is in flight is stored under
+the generation read before the query, so it cannot mask that write.
+
+Two backends are available:
+
+- ``memory``: per-process LRU with TTL. Generations are per process, so with
+  several workers a write on one worker is only seen by the others' caches
+  once their entries expire.
+- ``redis``: shared by all workers (requires the ``redis`` package, listed in
+  requirements.txt; startup fails with a clear error without it).
+  Generations are Redis counters; the size bound is Redis' own maxmemory
+  eviction policy.
+
+TaggedCache is a simpler in-process LRU for values that depend on several
+objects at once (a neighbour list depends on every neighbour's node): each
+entry carries tags, and invalidating a tag drops every entry holding it.
+"""
+import hashlib
+import json
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import CACHE_BYTES, CACHE_ENTRIES, CACHE_EVICTIONS, CACHE_REQUESTS
+
+logger = get_logger(__name__)
+
+
+def vector_hash(vector: Sequence[float]) -> str:
+    """Stable short hash of an embedding (as float32 bytes)"""
+    return hashlib.blake2b(np.asarray(vector, dtype=np.float32).tobytes(), digest_size=16).hexdigest()
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU cache with per-entry expiry and local generation counters
+
+    Values are stored and returned by reference; callers must copy anything
+    they intend to mutate.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl_s: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def generations(self, scopes: List[str]) -> List[int]:
+        return [self._generations.get(scope, 0) for scope in scopes]
+
+    async def bump(self, scopes: Iterable[str]) -> None:
+        for scope in scopes:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache shared by all workers through Redis"""
+
+    def __init__(self, url: str, prefix: str = "cache:", client=None):
+        """
+        Args:
+            url: Redis URL (CACHE_REDIS_URL)
+            prefix: Prefix of every key this cache writes
+            client: redis.asyncio client to use instead of connecting to url
+
+        Raises:
+            RuntimeError: The redis package is not installed
+        """
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis requires the redis package (pip install redis)") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def __len__(self) -> int:
+        # Entry count is not tracked locally; see Redis' own keyspace metrics
+        return 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl_s: float) -> None:
+        await self.client.set(self.prefix + key, json.dumps(value), px=int(ttl_s * 1000))
+
+    async def generations(self, scopes: List[str]) -> List[int]:
+        values = await self.client.mget([f"{self.prefix}gen:{scope}" for scope in scopes])
+        return [int(value) if value is not None else 0 for value in values]
+
+    async def bump(self, scopes: Iterable[str]) -> None:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for scope in scopes:
+                pipe.incr(f"{self.prefix}gen:{scope}")
+            await pipe.execute()
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            if not key.decode().startswith(f"{self.prefix}gen:"):
+                await self.client.delete(key)
+
+
+def create_cache_backend(backend: str, max_entries: int):
+    """
+    Create a cache backend
+
+    Args:
+        backend: "memory" or "redis"
+        max_entries: Size bound for the memory backend
+
+    Returns:
+        Cache backend, or None when caching is disabled ("none")
+    """
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryCacheBackend(max_entries)
+    if backend == "redis":
+        return RedisCacheBackend(settings.cache_redis_url)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+class GenerationalCache:
+    """Named cache whose entries are invalidated by bumping scope generations"""
+
+    def __init__(self, name: str, backend, ttl_s: float):
+        """
+        Args:
+            name: Cache name used in keys and metrics
+            backend: MemoryCacheBackend or RedisCacheBackend
+            ttl_s: Entry lifetime in seconds
+        """
+        self.name = name
+        self.backend = backend
+        self.ttl_s = ttl_s
+
+    async def key(self, scope: str, *parts: Any) -> str:
+        """Build a cache key bound to the scope's current generation"""
+        (generation,) = await self.backend.generations([f"{self.name}:{scope}"])
+        return ":".join([self.name, scope, str(generation), *map(str, parts)])
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.backend.get(key)
+        CACHE_REQUESTS.inc(cache=self.name, result="miss" if value is None else "hit")
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.backend.set(key, value, self.ttl_s)
+        CACHE_ENTRIES.set(len(self.backend), cache=self.name)
+
+    async def invalidate(self, scopes: Iterable[str]) -> None:
+        """Bump the generation of each scope so its cached entries stop matching"""
+        await self.backend.bump([f"{self.name}:{scope}" for scope in scopes])
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+        CACHE_ENTRIES.set(len(self.backend), cache=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counts and hit rate since start (this process)"""
+        hits = CACHE_REQUESTS.value(cache=self.name, result="hit")
+        misses = CACHE_REQUESTS.value(cache=self.name, result="miss")
+        total = hits + misses
+        return {
+            "cache": self.name,
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": int(hits),
+            "misses": int(misses),
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+
+def approximate_size(value: Any) -> int:
+    """Approximate memory held by a value, following dicts, lists and tuples"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(approximate_size(item) for item in value)
+    return size
+
+
+class TaggedCache:
+    """
+    In-process LRU with TTL whose entries are dropped by tag
+
+    Values are stored and returned by reference; callers must copy anything
+    they intend to mutate. A value computed while an invalidation happened is
+    not stored: callers take epoch before reading the backend and pass it to
+    set(), which ignores the value if any invalidation ran since.
+    """
+
+    def __init__(self, name: str, max_entries: int = 10000, ttl_s: float = 60.0):
+        """
+        Args:
+            name: Cache name used in metrics
+            max_entries: Size bound; least recently used entries are evicted first
+            ttl_s: Entry lifetime in seconds
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.epoch = 0
+        # key -> (expires_at, value, tags, size)
+        self._entries: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...], int]]" = OrderedDict()
+        self._tagged: Dict[str, set] = {}
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            self._drop(key, "expired")
+            entry = None
+        CACHE_REQUESTS.inc(cache=self.name, result="miss" if entry is None else "hit")
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: Any, tags: Sequence[str], epoch: int) -> None:
+        """
+        Store a value unless an invalidation ran since epoch was read
+
+        Args:
+            key: Cache key
+            value: Value to store
+            tags: Tags whose invalidation must drop this entry
+            epoch: self.epoch read before the value was computed
+        """
+        if epoch != self.epoch:
+            return
+        if key in self._entries:
+            self._drop(key, None)
+        size = approximate_size(value)
+        self._entries[key] = (time.monotonic() + self.ttl_s, value, tuple(tags), size)
+        self._bytes += size
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)), "size")
+        self._report()
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """Drop every entry carrying any of the tags"""
+        self.epoch += 1
+        for tag in tags:
+            for key in list(self._tagged.get(tag, ())):
+                self._drop(key, "invalidated")
+        self._report()
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._entries.clear()
+        self._tagged.clear()
+        self._bytes = 0
+        self._report()
+
+    def _drop(self, key: str, reason: Optional[str]) -> None:
+        _, _, tags, size = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+        if reason is not None:
+            CACHE_EVICTIONS.inc(cache=self.name, reason=reason)
+
+    def _report(self) -> None:
+        CACHE_ENTRIES.set(len(self._entries), cache=self.name)
+        CACHE_BYTES.set(self._bytes, cache=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counts, hit rate and approximate size since start (this process)"""
+        hits = CACHE_REQUESTS.value(cache=self.name, result="hit")
+        misses = CACHE_REQUESTS.value(cache=self.name, result="miss")
+        total = hits + misses
+        return {
+            "cache": self.name,
+            "backend": type(self).__name__,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": int(hits),
+            "misses": int(misses),
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "evictions": {
+                reason: int(CACHE_EVICTIONS.value(cache=self.name, reason=reason))
+                for reason in ("size", "expired", "invalidated")
+            },
+        }
@@ -0,0 +1,40 @@
+"""
+Content-addressed chunking for incremental re-embedding
+
+A document is split at paragraph breaks, and paragraphs longer than
+max_chars are split further at sentence ends. Chunk boundaries depend only
+on the text around them, so an amendment changes the hashes of the chunks
+it touches and leaves the others, and their stored embeddings, reusable.
+"""
+import hashlib
+import re
+from typing import List
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE = re.compile(r"[^.]*(?:\.|$)")
+
+
+def split_chunks(text: str, max_chars: int = 1500) -> List[str]:
+    """Paragraph chunks, long paragraphs packed sentence by sentence up to max_chars"""
+    chunks: List[str] = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            chunks.append(paragraph)
+            continue
+        current = ""
+        for sentence in _SENTENCE.findall(paragraph):
+            if current and len(current) + len(sentence) > max_chars:
+                chunks.append(current.strip())
+                current = ""
+            current += sentence
+        if current.strip():
+            chunks.append(current.strip())
+    return chunks
+
+
+def chunk_hash(chunk: str) -> str:
+    """Stable identity of a chunk's text"""
+    return hashlib.blake2b(chunk.encode(), digest_size=16).hexdigest()
@@ -0,0 +1,186 @@
+"""
+Application configuration loaded from environment variables
+"""
+import os
+from typing import Dict
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float environment variable, falling back to default"""
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an int environment variable, falling back to default"""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    """Read a boolean environment variable ("1", "true", "yes" are true)"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_rates(name: str) -> Dict[str, float]:
+    """
+    Parse a "prefix=rate,prefix=rate" environment variable
+
+    Args:
+        name: Environment variable name
+
+    Returns:
+        Mapping of route prefix to sampling rate (0.0-1.0)
+    """
+    rates = {}
+    for item in os.getenv(name, "").split(","):
+        if "=" not in item:
+            continue
+        prefix, rate = item.split("=", 1)
+        try:
+            rates[prefix.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+def _env_shard_regions(name: str) -> Dict[str, int]:
+    """
+    Parse a "region=shard,region=shard" environment variable
+
+    Args:
+        name: Environment variable name
+
+    Returns:
+        Mapping of document region to shard index
+    """
+    regions: Dict[str, int] = {}
+    for item in os.getenv(name, "").split(","):
+        if "=" not in item:
+            continue
+        region, shard = item.split("=", 1)
+        try:
+            regions[region.strip()] = int(shard)
+        except ValueError:
+            continue
+    return regions
+
+
+class Settings:
+    """Runtime settings; every value can be overridden by an environment variable"""
+
+    def __init__(self):
+        # Logging
+        self.log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.log_format = os.getenv("LOG_FORMAT", "json")
+        self.log_max_field_length = _env_int("LOG_MAX_FIELD_LENGTH", 200)
+        self.log_sample_rates = _env_rates("LOG_SAMPLE_RATES")
+
+        # Tracing
+        self.trace_exporter = os.getenv("TRACE_EXPORTER", "none")
+        self.trace_file = os.getenv("TRACE_FILE", "traces/traces.jsonl")
+        self.trace_sample_rate = _env_float("TRACE_SAMPLE_RATE", 0.1)
+
+        # Slow-query log
+        self.slow_query_ms = _env_float("SLOW_QUERY_MS", 200.0)
+        self.slow_query_explain_sample_rate = _env_float("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 1.0)
+        self.slow_query_log_size = _env_int("SLOW_QUERY_LOG_SIZE", 100)
+
+        # On-demand request profiling
+        self.profiling_enabled = _env_bool("PROFILING_ENABLED")
+        self.profile_dir = os.getenv("PROFILE_DIR", "profiles")
+        self.profile_sample_interval_ms = _env_float("PROFILE_SAMPLE_INTERVAL_MS", 1.0)
+
+        # Storage backends ("postgres", "lancedb" or "memory"; "neo4j" or "memory")
+        self.vector_backend = os.getenv("VECTOR_BACKEND", "postgres").lower()
+        self.graph_backend = os.getenv("GRAPH_BACKEND", "neo4j").lower()
+
+        # Compact candidate search ("none", "halfvec" or "binary") with exact rerank
+        self.vector_quantization = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+        self.quantization_rerank_factor = _env_int("QUANTIZATION_RERANK_FACTOR", 10)
+
+        # Coarse-to-fine search on a PCA-reduced vector column (0 disables it)
+        self.reduced_dimensions = _env_int("REDUCED_DIMENSIONS", 0)
+        self.reduced_projection_path = os.getenv("REDUCED_PROJECTION_PATH", "data/projection.npz")
+
+        # LanceDB document store
+        self.lancedb_uri = os.getenv("LANCEDB_URI", "data/lancedb")
+        self.lancedb_table = os.getenv("LANCEDB_TABLE", "documents")
+        self.lancedb_index_min_rows = _env_int("LANCEDB_INDEX_MIN_ROWS", 10000)
+        self.lancedb_nprobes = _env_int("LANCEDB_NPROBES", 20)
+        self.lancedb_refine_factor = _env_int("LANCEDB_REFINE_FACTOR", 5)
+        self.lancedb_optimize_every = _env_int("LANCEDB_OPTIMIZE_EVERY", 1000)
+
+        # Postgres read replicas (comma-separated URIs; empty sends every read to POSTGRES_URI)
+        self.postgres_replica_uris = [
+            uri.strip() for uri in os.getenv("POSTGRES_REPLICA_URIS", "").split(",") if uri.strip()
+        ]
+        self.replica_max_lag_s = _env_float("REPLICA_MAX_LAG_S", 10.0)
+        self.replica_check_interval_s = _env_float("REPLICA_CHECK_INTERVAL_S", 5.0)
+
+        # Sharded document storage (comma-separated URIs; empty keeps one POSTGRES_URI database)
+        self.postgres_shard_uris = [
+            uri.strip() for uri in os.getenv("POSTGRES_SHARD_URIS", "").split(",") if uri.strip()
+        ]
+        self.shard_strategy = os.getenv("SHARD_STRATEGY", "hash").lower()
+        self.shard_regions = _env_shard_regions("SHARD_REGIONS")
+        # Shard count before shards were last added, while documents wait to be rebalanced (0: none)
+        self.shard_previous_count = _env_int("SHARD_PREVIOUS_COUNT", 0)
+
+        # Result caches ("none", "memory" or "redis")
+        self.cache_backend = os.getenv("CACHE_BACKEND", "memory").lower()
+        self.cache_redis_url = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+        self.search_cache_max_entries = _env_int("SEARCH_CACHE_MAX_ENTRIES", 10000)
+        self.search_cache_ttl_s = _env_float("SEARCH_CACHE_TTL_S", 300.0)
+
+        # In-process cache of graph nodes and 1-hop neighbourhoods (0 entries disables it)
+        self.graph_cache_max_entries = _env_int("GRAPH_CACHE_MAX_ENTRIES", 10000)
+        self.graph_cache_ttl_s = _env_float("GRAPH_CACHE_TTL_S", 60.0)
+
+        # Asynchronous ingestion (POST /documents/?async=true, POST /documents/bulk)
+        self.ingest_concurrency = _env_int("INGEST_CONCURRENCY", 4)
+        self.ingest_queue_size = _env_int("INGEST_QUEUE_SIZE", 10000)
+        self.ingest_max_attempts = _env_int("INGEST_MAX_ATTEMPTS", 3)
+        self.ingest_retry_backoff_s = _env_float("INGEST_RETRY_BACKOFF_S", 1.0)
+        self.ingest_job_history = _env_int("INGEST_JOB_HISTORY", 1000)
+
+        # Shared embedding sidecar (python -m app.core.embedding_service); empty encodes in process
+        self.embedding_socket = os.getenv("EMBEDDING_SOCKET", "")
+        self.embedding_socket_timeout_s = _env_float("EMBEDDING_SOCKET_TIMEOUT_S", 30.0)
+        self.embedding_batch_max = _env_int("EMBEDDING_BATCH_MAX", 64)
+        self.embedding_batch_wait_ms = _env_float("EMBEDDING_BATCH_WAIT_MS", 2.0)
+
+        # Admission control for embedding-heavy endpoints (0 in flight disables it)
+        self.admission_max_in_flight = _env_int("ADMISSION_MAX_IN_FLIGHT", 4)
+        self.admission_queue_size = _env_int("ADMISSION_QUEUE_SIZE", 32)
+        self.admission_retry_after_s = _env_int("ADMISSION_RETRY_AFTER_S", 1)
+
+        # Share one in-flight call between identical concurrent reads
+        self.single_flight_enabled = _env_bool("SINGLE_FLIGHT_ENABLED", True)
+
+        # kNN graph job proposing RELATED_TO edges
+        self.knn_k = _env_int("KNN_K", 10)
+        self.knn_min_similarity = _env_float("KNN_MIN_SIMILARITY", 0.5)
+        self.knn_block_size = _env_int("KNN_BLOCK_SIZE", 1024)
+        self.knn_state_path = os.getenv("KNN_STATE_PATH", "data/knn_state.json")
+
+        # Near-duplicate detection (MinHash signatures with an LSH index)
+        self.dedup_enabled = _env_bool("DEDUP_ENABLED", True)
+        self.dedup_num_perm = _env_int("DEDUP_NUM_PERM", 128)
+        self.dedup_bands = _env_int("DEDUP_BANDS", 16)
+        self.dedup_duplicate_threshold = _env_float("DEDUP_DUPLICATE_THRESHOLD", 0.95)
+        self.dedup_version_threshold = _env_float("DEDUP_VERSION_THRESHOLD", 0.8)
+
+        # Version history and chunk-level re-embedding
+        self.versioning_enabled = _env_bool("VERSIONING_ENABLED", False)
+        self.version_chunk_chars = _env_int("VERSION_CHUNK_CHARS", 1500)
+
+
+settings = Settings()
@@ -0,0 +1,43 @@
+"""
+Read-your-writes routing hints for replicated document stores
+
+Reads normally go to a read replica, which may lag the primary. A request
+that has written, or that sent an X-Read-Your-Writes header (for example a
+client reading back what it wrote in an earlier request), reads from the
+primary for the rest of the request. The hint lives in a contextvar, so it
+follows the request's task and any tasks it starts.
+"""
+from contextvars import ContextVar
+
+READ_YOUR_WRITES_HEADER = b"x-read-your-writes"
+
+_primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+
+
+def require_primary_reads() -> None:
+    """Send the current request's remaining reads to the primary"""
+    if not _primary_reads.get():
+        _primary_reads.set(True)
+
+
+def primary_reads_required() -> bool:
+    """Whether reads in the current context must see its writes"""
+    return _primary_reads.get()
+
+
+class ConsistencyMiddleware:
+    """ASGI middleware scoping the read-your-writes hint to one request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = dict(scope["headers"]).get(READ_YOUR_WRITES_HEADER, b"").lower()
+        token = _primary_reads.set(header in (b"1", b"true", b"yes"))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _primary_reads.reset(token)
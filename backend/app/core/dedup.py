@@ -0,0 +1,197 @@
+"""
+Near-duplicate detection with MinHash signatures and LSH banding
+
+Text is normalised (lowercase, punctuation and whitespace collapsed) and
+split into overlapping word shingles, so copies of the same act that differ
+only in formatting get identical shingle sets. A MinHash signature of
+num_perm 32-bit values estimates the Jaccard similarity of two shingle sets
+as the fraction of equal positions. For sub-linear lookup the signature is
+cut into bands; documents sharing any band bucket are candidates, and only
+candidates are compared. With rows = num_perm / bands, a pair of similarity
+s becomes a candidate with probability 1 - (1 - s^rows)^bands (about 0.95
+at s = 0.8 for 16 bands of 8 rows).
+
+A match at or above the duplicate threshold is linked as DUPLICATE_OF, a
+weaker match above the version threshold as SUPERSEDES (the newer document
+supersedes the older one).
+"""
+import hashlib
+import logging
+import re
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import get_logger, log_event
+from app.core.metrics import DUPLICATE_MATCHES
+
+logger = get_logger(__name__)
+
+DUPLICATE_OF = "DUPLICATE_OF"
+SUPERSEDES = "SUPERSEDES"
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_words(text: str) -> List[str]:
+    """Lowercased words with punctuation and formatting removed"""
+    return _NON_WORD.sub(" ", text.lower()).split()
+
+
+def shingle_hashes(text: str, size: int = 3) -> np.ndarray:
+    """Stable 32-bit hashes of the distinct word shingles of a text"""
+    words = normalize_words(text)
+    if len(words) < size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    """MinHash signatures and LSH band buckets"""
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, shingle_size: int = 3, seed: int = 1):
+        """
+        Args:
+            num_perm: Signature length
+            bands: LSH bands (must divide num_perm)
+            shingle_size: Words per shingle
+            seed: Seed of the hash permutations (signatures are only comparable under the same seed)
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # h(x) = (a * x + b) mod p with p = 2^31 - 1, so a * x stays within uint64
+        self._a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (uint32, num_perm values) of a text"""
+        hashes = shingle_hashes(text, self.shingle_size) % _MERSENNE_PRIME
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def buckets(self, signature: np.ndarray) -> List[int]:
+        """One signed 64-bit bucket per band (fits a Postgres BIGINT)"""
+        return [
+            int.from_bytes(
+                hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).digest(),
+                "big", signed=True,
+            )
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the texts behind two signatures"""
+        return float(np.mean(a == b))
+
+
+def relation_for(similarity: float, duplicate_threshold: float) -> str:
+    return DUPLICATE_OF if similarity >= duplicate_threshold else SUPERSEDES
+
+
+class DuplicateDetector:
+    """Finds near-duplicates of documents through a signature index"""
+
+    def __init__(
+        self,
+        index,
+        hasher: Optional[MinHasher] = None,
+        duplicate_threshold: Optional[float] = None,
+        version_threshold: Optional[float] = None,
+    ):
+        """
+        Args:
+            index: SignatureIndex holding the signatures and band buckets
+            hasher: MinHasher (defaults from DEDUP_NUM_PERM / DEDUP_BANDS)
+            duplicate_threshold: Similarity at which a match is a duplicate (DEDUP_DUPLICATE_THRESHOLD)
+            version_threshold: Similarity at which a match is a version (DEDUP_VERSION_THRESHOLD)
+        """
+        self.index = index
+        self.hasher = hasher or MinHasher(settings.dedup_num_perm, settings.dedup_bands)
+        self.duplicate_threshold = (
+            settings.dedup_duplicate_threshold if duplicate_threshold is None else duplicate_threshold
+        )
+        self.version_threshold = settings.dedup_version_threshold if version_threshold is None else version_threshold
+        self._connected = False
+
+    async def _ensure_connected(self) -> None:
+        if not self._connected:
+            self._connected = await self.index.connect()
+            if not self._connected:
+                raise RuntimeError("Signature index is not available")
+
+    async def find(self, signature: np.ndarray, exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Indexed documents similar to a signature
+
+        Returns:
+            Matches ({"id", "similarity", "relation"}), most similar first
+        """
+        await self._ensure_connected()
+        candidates = await self.index.candidates(self.hasher.buckets(signature))
+        matches = []
+        for doc_id, candidate in candidates.items():
+            if doc_id == exclude:
+                continue
+            similarity = self.hasher.similarity(signature, candidate)
+            if similarity >= self.version_threshold:
+                matches.append({
+                    "id": doc_id,
+                    "similarity": round(similarity, 4),
+                    "relation": relation_for(similarity, self.duplicate_threshold),
+                })
+        return sorted(matches, key=lambda match: -match["similarity"])
+
+    async def index_document(self, doc_id: str, text: str) -> List[Dict[str, Any]]:
+        """
+        Find a document's near-duplicates among the indexed ones, then index it
+
+        Args:
+            doc_id: Document ID (re-indexing replaces its previous signature)
+            text: Title and content
+
+        Returns:
+            Matches among previously indexed documents, most similar first
+        """
+        signature = self.hasher.signature(text)
+        matches = await self.find(signature, exclude=doc_id)
+        await self.index.add(doc_id, signature, self.hasher.buckets(signature))
+        for match in matches:
+            DUPLICATE_MATCHES.inc(relation=match["relation"])
+        if matches:
+            log_event(logger, logging.INFO, "Near-duplicates found", doc_id=doc_id,
+                      matches=[match["id"] for match in matches])
+        return matches
+
+    async def remove(self, doc_id: str) -> None:
+        await self._ensure_connected()
+        await self.index.remove(doc_id)
+
+    @staticmethod
+    async def link(graph, doc_id: str, matches: List[Dict[str, Any]]) -> int:
+        """
+        Record matches in the graph as edges from the newer document
+
+        Args:
+            graph: GraphStore
+            doc_id: The newer document
+            matches: Output of index_document
+
+        Returns:
+            Number of edges created
+        """
+        created = 0
+        for match in matches:
+            if await graph.create_relationship(doc_id, match["id"], match["relation"], confidence=match["similarity"]):
+                created += 1
+        return created
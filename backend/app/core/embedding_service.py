@@ -0,0 +1,446 @@
+"""
+Shared embedding sidecar over a Unix domain socket
+
+Every uvicorn worker that encodes text in process loads its own copy of the
+SentenceTransformer model and torch runtime. The sidecar holds one model and
+serves every worker on the host: requests arriving from all connections
+within EMBEDDING_BATCH_WAIT_MS are encoded together in one model call of up
+to EMBEDDING_BATCH_MAX texts. Workers with EMBEDDING_SOCKET set use
+EmbeddingClient as their model and never import torch.
+
+Workers call the client from the event loop with aencode: requests are
+pipelined over one connection per worker, so concurrent requests in a
+worker travel together and join the sidecar's batches instead of queueing
+behind each other. encode is a blocking equivalent for scripts and jobs.
+
+Frames are length-prefixed and binary (network byte order), and responses
+come back on a connection in request order:
+
+    request:  !IBH   body length, op (1 = encode), text count
+              body:  per text, !I byte length followed by UTF-8 bytes
+    response: !IBHH  body length, status (0 = ok, 1 = error), rows, dimensions
+              body:  rows x dimensions little-endian float32, or a UTF-8 error
+
+From backend/:
+    python -m app.core.embedding_service --socket /tmp/embeddings.sock
+"""
+import argparse
+import asyncio
+import collections
+import logging
+import os
+import socket
+import struct
+import sys
+import threading
+from typing import Any, Deque, List, Optional, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import get_logger, log_event
+from app.database.base import EMBEDDING_MODEL
+
+logger = get_logger(__name__)
+
+REQUEST_HEADER = struct.Struct("!IBH")
+RESPONSE_HEADER = struct.Struct("!IBHH")
+TEXT_LENGTH = struct.Struct("!I")
+OP_ENCODE = 1
+STATUS_OK, STATUS_ERROR = 0, 1
+MAX_TEXTS = 0xFFFF  # Texts per request frame (the count is 16 bits)
+VECTOR_DTYPE = np.dtype("<f4")
+
+
+def encode_request(texts: List[str]) -> bytes:
+    """Frame an encode request for at most MAX_TEXTS texts"""
+    parts = []
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(TEXT_LENGTH.pack(len(data)))
+        parts.append(data)
+    body = b"".join(parts)
+    return REQUEST_HEADER.pack(len(body), OP_ENCODE, len(texts)) + body
+
+
+def decode_texts(body: bytes, count: int) -> List[str]:
+    """Texts of an encode request body"""
+    texts, offset = [], 0
+    for _ in range(count):
+        (length,) = TEXT_LENGTH.unpack_from(body, offset)
+        offset += TEXT_LENGTH.size
+        texts.append(body[offset:offset + length].decode("utf-8"))
+        offset += length
+    return texts
+
+
+def encode_response(vectors: np.ndarray) -> bytes:
+    """Frame a successful response for a (rows, dimensions) matrix"""
+    body = np.ascontiguousarray(vectors, dtype=VECTOR_DTYPE).tobytes()
+    rows, dimensions = vectors.shape
+    return RESPONSE_HEADER.pack(len(body), STATUS_OK, rows, dimensions) + body
+
+
+def encode_error(message: str) -> bytes:
+    """Frame an error response"""
+    body = message.encode("utf-8")
+    return RESPONSE_HEADER.pack(len(body), STATUS_ERROR, 0, 0) + body
+
+
+class EmbeddingClient:
+    """
+    Sidecar client with the SentenceTransformer.encode interface
+
+    aencode pipelines requests over one connection per event loop: they are
+    written as they come, and a reader task resolves them in order as the
+    responses arrive. encode is a blocking equivalent over its own
+    connection, for code that is not running on an event loop. Either
+    reopens a broken connection once per call before giving up.
+    """
+
+    def __init__(self, socket_path: str, timeout_s: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout_s = timeout_s
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Deque[asyncio.Future] = collections.deque()
+        self._send_lock: Optional[asyncio.Lock] = None
+
+    def encode(self, texts: Union[str, List[str]], **_: Any) -> np.ndarray:
+        """
+        Embed one text or a list of texts, blocking the calling thread
+
+        Returns:
+            A vector for a single text, otherwise a (len(texts), dimensions) matrix
+
+        Raises:
+            ConnectionError: The sidecar is unreachable or returned an error
+        """
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        chunks = [self._call(batch[i:i + MAX_TEXTS]) for i in range(0, len(batch), MAX_TEXTS)]
+        vectors = np.concatenate(chunks) if chunks else np.zeros((0, 0), VECTOR_DTYPE)
+        return vectors[0] if single else vectors
+
+    async def aencode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """
+        Embed one text or a list of texts without blocking the event loop
+
+        Returns:
+            A vector for a single text, otherwise a (len(texts), dimensions) matrix
+
+        Raises:
+            ConnectionError: The sidecar is unreachable, timed out or returned an error
+        """
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        chunks = await asyncio.gather(*(self._acall(batch[i:i + MAX_TEXTS]) for i in range(0, len(batch), MAX_TEXTS)))
+        vectors = np.concatenate(chunks) if chunks else np.zeros((0, 0), VECTOR_DTYPE)
+        return vectors[0] if single else vectors
+
+    def _call(self, texts: List[str]) -> np.ndarray:
+        request = encode_request(texts)
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(request)
+                    length, status, rows, dimensions = RESPONSE_HEADER.unpack(self._recv(RESPONSE_HEADER.size))
+                    body = self._recv(length)
+                    break
+                except OSError as e:
+                    self._close_socket()
+                    if attempt == 2:
+                        raise ConnectionError(f"Embedding sidecar at {self.socket_path} unreachable: {e}") from e
+        return decode_response(status, rows, dimensions, body)
+
+    async def _acall(self, texts: List[str]) -> np.ndarray:
+        request = encode_request(texts)
+        for attempt in (1, 2):
+            try:
+                future = await self._send(request)
+                status, rows, dimensions, body = await asyncio.wait_for(future, self.timeout_s)
+                break
+            except asyncio.TimeoutError as e:
+                # Responses arrive in order, so one that never came stalls the rest: start over
+                self._disconnect(ConnectionResetError("Timed out waiting for the embedding sidecar"))
+                raise ConnectionError(f"Embedding sidecar at {self.socket_path} timed out") from e
+            except OSError as e:
+                if attempt == 2:
+                    raise ConnectionError(f"Embedding sidecar at {self.socket_path} unreachable: {e}") from e
+        return decode_response(status, rows, dimensions, body)
+
+    async def _send(self, request: bytes) -> asyncio.Future:
+        """Write a request on the loop's connection; the future gets its response"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Streams and locks belong to one loop (tests and scripts may run several)
+            self._disconnect(ConnectionResetError("Event loop changed"))
+            self._loop, self._send_lock = loop, asyncio.Lock()
+        async with self._send_lock:
+            if self._writer is None:
+                reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.socket_path), self.timeout_s
+                )
+                self._reader_task = loop.create_task(self._read_responses(reader, self._writer))
+            future = loop.create_future()
+            self._pending.append(future)
+            try:
+                self._writer.write(request)
+                await self._writer.drain()
+            except OSError as e:
+                self._disconnect(e)
+                raise
+        return future
+
+    async def _read_responses(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Resolve pending requests in order as their responses arrive"""
+        try:
+            while True:
+                length, status, rows, dimensions = RESPONSE_HEADER.unpack(
+                    await reader.readexactly(RESPONSE_HEADER.size)
+                )
+                body = await reader.readexactly(length)
+                future = self._pending.popleft()
+                if not future.done():
+                    future.set_result((status, rows, dimensions, body))
+        except (asyncio.IncompleteReadError, OSError) as e:
+            if self._writer is writer:
+                self._disconnect(ConnectionResetError(f"Embedding sidecar closed the connection: {e}"))
+
+    def _disconnect(self, error: Exception) -> None:
+        """Drop the event-loop connection and fail the requests waiting on it"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._reader_task is not None:
+            if self._reader_task is not _current_task():
+                self._reader_task.cancel()
+            self._reader_task = None
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    def _connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout_s)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+
+    def _recv(self, size: int) -> bytes:
+        buffer = bytearray()
+        while len(buffer) < size:
+            chunk = self._sock.recv(size - len(buffer))
+            if not chunk:
+                raise ConnectionResetError("Embedding sidecar closed the connection")
+            buffer.extend(chunk)
+        return bytes(buffer)
+
+    def _close_socket(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def close(self) -> None:
+        """Close both connections"""
+        self._close_socket()
+        self._disconnect(ConnectionResetError("Client closed"))
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+def decode_response(status: int, rows: int, dimensions: int, body: bytes) -> np.ndarray:
+    """Matrix of a response, or ConnectionError for an error response"""
+    if status != STATUS_OK:
+        raise ConnectionError(f"Embedding sidecar error: {body.decode('utf-8', 'replace')}")
+    return np.frombuffer(body, dtype=VECTOR_DTYPE).reshape(rows, dimensions)
+
+
+class _Request:
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts: List[str], future: asyncio.Future):
+        self.texts = texts
+        self.future = future
+
+
+class EmbeddingServer:
+    """Serves encode requests from all connections through one batching model loop"""
+
+    def __init__(self, model: Any, socket_path: str, max_batch: int = 64, max_wait_ms: float = 2.0):
+        """
+        Args:
+            model: Object with SentenceTransformer's encode(List[str]) -> ndarray
+            socket_path: Unix socket to listen on (a stale file is replaced)
+            max_batch: Texts gathered into one model call (a larger request is encoded alone)
+            max_wait_ms: How long the first request of a batch waits for others
+        """
+        self.model = model
+        self.socket_path = socket_path
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max_wait_ms / 1000
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    def stats(self) -> dict:
+        """Requests, model calls and texts served so far"""
+        return {"requests": self.requests, "batches": self.batches, "texts": self.texts,
+                "mean_batch": round(self.texts / self.batches, 2) if self.batches else 0.0}
+
+    async def start(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        log_event(logger, logging.INFO, "Embedding sidecar listening", socket=self.socket_path,
+                  max_batch=self.max_batch, max_wait_ms=self.max_wait_s * 1000)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+            self._batcher = None
+        while self._queue is not None and not self._queue.empty():
+            request = self._queue.get_nowait()
+            if not request.future.done():
+                request.future.set_exception(ConnectionError("Embedding sidecar stopped"))
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serve one worker connection
+
+        Requests are queued for the batcher as soon as they are read, so a
+        worker's pipelined requests share batches; responses are written in
+        request order.
+        """
+        responses: asyncio.Queue = asyncio.Queue()
+        sender = asyncio.create_task(self._send_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    length, op, count = REQUEST_HEADER.unpack(await reader.readexactly(REQUEST_HEADER.size))
+                    body = await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
+                    break
+                if op != OP_ENCODE:
+                    responses.put_nowait(encode_error(f"Unknown op {op}"))
+                else:
+                    responses.put_nowait(asyncio.ensure_future(self._encode(decode_texts(body, count))))
+        except (ConnectionError, struct.error, UnicodeDecodeError) as e:
+            log_event(logger, logging.WARNING, "Embedding sidecar connection dropped", error=str(e))
+        finally:
+            # Answer what was already read, then close
+            responses.put_nowait(None)
+            await asyncio.gather(sender, return_exceptions=True)
+            writer.close()
+
+    async def _send_responses(self, responses: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        while True:
+            response = await responses.get()
+            if response is None:
+                return
+            writer.write(await response if isinstance(response, asyncio.Future) else response)
+            await writer.drain()
+
+    async def _encode(self, texts: List[str]) -> bytes:
+        self.requests += 1
+        if not texts:
+            return encode_response(np.zeros((0, 0), VECTOR_DTYPE))
+        request = _Request(texts, asyncio.get_running_loop().create_future())
+        self._queue.put_nowait(request)
+        try:
+            return encode_response(await request.future)
+        except Exception as e:
+            return encode_error(str(e))
+
+    async def _next_batch(self) -> List[_Request]:
+        """Wait for a request, then gather others arriving within max_wait_s up to max_batch texts"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = loop.time() + self.max_wait_s
+        while size < self.max_batch:
+            try:
+                request = await asyncio.wait_for(self._queue.get(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                # Off the loop, so connections keep being read while the model runs
+                vectors = await loop.run_in_executor(None, self.model.encode, texts)
+                vectors = np.asarray(vectors, dtype=VECTOR_DTYPE).reshape(len(texts), -1)
+            except Exception as e:
+                logger.exception("Embedding sidecar encode failed")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            offset = 0
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=settings.embedding_socket or "/tmp/embeddings.sock")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--max-batch", type=int, default=settings.embedding_batch_max)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.embedding_batch_wait_ms)
+    args = parser.parse_args(argv)
+
+    from sentence_transformers import SentenceTransformer
+    log_event(logger, logging.INFO, "Loading embedding model", model=args.model)
+    server = EmbeddingServer(SentenceTransformer(args.model), args.socket, args.max_batch, args.max_wait_ms)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Merging vector search hits with their graph neighbourhoods
+
+Each hit keeps its own neighbour list; the neighbours of all hits are also
+merged into one "related" list without the hits themselves, each neighbour
+kept once with its best score and the hits it was reached from.
+
+Scores: a hit scores its cosine similarity (1 - distance). A neighbour
+inherits the similarity of the hit it was reached from, or, with rescoring,
+that similarity times the product of edge confidences along its path.
+"""
+from typing import Any, Dict, List
+
+
+def neighbour_score(similarity: float, confidence: float, rescore: bool) -> float:
+    """Score of a neighbour reached from a hit with this similarity"""
+    return similarity * confidence if rescore else similarity
+
+
+def expand_search_results(
+    hits: List[Dict[str, Any]],
+    neighbourhoods: Dict[str, List[Dict[str, Any]]],
+    rescore: bool = False,
+) -> Dict[str, Any]:
+    """
+    Attach neighbourhoods to search hits and merge them into one ranked list
+
+    Args:
+        hits: Search results, best first, each with "distance"
+        neighbourhoods: Graph neighbours by hit ID (from get_neighbourhoods)
+        rescore: Weight neighbour scores by their path confidence
+
+    Returns:
+        {"hits": [{"document", "distance", "score", "neighbours"}],
+         "related": [neighbour + "via"]}, neighbours best first
+    """
+    hit_ids = {doc["id"] for doc in hits}
+    expanded, related = [], {}
+    for doc in hits:
+        similarity = 1.0 - doc["distance"]
+        neighbours = []
+        for entry in neighbourhoods.get(doc["id"], []):
+            node = entry["node"]
+            neighbour = {
+                "id": node["id"],
+                "title": node.get("title", ""),
+                "rel_types": list(entry["rel_types"]),
+                "depth": entry["depth"],
+                "confidence": entry["confidence"],
+                "score": neighbour_score(similarity, entry["confidence"], rescore),
+                "node": node,
+            }
+            neighbours.append(neighbour)
+            if neighbour["id"] in hit_ids:
+                continue
+            merged = related.get(neighbour["id"])
+            if merged is None or neighbour["score"] > merged["score"]:
+                related[neighbour["id"]] = dict(neighbour, via=(merged or {}).get("via", []) + [doc["id"]])
+            else:
+                merged["via"].append(doc["id"])
+        neighbours.sort(key=lambda n: (-n["score"], n["depth"]))
+        expanded.append({
+            "document": doc,
+            "distance": doc["distance"],
+            "score": similarity,
+            "neighbours": neighbours,
+        })
+    return {
+        "hits": expanded,
+        "related": sorted(related.values(), key=lambda n: (-n["score"], n["depth"])),
+    }
@@ -0,0 +1,196 @@
+"""
+Asynchronous document ingestion
+
+A job holds one or more documents submitted together. Each document is
+queued separately and picked up by one of a fixed number of workers, which
+bounds how many embed-and-write pipelines run at once. A failed document is
+retried with exponential backoff up to a maximum number of attempts; the
+handler receives the same item on every attempt, so it can skip the steps
+that already succeeded (e.g. not insert the document twice when only the
+graph write failed).
+
+Jobs live in this process only: a restart loses queued work and job status.
+"""
+import asyncio
+import contextvars
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.logging import get_logger, log_event
+from app.core.metrics import INGEST_DOCUMENTS, INGEST_QUEUE_DEPTH
+
+logger = get_logger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+class QueueFull(Exception):
+    """Raised when a job does not fit in the ingestion queue"""
+
+
+class IngestionQueue:
+    """Bounded queue of ingestion jobs served by a fixed worker pool"""
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        concurrency: int = 4,
+        max_queued: int = 10000,
+        max_attempts: int = 3,
+        retry_backoff_s: float = 1.0,
+        history: int = 1000,
+    ):
+        """
+        Args:
+            handler: Processes one item ({"document", "context", "doc_id", ...}); raises to retry
+            concurrency: Number of workers
+            max_queued: Documents that may wait for a worker
+            max_attempts: Attempts per document before it is marked failed
+            retry_backoff_s: Delay before the first retry, doubled on each further one
+            history: Finished jobs kept for status queries
+        """
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.max_queued = max_queued
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff_s = retry_backoff_s
+        self.history = history
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def depth(self) -> int:
+        """Documents waiting for a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_workers(self) -> None:
+        """Start the workers on the running loop (again, if that loop changed)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        # A fresh context, so workers do not inherit the route and trace of the request that started them
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"ingest-worker-{i}", context=contextvars.Context())
+            for i in range(self.concurrency)
+        ]
+
+    def submit(self, documents: List[Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Queue documents as one job
+
+        Args:
+            documents: Document payloads, passed to the handler as item["document"]
+            context: Shared by the job's items as item["context"] (e.g. the stores to write to)
+
+        Returns:
+            The job's status dict
+
+        Raises:
+            QueueFull: The documents do not fit in the queue
+        """
+        self._ensure_workers()
+        if self.depth + len(documents) > self.max_queued:
+            raise QueueFull(f"Ingestion queue is full ({self.depth} documents waiting)")
+        job_id = str(uuid.uuid4())
+        job = {
+            "id": job_id,
+            "status": QUEUED,
+            "total": len(documents),
+            "completed": 0,
+            "failed": 0,
+            "document_ids": [None] * len(documents),
+            "errors": [],
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self.jobs[job_id] = job
+        for index, document in enumerate(documents):
+            self._queue.put_nowait({"job_id": job_id, "index": index, "document": document,
+                                    "context": context or {}, "doc_id": None, "attempts": 0})
+        INGEST_QUEUE_DEPTH.set(self.depth)
+        self._trim()
+        log_event(logger, logging.INFO, "Ingestion job queued", job_id=job_id, documents=len(documents))
+        return self.status(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status with progress (fraction of documents finished), or None if unknown"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        finished = job["completed"] + job["failed"]
+        return dict(job, document_ids=list(job["document_ids"]), errors=list(job["errors"]),
+                    progress=round(finished / job["total"], 4) if job["total"] else 1.0)
+
+    def list_jobs(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent jobs first"""
+        return [self.status(job_id) for job_id in list(reversed(self.jobs))[:limit]]
+
+    def _trim(self) -> None:
+        """Forget the oldest finished jobs beyond the history bound"""
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in (SUCCEEDED, FAILED)]
+        for job_id in finished[: max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    async def _work(self) -> None:
+        while True:
+            item = await self._queue.get()
+            INGEST_QUEUE_DEPTH.set(self.depth)
+            try:
+                await self._process(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ingestion worker error")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, item: Dict[str, Any]) -> None:
+        job = self.jobs.get(item["job_id"])
+        if job is None:
+            return
+        if job["status"] == QUEUED:
+            job["status"] = RUNNING
+            job["started_at"] = datetime.now().isoformat()
+        while True:
+            item["attempts"] += 1
+            try:
+                await self.handler(item)
+                job["completed"] += 1
+                INGEST_DOCUMENTS.inc(result="ok")
+                break
+            except Exception as e:
+                if item["attempts"] >= self.max_attempts:
+                    logger.exception(f"Ingestion of document {item['index']} in job {job['id']} failed")
+                    job["failed"] += 1
+                    job["errors"].append(f"document {item['index']}: {e}")
+                    INGEST_DOCUMENTS.inc(result="failed")
+                    break
+                INGEST_DOCUMENTS.inc(result="retried")
+                await asyncio.sleep(self.retry_backoff_s * 2 ** (item["attempts"] - 1))
+            finally:
+                job["document_ids"][item["index"]] = item["doc_id"]
+        if job["completed"] + job["failed"] == job["total"]:
+            job["status"] = FAILED if job["failed"] else SUCCEEDED
+            job["finished_at"] = datetime.now().isoformat()
+            log_event(logger, logging.INFO, "Ingestion job finished", job_id=job["id"], status=job["status"],
+                      completed=job["completed"], failed=job["failed"])
+
+    async def join(self) -> None:
+        """Wait until every queued document has been processed"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued documents are dropped"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -1,61 +1,270 @@
 """
 Logging configuration for the application
+
+Records are handed to a QueueHandler on the calling thread and formatted and
+written by a QueueListener thread, so logging never blocks the event loop on
+stdout. Output is structured JSON by default, long field values are truncated,
+and INFO/DEBUG records can be sampled per route prefix.
 """
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from typing import Dict, Any, Optional
 
+from app.core.config import settings
+
 # Configure logging format
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-LOG_LEVEL = logging.INFO
+LOG_LEVEL = getattr(logging, settings.log_level, logging.INFO)
+
+# Path of the request currently being handled (set by RequestLoggingMiddleware)
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def truncate(value: Any, limit: Optional[int] = None) -> Any:
+    """
+    Shorten long strings (and strings nested in lists/dicts) for logging
+
+    Args:
+        value: Value to truncate
+        limit: Maximum string length (defaults to LOG_MAX_FIELD_LENGTH)
+
+    Returns:
+        Value safe to put in a log record
+    """
+    limit = limit if limit is not None else settings.log_max_field_length
+    if isinstance(value, str):
+        if len(value) <= limit:
+            return value
+        return f"{value[:limit]}...<{len(value) - limit} more chars>"
+    if isinstance(value, dict):
+        return {k: truncate(v, limit) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if len(value) > 20:
+            return [truncate(v, limit) for v in value[:20]] + [f"<{len(value) - 20} more items>"]
+        return [truncate(v, limit) for v in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": truncate(record.getMessage()),
+        }
+        route = getattr(record, "route", None)
+        if route:
+            entry["route"] = route
+        fields = getattr(record, "fields", None)
+        if fields:
+            for key, value in truncate(fields).items():
+                # A field named like a core key (msg=..., level=...) must not replace it
+                entry[f"field_{key}" if key in entry else key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RouteSamplingFilter(logging.Filter):
+    """
+    Drop a fraction of INFO/DEBUG records per route prefix
+
+    Warnings and errors always pass. Rates come from LOG_SAMPLE_RATES,
+    e.g. "/documents/search=0.1,/health=0".
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        # Longest prefix first so "/documents/search" wins over "/documents"
+        self.rates = sorted((rates or {}).items(), key=lambda item: -len(item[0]))
+
+    def rate_for(self, route: Optional[str]) -> float:
+        """Return the sampling rate for a route (1.0 when unconfigured)"""
+        if route:
+            for prefix, rate in self.rates:
+                if route.startswith(prefix):
+                    return rate
+        return 1.0
+
+    def keep(self, level: int, route: Optional[str]) -> bool:
+        """Decide whether a record at this level and route should be emitted"""
+        if level >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rate_for(route)
+        return rate >= 1.0 or random.random() < rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.route = current_route.get()
+        # log_event() samples before building the record
+        return getattr(record, "sampled", False) or self.keep(record.levelno, record.route)
+
+
+sampler = RouteSamplingFilter(settings.log_sample_rates)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _output_handler() -> logging.Handler:
+    """Create the handler the queue listener writes to"""
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def _start_listener() -> None:
+    """Start the background thread draining the log queue"""
+    global _listener
+    if _listener is None:
+        _listener = logging.handlers.QueueListener(_log_queue, _output_handler())
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 def setup_logging(name: str = "app", level: Optional[int] = None) -> logging.Logger:
     """
     Configure and return a logger with the specified name and level
-    
+
     Args:
         name: Logger name
         level: Logging level (defaults to LOG_LEVEL)
-        
+
     Returns:
         Configured logger instance
     """
     logger = logging.getLogger(name)
-    
+
     # Set level from parameter or default
     logger.setLevel(level if level is not None else LOG_LEVEL)
-    
-    # Create console handler if not already added
+
+    # Route records through the queue if not already added
     if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handler = _DeferredQueueHandler(_log_queue)
+        handler.addFilter(sampler)
         logger.addHandler(handler)
-    
+        logger.propagate = False
+        _start_listener()
+
     return logger
 
 
+def get_logger(name: str) -> logging.Logger:
+    """
+    Return a child of the application logger (e.g. "app.database.vector")
+
+    Args:
+        name: Module name, usually __name__
+
+    Returns:
+        Logger sharing the application's queue handler
+    """
+    if name != "app" and not name.startswith("app."):
+        name = f"app.{name}"
+    return logging.getLogger(name)
+
+
+def log_event(logger: logging.Logger, level: int, message: str, **fields: Any) -> None:
+    """
+    Log a structured event if the level is enabled
+
+    Level gating and route sampling happen before the record is built, so
+    dropped events cost a couple of checks. Field values are truncated by
+    the listener thread when the record is formatted.
+
+    Args:
+        logger: Logger instance
+        level: Logging level
+        message: Short event description
+        **fields: Structured fields added to the JSON output
+    """
+    if logger.isEnabledFor(level) and sampler.keep(level, current_route.get()):
+        logger.log(level, message, extra={"fields": fields, "sampled": True})
+
+
 def log_request_info(logger: logging.Logger, request_data: Dict[str, Any]) -> None:
     """
     Log request information
-    
+
     Args:
         logger: Logger instance
         request_data: Request data to log
     """
-    logger.info(f"Request received: {request_data}")
+    log_event(logger, logging.INFO, "Request received", request=request_data)
 
 
 def log_response_info(logger: logging.Logger, status_code: int, response_data: Dict[str, Any]) -> None:
     """
     Log response information
-    
+
     Args:
         logger: Logger instance
         status_code: HTTP status code
         response_data: Response data to log
     """
-    logger.info(f"Response sent: status_code={status_code}, data={response_data}")
+    log_event(logger, logging.INFO, "Response sent", status_code=status_code, response=response_data)
+
+
+class RequestLoggingMiddleware:
+    """ASGI middleware that tags records with the current route and logs one line per request"""
+
+    def __init__(self, app, logger: Optional[logging.Logger] = None):
+        self.app = app
+        self.logger = logger or get_logger("app.requests")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = current_route.set(scope["path"])
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            log_event(
+                self.logger, logging.INFO, "Request handled",
+                method=scope["method"],
+                path=scope["path"],
+                status_code=status["code"],
+                duration_ms=round((time.perf_counter() - start) * 1000, 3),
+            )
+            current_route.reset(token)
 
 
 # Create default application logger
@@ -0,0 +1,293 @@
+"""
+Low-overhead in-process metrics exposed in Prometheus text format
+
+Metrics are plain Python objects updated without locks: the event loop is
+single-threaded and a rare lost increment from a worker thread is an
+acceptable trade for keeping observe() to a few hundred nanoseconds.
+"""
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.responses import JSONResponse
+
+# Latency buckets in seconds, from 0.5ms to 10s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Batch size buckets for embedding calls
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set, e.g. {query="get_document",le="0.1"}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    """Escape a label value"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    """Monotonically increasing counter"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increase the counter for a label set"""
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Current value for a label set"""
+        return self.values.get(tuple(labels.get(name, "") for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        """Return the Prometheus sample lines for this metric"""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for a label set"""
+        self.values[tuple(labels.get(name, "") for name in self.labelnames)] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Decrease the gauge for a label set"""
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, description: str,
+        labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self.series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation"""
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, **labels: str) -> "_Timer":
+        """Observe the wall time of the enclosed ``with`` block in seconds"""
+        return _Timer(self, labels)
+
+    def count(self, **labels: str) -> int:
+        """Number of observations for a label set"""
+        series = self.series.get(tuple(labels.get(name, "") for name in self.labelnames))
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        """Return the Prometheus sample lines for this metric"""
+        lines = []
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    """Context manager used by Histogram.time (cheaper than @contextmanager)"""
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        """Add a metric (or return the one already registered under its name)"""
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, description, labelnames))
+
+    def histogram(
+        self, name: str, description: str,
+        labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, description, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+EMBEDDING_SECONDS = registry.histogram(
+    "embedding_encode_seconds", "Time spent encoding text into embeddings"
+)
+EMBEDDING_BATCH_SIZE = registry.histogram(
+    "embedding_batch_size", "Number of texts per embedding call", buckets=SIZE_BUCKETS
+)
+POSTGRES_QUERY_SECONDS = registry.histogram(
+    "postgres_query_seconds", "Postgres query time per named query", ("query",)
+)
+NEO4J_QUERY_SECONDS = registry.histogram(
+    "neo4j_query_seconds", "Neo4j query time per named Cypher query", ("query",)
+)
+POSTGRES_READS = registry.counter(
+    "postgres_reads_total", "Routed Postgres reads by target (primary or replica)", ("target",)
+)
+POSTGRES_REPLICA_HEALTHY = registry.gauge(
+    "postgres_replica_healthy", "Whether a read replica passed its last health check (1) or not (0)", ("replica",)
+)
+POSTGRES_REPLICA_LAG_SECONDS = registry.gauge(
+    "postgres_replica_lag_seconds", "Replay lag of a read replica at its last health check", ("replica",)
+)
+SHARD_QUERY_SECONDS = registry.histogram(
+    "shard_query_seconds", "Document store call time per shard and operation", ("shard", "operation")
+)
+SHARD_FALLBACK_LOOKUPS = registry.counter(
+    "shard_fallback_lookups_total", "Lookups by ID missing on the owning shard and retried on the previous owner",
+    ("result",),
+)
+SHARD_DOCUMENTS_MOVED = registry.counter(
+    "shard_documents_moved_total", "Documents moved by the shard rebalancer", ("source", "target")
+)
+LANCEDB_QUERY_SECONDS = registry.histogram(
+    "lancedb_query_seconds", "LanceDB operation time per named query", ("query",)
+)
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result")
+)
+CACHE_ENTRIES = registry.gauge(
+    "cache_entries", "Entries held by an in-process cache", ("cache",)
+)
+CACHE_BYTES = registry.gauge(
+    "cache_bytes", "Approximate memory held by an in-process cache's values", ("cache",)
+)
+CACHE_EVICTIONS = registry.counter(
+    "cache_evictions_total", "Entries dropped by cache and reason (size, expired, invalidated)", ("cache", "reason")
+)
+COALESCED_CALLS = registry.counter(
+    "coalesced_calls_total",
+    "Calls by operation and role (leader ran the work, follower joined an in-flight call)",
+    ("operation", "role"),
+)
+DUPLICATE_MATCHES = registry.counter(
+    "duplicate_matches_total", "Near-duplicates found at insert or backfill, by relation", ("relation",)
+)
+CHUNK_EMBEDDINGS = registry.counter(
+    "chunk_embeddings_total", "Document chunks embedded or reused from stored chunk embeddings", ("result",)
+)
+INGEST_DOCUMENTS = registry.counter(
+    "ingest_documents_total", "Documents processed by ingestion workers, by result (ok, retried, failed)", ("result",)
+)
+INGEST_QUEUE_DEPTH = registry.gauge("ingest_queue_depth", "Documents waiting for an ingestion worker")
+ADMISSION_IN_FLIGHT = registry.gauge(
+    "admission_in_flight", "Embedding-heavy requests admitted and running", ("controller",)
+)
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "admission_queue_depth", "Requests waiting for admission, by priority", ("controller", "priority")
+)
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "admission_wait_seconds", "Time spent waiting for admission, by priority", ("controller", "priority")
+)
+ADMISSION_REJECTIONS = registry.counter(
+    "admission_rejections_total",
+    "Requests turned away by priority and reason (queue_full, or shed for a higher priority)",
+    ("controller", "priority", "reason"),
+)
+SERIALIZATION_SECONDS = registry.histogram(
+    "response_serialization_seconds", "Time spent building and rendering responses", ("stage",)
+)
+REQUEST_SECONDS = registry.histogram(
+    "http_request_seconds", "Total request latency per route", ("method", "route", "status")
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording total latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Use the route template ("/documents/{document_id}") to bound label cardinality
+            route: Optional[object] = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status["code"]),
+            )
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records how long rendering the body takes"""
+
+    def render(self, content: Any) -> bytes:
+        with SERIALIZATION_SECONDS.time(stage="render"):
+            return super().render(content)
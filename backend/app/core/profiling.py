@@ -0,0 +1,166 @@
+"""
+Opt-in per-request profiling
+
+When PROFILING_ENABLED is set, a request carrying an ``X-Profile`` header or
+a ``profile`` query parameter is profiled and the result saved under
+PROFILE_DIR:
+
+- ``cprofile`` (default): deterministic cProfile output as ``.pstats``,
+  readable with ``python -m pstats``, snakeviz or flameprof
+- ``sampling``: a background thread samples the event loop thread's stack
+  every PROFILE_SAMPLE_INTERVAL_MS and writes ``.collapsed`` stacks that
+  flamegraph.pl / speedscope load directly
+
+Both modes profile the event loop thread, so concurrent requests running
+on the loop at the same time show up as well; profile on a quiet instance.
+Wall time and CPU time (event loop thread) are reported separately in the
+response headers.
+"""
+import asyncio
+import cProfile
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class SamplingProfiler:
+    """Periodically sample one thread's Python stack into collapsed-stack counts"""
+
+    def __init__(self, thread_id: int, interval_s: float):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        """Render a frame chain root-first as "file:func;file:func" """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def dump(self, path: str) -> None:
+        """Write collapsed stacks ("stack count" per line)"""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def requested_mode(scope) -> Optional[str]:
+    """
+    Return the profiler requested by a request, if any
+
+    Args:
+        scope: ASGI scope
+
+    Returns:
+        "cprofile", "sampling" or None
+    """
+    value = None
+    for name, header_value in scope.get("headers", []):
+        if name == b"x-profile":
+            value = header_value.decode()
+            break
+    if value is None and scope.get("query_string"):
+        values = parse_qs(scope["query_string"].decode()).get("profile")
+        value = values[0] if values else None
+    if not value or value.lower() in ("0", "false", "no"):
+        return None
+    return "sampling" if value.lower() == "sampling" else "cprofile"
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that ask for it"""
+
+    def __init__(self, app, enabled: Optional[bool] = None, output_dir: Optional[str] = None):
+        self.app = app
+        self.enabled = settings.profiling_enabled if enabled is None else enabled
+        self.output_dir = output_dir or settings.profile_dir
+
+    async def __call__(self, scope, receive, send):
+        mode = requested_mode(scope) if self.enabled and scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        extension = "pstats" if mode == "cprofile" else "collapsed"
+        path = os.path.join(self.output_dir, f"{profile_id}.{extension}")
+
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+        else:
+            profiler = SamplingProfiler(threading.get_ident(), settings.profile_sample_interval_ms / 1000)
+        timings: Dict[str, float] = {}
+
+        def stop() -> None:
+            if "wall_ms" in timings:
+                return
+            if mode == "cprofile":
+                profiler.disable()
+            else:
+                profiler.stop()
+            timings["wall_ms"] = (time.perf_counter() - wall_start) * 1000
+            timings["cpu_ms"] = (time.thread_time() - cpu_start) * 1000
+
+        async def send_wrapper(message):
+            # Stop at response start: the handler's work is done and headers can still be added
+            if message["type"] == "http.response.start":
+                stop()
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-wall-ms", f"{timings['wall_ms']:.3f}".encode()),
+                    (b"x-profile-cpu-ms", f"{timings['cpu_ms']:.3f}".encode()),
+                    (b"x-profile-file", path.encode()),
+                ]
+            await send(message)
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        if mode == "cprofile":
+            profiler.enable()
+        else:
+            profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stop()
+            await asyncio.to_thread(self._save, profiler, path)
+            logger.info(
+                f"Profiled {scope['method']} {scope['path']}: wall={timings['wall_ms']:.1f}ms "
+                f"cpu={timings['cpu_ms']:.1f}ms -> {path}"
+            )
+
+    def _save(self, profiler, path: str) -> None:
+        """Write profiler output to disk"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.dump_stats(path)
+        else:
+            profiler.dump(path)
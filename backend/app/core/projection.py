@@ -0,0 +1,109 @@
+"""
+PCA projection of embeddings to a low-dimensional space
+
+A Projection is fitted on stored document embeddings and saved to
+REDUCED_PROJECTION_PATH. Stores keep the projected, re-normalised vector
+next to the full embedding and use it to fetch candidates cheaply; the
+final ranking is always on the full embedding.
+"""
+import hashlib
+import os
+from typing import Optional
+
+import numpy as np
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class Projection:
+    """Linear map from full to reduced embeddings (mean-centred PCA)"""
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, explained_variance: Optional[np.ndarray] = None):
+        """
+        Args:
+            mean: Corpus mean of the full embeddings, shape (full,)
+            components: Principal axes, shape (reduced, full)
+            explained_variance: Variance ratio explained by each axis
+        """
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.explained_variance = (
+            np.asarray(explained_variance, dtype=np.float32)
+            if explained_variance is not None else np.zeros(len(self.components), dtype=np.float32)
+        )
+
+    @property
+    def dimensions(self) -> int:
+        """Reduced dimensions"""
+        return len(self.components)
+
+    @property
+    def fingerprint(self) -> str:
+        """Short hash identifying this projection"""
+        digest = hashlib.sha1(self.mean.tobytes() + self.components.tobytes())
+        return digest.hexdigest()[:12]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dimensions: int) -> "Projection":
+        """
+        Fit a projection on a sample of embeddings
+
+        Args:
+            vectors: Embeddings, shape (rows, full)
+            dimensions: Reduced dimensions to keep
+
+        Returns:
+            Fitted projection
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if dimensions <= 0 or dimensions > min(vectors.shape):
+            raise ValueError(f"Cannot fit {dimensions} dimensions on {vectors.shape[0]}x{vectors.shape[1]} vectors")
+        mean = vectors.mean(axis=0)
+        _, singular, axes = np.linalg.svd(vectors - mean, full_matrices=False)
+        variance = singular ** 2
+        return cls(mean, axes[:dimensions], variance[:dimensions] / variance.sum())
+
+    def project(self, vectors) -> np.ndarray:
+        """Reduced, L2-normalised embeddings for one vector or a matrix of them"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        reduced = (vectors - self.mean) @ self.components.T
+        norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+        return reduced / np.where(norms > 0, norms, 1.0)
+
+    def save(self, path: str) -> None:
+        """Write the projection to an .npz file"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, mean=self.mean, components=self.components, explained_variance=self.explained_variance)
+
+    @classmethod
+    def load(cls, path: str) -> "Projection":
+        """Read a projection written by save()"""
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"], data["explained_variance"])
+
+
+def load_projection(path: str, dimensions: int) -> Optional[Projection]:
+    """
+    Projection from REDUCED_PROJECTION_PATH when reduced search is enabled
+
+    Args:
+        path: Projection file
+        dimensions: Configured reduced dimensions (0 disables reduced search)
+
+    Returns:
+        The projection, or None when disabled, missing or of other dimensions
+    """
+    if dimensions <= 0 or not os.path.exists(path):
+        return None
+    try:
+        projection = Projection.load(path)
+    except Exception:
+        logger.exception(f"Error loading projection from {path}")
+        return None
+    if projection.dimensions != dimensions:
+        logger.warning(f"Projection in {path} has {projection.dimensions} dimensions, expected {dimensions}")
+        return None
+    return projection
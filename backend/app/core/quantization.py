@@ -0,0 +1,40 @@
+"""
+Compact vector representations for candidate search
+
+- halfvec: float16, half the bytes of float32 with almost no ranking loss.
+- binary: one sign bit per dimension (32x smaller than float32); distance is
+  the Hamming distance between bit vectors.
+
+Both are only used to pick candidates; the final ranking is always exact
+cosine distance over the full float32 vectors.
+"""
+import numpy as np
+
+QUANTIZATIONS = ("none", "halfvec", "binary")
+
+# Set bits per byte value, for Hamming distances over packed bit vectors
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def to_halfvec(vectors: np.ndarray) -> np.ndarray:
+    """float16 copy of float32 vectors"""
+    return np.asarray(vectors, dtype=np.float16)
+
+
+def binary_quantize(vectors: np.ndarray) -> np.ndarray:
+    """Pack the sign of each dimension into bits (same rule as pgvector's binary_quantize)"""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def hamming_distances(packed: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Hamming distance from each packed row to a packed query"""
+    return POPCOUNT[np.bitwise_xor(packed, query)].sum(axis=1, dtype=np.uint16)
+
+
+def representation_bytes(quantization: str, dimensions: int) -> int:
+    """Bytes per vector of a representation"""
+    if quantization == "halfvec":
+        return 2 * dimensions
+    if quantization == "binary":
+        return (dimensions + 7) // 8
+    return 4 * dimensions
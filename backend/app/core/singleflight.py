@@ -0,0 +1,88 @@
+"""
+Single-flight coalescing of identical concurrent calls
+
+When several coroutines ask for the same key while a call for it is still
+running, only the first (the leader) does the work; the others (followers)
+await the same result. Nothing is cached: once the call finishes, the next
+request for the key starts a new one.
+
+The work runs in its own task, so a leader whose request is cancelled (for
+example, the client disconnected) does not fail its followers.
+"""
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.core.metrics import COALESCED_CALLS
+
+
+class _Call:
+    """One in-flight call and the number of callers that joined it"""
+
+    __slots__ = ("task", "followers")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.followers = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls sharing a key"""
+
+    def __init__(self, name: str, copier: Callable[[Any], Any] = copy.deepcopy):
+        """
+        Args:
+            name: Operation name used in metrics
+            copier: Copies a shared result for each caller (deep copy by
+                default; pass something cheaper when the shape is known)
+        """
+        self.name = name
+        self.copier = copier
+        self._in_flight: Dict[Hashable, _Call] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn, or join the call already running for key
+
+        Args:
+            key: Identity of the call (e.g. the method arguments)
+            fn: Coroutine factory doing the work
+
+        Returns:
+            The result of fn; when the call was shared, every caller gets
+            its own copy so results can be mutated independently
+        """
+        call = self._in_flight.get(key)
+        if call is not None:
+            COALESCED_CALLS.inc(operation=self.name, role="follower")
+            call.followers += 1
+            return self.copier(await asyncio.shield(call.task))
+
+        COALESCED_CALLS.inc(operation=self.name, role="leader")
+        call = _Call(asyncio.ensure_future(fn()))
+        self._in_flight[key] = call
+        call.task.add_done_callback(lambda _: self._forget(key, call))
+        result = await asyncio.shield(call.task)
+        # The shared result must stay untouched until every follower has copied it
+        return self.copier(result) if call.followers else result
+
+    def forget(self, key: Hashable) -> None:
+        """
+        Detach the call running for key, if any
+
+        Callers already waiting still get its result, but the next caller
+        starts a new call. Writers use this so that reads issued after a
+        write cannot join a read that started before it.
+        """
+        self._in_flight.pop(key, None)
+
+    def clear(self) -> None:
+        """Detach every running call (see forget)"""
+        self._in_flight.clear()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
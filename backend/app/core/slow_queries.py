@@ -0,0 +1,155 @@
+"""
+Slow-query log with automatic plan capture for SQL and Cypher
+
+Statements slower than SLOW_QUERY_MS are recorded with redacted parameters
+and their duration. For a sampled subset of slow read statements the plan is
+captured in the background by re-running the statement under
+EXPLAIN (ANALYZE, BUFFERS) or Cypher PROFILE, so the slow request itself is
+not delayed. Writes are never re-executed; they are logged without a plan.
+"""
+import asyncio
+import random
+import re
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Statements containing these keywords modify data and must not be re-run
+_WRITE_KEYWORDS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|CREATE|MERGE|SET|REMOVE|DROP|ALTER|DETACH)\b", re.IGNORECASE
+)
+
+
+def redact_params(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Replace parameter values that may contain document text or embeddings
+
+    Numbers, booleans and None are kept since they explain plan choices
+    (limits, offsets); strings and vectors are reduced to their shape.
+
+    Args:
+        params: Statement parameters
+
+    Returns:
+        Parameters safe to keep in the log
+    """
+    redacted = {}
+    for key, value in (params or {}).items():
+        if value is None or isinstance(value, (bool, int, float)):
+            redacted[key] = value
+        elif isinstance(value, str):
+            redacted[key] = f"<str len={len(value)}>"
+        elif isinstance(value, (list, tuple)):
+            redacted[key] = f"<list len={len(value)}>"
+        elif isinstance(value, dict):
+            redacted[key] = f"<map keys={sorted(value)}>"
+        else:
+            redacted[key] = f"<{type(value).__name__}>"
+    return redacted
+
+
+def is_read_only(statement: str) -> bool:
+    """Whether a statement is safe to re-run for plan capture"""
+    return not _WRITE_KEYWORDS.search(statement)
+
+
+class SlowQueryLog:
+    """Bounded in-memory log of slow statements"""
+
+    def __init__(self, threshold_ms: float, explain_sample_rate: float, max_entries: int = 100):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def observe(
+        self,
+        engine: str,
+        name: str,
+        statement: str,
+        params: Optional[Dict[str, Any]],
+        duration_s: float,
+        explain: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record a statement if it exceeded the threshold
+
+        Args:
+            engine: "postgres" or "neo4j"
+            name: Stable query name
+            statement: SQL or Cypher text
+            params: Statement parameters (redacted before storing)
+            duration_s: Execution time in seconds
+            explain: Coroutine factory returning the plan; only called for
+                sampled read-only statements
+
+        Returns:
+            The log entry, or None if the statement was fast enough
+        """
+        duration_ms = duration_s * 1000
+        if duration_ms < self.threshold_ms:
+            return None
+
+        entry = {
+            "engine": engine,
+            "name": name,
+            "statement": " ".join(statement.split()),
+            "params": redact_params(params),
+            "duration_ms": round(duration_ms, 3),
+            "recorded_at": datetime.now().isoformat(),
+            "plan": None,
+        }
+        self.entries.append(entry)
+        logger.warning(f"Slow {engine} query {name}: {duration_ms:.1f} ms")
+
+        if explain is not None and is_read_only(statement) and random.random() < self.explain_sample_rate:
+            self._capture_plan(entry, explain)
+        return entry
+
+    def _capture_plan(self, entry: Dict[str, Any], explain: Callable[[], Awaitable[Any]]) -> None:
+        """Run plan capture in the background and attach the result to the entry"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        async def run():
+            try:
+                entry["plan"] = await explain()
+            except Exception as e:
+                entry["plan"] = {"error": str(e)}
+
+        task = loop.create_task(run())
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def recent(self, limit: int = 50, engine: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return the most recent entries, newest first
+
+        Args:
+            limit: Maximum number of entries
+            engine: Optional engine filter ("postgres" or "neo4j")
+
+        Returns:
+            List of log entries
+        """
+        entries = [e for e in reversed(self.entries) if engine is None or e["engine"] == engine]
+        return entries[:limit]
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self.entries.clear()
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.slow_query_ms,
+    explain_sample_rate=settings.slow_query_explain_sample_rate,
+    max_entries=settings.slow_query_log_size,
+)
@@ -0,0 +1,244 @@
+"""
+Lightweight request tracing with spans propagated through contextvars
+
+A root span is opened per HTTP request by TracingMiddleware. The sampling
+decision is made once at the root (head-based): unsampled requests get a
+shared no-op span, so instrumented code pays only a contextvar lookup.
+Finished traces are handed to a background thread that writes them to the
+configured exporter, keeping file/stdout I/O off the event loop.
+"""
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start", "end", "attributes", "_token")
+
+    def __init__(self, name: str, trace: "Trace", parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach an attribute (row count, batch size, cache hit...)"""
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.time()
+        if exc is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self.trace.spans.append(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the span for exporters"""
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(((self.end or time.time()) - self.start) * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Span returned when the current request is not sampled"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """All spans recorded for one sampled request"""
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class StdoutExporter:
+    """Write one JSON line per trace to stdout"""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        sys.stdout.write(json.dumps({"trace": spans}, default=str) + "\n")
+        sys.stdout.flush()
+
+
+class FileExporter:
+    """Append one JSON line per trace to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"trace": spans}, default=str) + "\n")
+
+
+class Tracer:
+    """Creates spans and ships finished traces to an exporter"""
+
+    def __init__(self, exporter=None, sample_rate: float = 0.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate if exporter is not None else 0.0
+        self._queue: "queue.SimpleQueue[Optional[List[Dict[str, Any]]]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start_trace(self, name: str, **attributes: Any):
+        """
+        Open a root span, sampling the whole trace at this point
+
+        Args:
+            name: Root span name
+            **attributes: Initial attributes
+
+        Returns:
+            Span (or NOOP_SPAN when the trace is not sampled)
+        """
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return NOOP_SPAN
+        return Span(name, Trace(), None, attributes)
+
+    def finish_trace(self, root: Span) -> None:
+        """Queue a finished trace for export"""
+        if isinstance(root, Span):
+            self._ensure_worker()
+            self._queue.put([span.to_dict() for span in root.trace.spans])
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._drain, name="trace-exporter", daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _drain(self) -> None:
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                return
+            try:
+                self.exporter.export(spans)
+            except Exception:
+                pass  # Tracing must never break the application
+
+    def shutdown(self) -> None:
+        """Flush pending traces and stop the exporter thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def _build_exporter():
+    """Create the exporter selected by TRACE_EXPORTER (none, stdout or file)"""
+    if settings.trace_exporter == "stdout":
+        return StdoutExporter()
+    if settings.trace_exporter == "file":
+        os.makedirs(os.path.dirname(os.path.abspath(settings.trace_file)), exist_ok=True)
+        return FileExporter(settings.trace_file)
+    return None
+
+
+tracer = Tracer(_build_exporter(), settings.trace_sample_rate)
+
+
+def span(name: str, **attributes: Any):
+    """
+    Open a child span of the current span
+
+    Usage:
+        with span("sql.get_document") as s:
+            ...
+            s.set_attribute("rows", 1)
+
+    Args:
+        name: Span name
+        **attributes: Initial attributes
+
+    Returns:
+        Span, or NOOP_SPAN when there is no sampled trace in progress
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(name, parent.trace, parent.span_id, attributes)
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace id of the sampled request in progress, if any"""
+    parent = _current_span.get()
+    return parent.trace.trace_id if parent is not None else None
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span per request"""
+
+    def __init__(self, app, tracer_instance: Optional[Tracer] = None):
+        self.app = app
+        self.tracer = tracer_instance or tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root = self.tracer.start_trace("http.request", method=scope["method"], path=scope["path"])
+        if root is NOOP_SPAN:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("status_code", message["status"])
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-trace-id", root.trace.trace_id.encode())
+                ]
+            await send(message)
+
+        try:
+            with root:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    route = scope.get("route")
+                    root.set_attribute("route", getattr(route, "path", "unmatched"))
+        finally:
+            self.tracer.finish_trace(root)
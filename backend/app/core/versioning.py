@@ -0,0 +1,79 @@
+"""
+Compact deltas between document versions
+
+Text is split into sentence-sized tokens (up to and including each ".",
+or newline), so a one-sentence amendment costs one token instead of a
+whole paragraph. A delta is a list of operations rebuilding a target text
+from a base text -- copy n tokens from the base, skip n base tokens, or
+insert literal tokens -- serialised as JSON and zlib-compressed.
+"""
+import difflib
+import json
+import re
+import zlib
+from typing import Any, Dict, List
+
+_TOKEN = re.compile(r"[^.\n]*[.\n]|[^.\n]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Sentence-sized tokens that concatenate back to the text"""
+    return _TOKEN.findall(text)
+
+
+def make_delta(base: str, target: str) -> bytes:
+    """
+    Compressed delta that rebuilds target from base
+
+    Args:
+        base: Text the delta is applied to
+        target: Text the delta produces
+
+    Returns:
+        zlib-compressed JSON operations
+    """
+    base_tokens, target_tokens = tokenize(base), tokenize(target)
+    ops: List[Any] = []
+    matcher = difflib.SequenceMatcher(None, base_tokens, target_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(i2 - i1)
+        else:
+            if i2 > i1:
+                ops.append(-(i2 - i1))
+            if j2 > j1:
+                ops.append("".join(target_tokens[j1:j2]))
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode())
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+    """Rebuild the target text of a delta from its base"""
+    tokens = tokenize(base)
+    position = 0
+    parts: List[str] = []
+    for op in json.loads(zlib.decompress(delta)):
+        if isinstance(op, str):
+            parts.append(op)
+        elif op >= 0:
+            parts.extend(tokens[position:position + op])
+            position += op
+        else:
+            position -= op
+    return "".join(parts)
+
+
+def diff_texts(old: str, new: str, old_label: str = "old", new_label: str = "new") -> Dict[str, Any]:
+    """
+    Unified diff of two versions, one sentence per line
+
+    Returns:
+        {"diff": unified diff text, "added": sentences added, "removed": sentences removed}
+    """
+    old_lines = [token.strip() for token in tokenize(old) if token.strip()]
+    new_lines = [token.strip() for token in tokenize(new) if token.strip()]
+    lines = list(difflib.unified_diff(old_lines, new_lines, old_label, new_label, lineterm=""))
+    return {
+        "diff": "\n".join(lines),
+        "added": sum(1 for line in lines[2:] if line.startswith("+")),
+        "removed": sum(1 for line in lines[2:] if line.startswith("-")),
+    }
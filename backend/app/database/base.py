@@ -0,0 +1,499 @@
+"""
+Storage interfaces shared by the document and graph backends
+
+DocumentStore is implemented by the pgvector DatabaseManager and the
+in-memory store; GraphStore by the Neo4j GraphManager and the in-memory
+graph. Routers depend only on these interfaces.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from app.core.admission import embedding_slot
+from app.core.config import settings
+from app.core.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_SECONDS
+from app.core.tracing import span
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Lightweight model
+EMBEDDING_DIMENSIONS = 384
+
+
+def copy_document(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Copy a document dict deeply enough for callers to mutate it (tags is the only nested value)"""
+    return dict(doc, tags=list(doc["tags"])) if doc is not None else None
+
+
+def copy_documents(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy a list of document dicts (see copy_document)"""
+    return [dict(doc, tags=list(doc["tags"])) for doc in documents]
+
+
+# (ids, float32 vectors of shape (len(ids), dimensions), ISO updated_at per id)
+VectorBatch = Tuple[List[str], Any, List[str]]
+
+
+class DocumentStore(ABC):
+    """Document storage with embedding-based similarity search"""
+
+    def __init__(self):
+        self.model_name = EMBEDDING_MODEL
+        self._model = None
+
+    @property
+    def model(self):
+        """SentenceTransformer model loaded on first use, or the embedding sidecar client when EMBEDDING_SOCKET is set"""
+        if self._model is None:
+            if settings.embedding_socket:
+                from app.core.embedding_service import EmbeddingClient
+                self._model = EmbeddingClient(settings.embedding_socket, settings.embedding_socket_timeout_s)
+            else:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @model.setter
+    def model(self, value):
+        self._model = value
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether connect() has completed successfully"""
+        return True
+
+    @property
+    def search_mode(self) -> str:
+        """How search_by_vector ranks: "exact", or the quantization used for candidates"""
+        return "exact"
+
+    def generate_embedding(self, text: str) -> List[float]:
+        """Generate embedding for text"""
+        EMBEDDING_BATCH_SIZE.observe(1)
+        with span("embedding.encode", batch_size=1), EMBEDDING_SECONDS.time():
+            return self.model.encode(text).tolist()
+
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts in one batched model call"""
+        if not texts:
+            return []
+        EMBEDDING_BATCH_SIZE.observe(len(texts))
+        with span("embedding.encode", batch_size=len(texts)), EMBEDDING_SECONDS.time():
+            return self.model.encode(texts).tolist()
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        generate_embedding for code on the event loop
+
+        The sidecar client is awaited; the in-process model runs on a worker
+        thread, so other requests keep running (and queue for admission
+        slots) while it computes.
+        """
+        EMBEDDING_BATCH_SIZE.observe(1)
+        # Only the model call holds the request's admission slot
+        async with embedding_slot():
+            with span("embedding.encode", batch_size=1), EMBEDDING_SECONDS.time():
+                return (await self._encode(text)).tolist()
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """generate_embeddings for code on the event loop"""
+        if not texts:
+            return []
+        EMBEDDING_BATCH_SIZE.observe(len(texts))
+        async with embedding_slot():
+            with span("embedding.encode", batch_size=len(texts)), EMBEDDING_SECONDS.time():
+                return (await self._encode(texts)).tolist()
+
+    async def _encode(self, texts: Any) -> Any:
+        encode = getattr(self.model, "aencode", None)
+        if encode is not None:
+            return await encode(texts)
+        # Off the event loop, so the admission slot bounds concurrent encodes
+        return await asyncio.to_thread(self.model.encode, texts)
+
+    async def document_embedding(self, doc: Dict[str, Any]) -> List[float]:
+        """
+        Embedding stored for a document
+
+        Args:
+            doc: Dict with "title" and "content", and optionally a precomputed
+                "vector" (e.g. assembled from chunk embeddings by a layer above)
+
+        Returns:
+            The precomputed vector, or the embedding of title and content
+        """
+        if doc.get("vector") is not None:
+            return doc["vector"]
+        return await self.embed(f"{doc['title']} {doc['content']}")
+
+    @abstractmethod
+    async def connect(self) -> bool:
+        """Prepare the backend (connections, schema); returns True on success"""
+
+    @abstractmethod
+    async def create_document(self, doc_data: Dict[str, Any]) -> str:
+        """Store a document with its embedding and return its new ID"""
+
+    @abstractmethod
+    async def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get document by ID"""
+
+    @abstractmethod
+    async def list_documents(
+        self, skip: int = 0, limit: int = 100, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """List documents, newest first, with optional category filter"""
+
+    @abstractmethod
+    async def update_document(self, doc_id: str, update_data: Dict[str, Any]) -> bool:
+        """Update fields (re-embedding on title/content change); False if missing"""
+
+    @abstractmethod
+    async def delete_document(self, doc_id: str) -> bool:
+        """Delete document; False if missing"""
+
+    @abstractmethod
+    async def get_vectors(self, doc_ids: Sequence[str]) -> Dict[str, List[float]]:
+        """Stored embeddings by document ID (missing IDs are left out)"""
+
+    @abstractmethod
+    def iter_vectors(self, batch_size: int = 1000) -> AsyncIterator[VectorBatch]:
+        """Stream every stored embedding in batches, without the document bodies"""
+
+    @abstractmethod
+    async def search_by_vector(
+        self, query_vector: List[float], limit: int = 10, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Nearest documents to a query vector by cosine distance
+
+        Returns:
+            Documents ordered by ascending "distance" (included in each dict)
+        """
+
+    async def search_by_vectors(
+        self, queries: Sequence[Tuple[List[float], int, Optional[str]]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run several vector searches; backends override this to use one round trip
+
+        Args:
+            queries: (query_vector, limit, category) per search
+
+        Returns:
+            One result list per query, in order, each as from search_by_vector
+        """
+        return [await self.search_by_vector(vector, limit, category) for vector, limit, category in queries]
+
+    async def search_documents(
+        self, query: str, limit: int = 10, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Vector search documents"""
+        query_vector = await self.embed(query)
+        documents = await self.search_by_vector(query_vector, limit, category)
+        for doc in documents:
+            # Remove distance from response
+            doc.pop("distance", None)
+        return documents
+
+    async def similar_documents(
+        self, doc_ids: Sequence[str], limit: int = 10, category: Optional[str] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Documents most similar to existing ones, searched with their stored vectors
+
+        No embedding is computed. Backends may override this to search in
+        one round trip.
+
+        Args:
+            doc_ids: Source document IDs
+            limit: Maximum number of results per source
+            category: Optional category filter
+
+        Returns:
+            Results (with "distance") per source ID, each excluding the source
+            itself; IDs that do not exist are left out
+        """
+        vectors = await self.get_vectors(doc_ids)
+        sources = [doc_id for doc_id in dict.fromkeys(doc_ids) if doc_id in vectors]
+        # One extra result in case the source itself ranks among the nearest
+        results = await self.search_by_vectors([(vectors[doc_id], limit + 1, category) for doc_id in sources])
+        return {
+            doc_id: [doc for doc in documents if doc["id"] != doc_id][:limit]
+            for doc_id, documents in zip(sources, results)
+        }
+
+    async def search_documents_batch(
+        self, queries: Sequence[Tuple[str, int, Optional[str]]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Vector search several queries with one batched embedding call
+
+        Args:
+            queries: (query text, limit, category) per search
+
+        Returns:
+            One result list per query, in order
+        """
+        vectors = await self.embed_many([text for text, _, _ in queries])
+        results = await self.search_by_vectors([
+            (vector, limit, category) for vector, (_, limit, category) in zip(vectors, queries)
+        ])
+        for documents in results:
+            for doc in documents:
+                doc.pop("distance", None)
+        return results
+
+
+class GraphStore(ABC):
+    """Document nodes and typed relationships between them"""
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether connect() has completed successfully"""
+        return True
+
+    @abstractmethod
+    async def connect(self) -> bool:
+        """Prepare the backend; returns True on success"""
+
+    async def close(self) -> None:
+        """Release backend resources"""
+
+    @abstractmethod
+    async def create_document_node(
+        self, document_id: str, title: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Create or update a document node"""
+
+    @abstractmethod
+    async def create_relationship(
+        self, source_id: str, target_id: str, rel_type: str,
+        confidence: float = 0.0, metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Create a relationship between two existing nodes"""
+
+    @abstractmethod
+    async def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Get a document node's properties"""
+
+    @abstractmethod
+    async def get_related_documents(
+        self, document_id: str, rel_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Outgoing neighbours as [{"related": node, "r": relationship}]"""
+
+    @abstractmethod
+    async def get_neighbourhoods(
+        self,
+        document_ids: Sequence[str],
+        rel_types: Optional[Sequence[str]] = None,
+        depth: int = 1,
+        direction: str = "both",
+        limit: int = 10,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Neighbourhoods of several documents in one call
+
+        Each neighbour appears once per source, through its best path: highest
+        product of edge confidences, then fewest hops.
+
+        Args:
+            document_ids: Source document IDs
+            rel_types: Relationship types to follow (all types if empty)
+            depth: Maximum number of hops
+            direction: "out", "in" or "both"
+            limit: Neighbours kept per source, best paths first
+
+        Returns:
+            {source_id: [{"node", "rel_types", "depth", "confidence"}]}; sources
+            without neighbours may be missing
+        """
+
+    @abstractmethod
+    async def search_documents(
+        self, filters: Dict[str, Any], limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Nodes whose properties equal all filters"""
+
+    @abstractmethod
+    async def replace_relationships(
+        self, rel_type: str, origin: str, source_ids: Sequence[str], edges: Sequence[Dict[str, Any]]
+    ) -> int:
+        """
+        Replace the outgoing edges a batch job owns for a set of sources
+
+        Existing rel_type edges of each source that carry the same origin are
+        deleted, then the given edges are created with that origin; edges
+        created by other means are left alone.
+
+        Args:
+            rel_type: Relationship type (e.g. RELATED_TO)
+            origin: Name of the producer, stored on each edge
+            source_ids: Sources whose edges are replaced
+            edges: Dicts with "source", "target" and "confidence"
+
+        Returns:
+            Number of edges created (edges to missing nodes are skipped)
+        """
+
+    @abstractmethod
+    async def relationship_sources(self, rel_type: str, origin: str, target_ids: Sequence[str]) -> List[str]:
+        """IDs of the nodes with a rel_type edge tagged with origin to any of target_ids"""
+
+    @abstractmethod
+    async def delete_document_node(self, document_id: str) -> bool:
+        """Delete a node and all its relationships"""
+
+
+class DocumentStoreProxy(DocumentStore):
+    """
+    DocumentStore delegating every call to a wrapped store
+
+    Base class for layers (caching, coalescing) that change a few methods;
+    search_documents is inherited, so it goes through the layer's own
+    embed and search_by_vector.
+    """
+
+    def __init__(self, store: DocumentStore):
+        self.store = store
+
+    def __getattr__(self, name: str) -> Any:
+        # Backend-specific attributes (engine, db_uri, table, ...) come from the wrapped store
+        if name == "store":
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+    @property
+    def model(self):
+        return self.store.model
+
+    @model.setter
+    def model(self, value):
+        self.store.model = value
+
+    @property
+    def is_connected(self) -> bool:
+        return self.store.is_connected
+
+    @property
+    def search_mode(self) -> str:
+        return self.store.search_mode
+
+    def generate_embedding(self, text: str) -> List[float]:
+        return self.store.generate_embedding(text)
+
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self.store.generate_embeddings(texts)
+
+    async def embed(self, text: str) -> List[float]:
+        return await self.store.embed(text)
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        return await self.store.embed_many(texts)
+
+    async def connect(self) -> bool:
+        return await self.store.connect()
+
+    async def create_document(self, doc_data: Dict[str, Any]) -> str:
+        return await self.store.create_document(doc_data)
+
+    async def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return await self.store.get_document(doc_id)
+
+    async def list_documents(
+        self, skip: int = 0, limit: int = 100, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return await self.store.list_documents(skip, limit, category)
+
+    async def update_document(self, doc_id: str, update_data: Dict[str, Any]) -> bool:
+        return await self.store.update_document(doc_id, update_data)
+
+    async def delete_document(self, doc_id: str) -> bool:
+        return await self.store.delete_document(doc_id)
+
+    async def search_by_vector(
+        self, query_vector: List[float], limit: int = 10, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return await self.store.search_by_vector(query_vector, limit, category)
+
+    async def search_by_vectors(
+        self, queries: Sequence[Tuple[List[float], int, Optional[str]]]
+    ) -> List[List[Dict[str, Any]]]:
+        return await self.store.search_by_vectors(queries)
+
+    async def get_vectors(self, doc_ids: Sequence[str]) -> Dict[str, List[float]]:
+        return await self.store.get_vectors(doc_ids)
+
+    def iter_vectors(self, batch_size: int = 1000) -> AsyncIterator[VectorBatch]:
+        return self.store.iter_vectors(batch_size)
+
+    async def similar_documents(
+        self, doc_ids: Sequence[str], limit: int = 10, category: Optional[str] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        return await self.store.similar_documents(doc_ids, limit, category)
+
+
+class GraphStoreProxy(GraphStore):
+    """GraphStore delegating every call to a wrapped store"""
+
+    def __init__(self, store: GraphStore):
+        self.store = store
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "store":
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+    @property
+    def is_connected(self) -> bool:
+        return self.store.is_connected
+
+    async def connect(self) -> bool:
+        return await self.store.connect()
+
+    async def close(self) -> None:
+        await self.store.close()
+
+    async def create_document_node(
+        self, document_id: str, title: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        return await self.store.create_document_node(document_id, title, metadata)
+
+    async def create_relationship(
+        self, source_id: str, target_id: str, rel_type: str,
+        confidence: float = 0.0, metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        return await self.store.create_relationship(source_id, target_id, rel_type, confidence, metadata)
+
+    async def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        return await self.store.get_document(document_id)
+
+    async def get_related_documents(
+        self, document_id: str, rel_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return await self.store.get_related_documents(document_id, rel_type)
+
+    async def get_neighbourhoods(
+        self,
+        document_ids: Sequence[str],
+        rel_types: Optional[Sequence[str]] = None,
+        depth: int = 1,
+        direction: str = "both",
+        limit: int = 10,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        return await self.store.get_neighbourhoods(document_ids, rel_types, depth, direction, limit)
+
+    async def search_documents(
+        self, filters: Dict[str, Any], limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        return await self.store.search_documents(filters, limit)
+
+    async def replace_relationships(
+        self, rel_type: str, origin: str, source_ids: Sequence[str], edges: Sequence[Dict[str, Any]]
+    ) -> int:
+        return await self.store.replace_relationships(rel_type, origin, source_ids, edges)
+
+    async def relationship_sources(self, rel_type: str, origin: str, target_ids: Sequence[str]) -> List[str]:
+        return await self.store.relationship_sources(rel_type, origin, target_ids)
+
+    async def delete_document_node(self, document_id: str) -> bool:
+        return await self.store.delete_document_node(document_id)
@@ -0,0 +1,223 @@
+"""
+Search result caching in front of a document store
+
+CachedDocumentStore wraps any DocumentStore. Vector searches are cached by
+(query embedding hash, category, limit, search mode); writes invalidate through
+generation counters scoped per category, plus an "all" scope used by
+unfiltered searches. A write to category "legal" therefore leaves cached
+searches filtered to other categories intact.
+
+CachedGraphStore wraps any GraphStore with a per-process read-through cache
+of nodes (get_document) and 1-hop neighbourhoods (get_related_documents).
+Entries are tagged with the nodes and outgoing edges they were built from,
+and graph writes through this layer drop exactly those entries. Writes made
+by other processes are only seen once entries expire (GRAPH_CACHE_TTL_S).
+"""
+import copy
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.cache import GenerationalCache, TaggedCache, vector_hash
+from app.core.logging import get_logger
+from app.database.base import DocumentStore, DocumentStoreProxy, GraphStore, GraphStoreProxy, copy_documents
+
+logger = get_logger(__name__)
+
+ALL_SCOPE = "all"
+
+
+def category_scope(category: Optional[str]) -> str:
+    """Invalidation scope a search with this category filter depends on"""
+    return ALL_SCOPE if category is None else f"category:{category}"
+
+
+class CachedDocumentStore(DocumentStoreProxy):
+    """DocumentStore layer caching vector search results"""
+
+    def __init__(self, store: DocumentStore, cache: GenerationalCache):
+        """
+        Args:
+            store: Document store doing the actual work
+            cache: Cache holding search results
+        """
+        super().__init__(store)
+        self.cache = cache
+
+    async def _invalidate(self, *categories: Optional[str]) -> None:
+        scopes = {ALL_SCOPE} | {category_scope(c) for c in categories if c is not None}
+        try:
+            await self.cache.invalidate(scopes)
+        except Exception:
+            logger.exception("Error invalidating search cache")
+
+    async def create_document(self, doc_data: Dict[str, Any]) -> str:
+        doc_id = await self.store.create_document(doc_data)
+        await self._invalidate(doc_data.get("category", "general"))
+        return doc_id
+
+    async def update_document(self, doc_id: str, update_data: Dict[str, Any]) -> bool:
+        existing = await self.store.get_document(doc_id)
+        updated = await self.store.update_document(doc_id, update_data)
+        if updated:
+            # Results filtered to the old and the new category may both change
+            await self._invalidate(existing["category"] if existing else None, update_data.get("category"))
+        return updated
+
+    async def delete_document(self, doc_id: str) -> bool:
+        existing = await self.store.get_document(doc_id)
+        deleted = await self.store.delete_document(doc_id)
+        if deleted:
+            await self._invalidate(existing["category"] if existing else None)
+        return deleted
+
+    async def search_by_vector(
+        self, query_vector: List[float], limit: int = 10, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Cached vector search
+
+        Args:
+            query_vector: Query embedding
+            limit: Maximum number of results
+            category: Optional category filter
+
+        Returns:
+            Documents with their distance, possibly served from the cache
+        """
+        try:
+            key = await self.cache.key(category_scope(category), self.store.search_mode, limit, vector_hash(query_vector))
+            cached = await self.cache.get(key)
+        except Exception:
+            logger.exception("Error reading search cache")
+            return await self.store.search_by_vector(query_vector, limit, category)
+        if cached is not None:
+            return copy_documents(cached)
+
+        documents = await self.store.search_by_vector(query_vector, limit, category)
+        # Stores return [] on errors too, so empty results are not cached
+        if documents:
+            try:
+                await self.cache.set(key, copy_documents(documents))
+            except Exception:
+                logger.exception("Error writing search cache")
+        return documents
+
+    async def search_by_vectors(
+        self, queries: Sequence[Tuple[List[float], int, Optional[str]]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Cached batch of vector searches; only the misses reach the store, in one call
+
+        Args:
+            queries: (query_vector, limit, category) per search
+
+        Returns:
+            One result list per query, in order
+        """
+        try:
+            keys = [
+                await self.cache.key(category_scope(category), self.store.search_mode, limit, vector_hash(vector))
+                for vector, limit, category in queries
+            ]
+            cached = [await self.cache.get(key) for key in keys]
+        except Exception:
+            logger.exception("Error reading search cache")
+            return await self.store.search_by_vectors(queries)
+
+        results: List[Optional[List[Dict[str, Any]]]] = [
+            copy_documents(hit) if hit is not None else None for hit in cached
+        ]
+        misses = [i for i, hit in enumerate(cached) if hit is None]
+        if misses:
+            found = await self.store.search_by_vectors([queries[i] for i in misses])
+            for i, documents in zip(misses, found):
+                results[i] = documents
+                if documents:
+                    try:
+                        await self.cache.set(keys[i], copy_documents(documents))
+                    except Exception:
+                        logger.exception("Error writing search cache")
+        return results
+
+
+def node_tag(document_id: str) -> str:
+    """Tag of entries embedding a node's properties"""
+    return f"node:{document_id}"
+
+
+def edges_tag(document_id: str) -> str:
+    """Tag of entries built from a node's outgoing edges"""
+    return f"out:{document_id}"
+
+
+class CachedGraphStore(GraphStoreProxy):
+    """GraphStore layer caching node and 1-hop neighbourhood lookups"""
+
+    def __init__(self, store: GraphStore, cache: TaggedCache):
+        """
+        Args:
+            store: Graph store doing the actual work
+            cache: In-process cache holding nodes and neighbour lists
+        """
+        super().__init__(store)
+        self.cache = cache
+
+    async def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        key = f"node:{document_id}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        epoch = self.cache.epoch
+        node = await self.store.get_document(document_id)
+        if node is not None:
+            self.cache.set(key, copy.deepcopy(node), [node_tag(document_id)], epoch)
+        return node
+
+    async def get_related_documents(
+        self, document_id: str, rel_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        key = f"related:{document_id}:{rel_type or '*'}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        epoch = self.cache.epoch
+        related = await self.store.get_related_documents(document_id, rel_type)
+        # Each neighbour's properties are embedded, so its node updates drop this entry too
+        tags = [edges_tag(document_id)] + [
+            node_tag(entry["related"]["id"]) for entry in related if entry.get("related", {}).get("id")
+        ]
+        self.cache.set(key, copy.deepcopy(related), tags, epoch)
+        return related
+
+    async def create_document_node(
+        self, document_id: str, title: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        try:
+            return await self.store.create_document_node(document_id, title, metadata)
+        finally:
+            self.cache.invalidate([node_tag(document_id)])
+
+    async def create_relationship(
+        self, source_id: str, target_id: str, rel_type: str,
+        confidence: float = 0.0, metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        try:
+            return await self.store.create_relationship(source_id, target_id, rel_type, confidence, metadata)
+        finally:
+            self.cache.invalidate([edges_tag(source_id)])
+
+    async def replace_relationships(
+        self, rel_type: str, origin: str, source_ids: Sequence[str], edges: Sequence[Dict[str, Any]]
+    ) -> int:
+        try:
+            return await self.store.replace_relationships(rel_type, origin, source_ids, edges)
+        finally:
+            self.cache.invalidate(
+                {edges_tag(source_id) for source_id in source_ids} | {edges_tag(edge["source"]) for edge in edges}
+            )
+
+    async def delete_document_node(self, document_id: str) -> bool:
+        try:
+            return await self.store.delete_document_node(document_id)
+        finally:
+            # Neighbour lists of nodes pointing at it carry its node tag
+            self.cache.invalidate([node_tag(document_id), edges_tag(document_id)])
@@ -0,0 +1,83 @@
+"""
+Single-flight layers for the document and graph stores
+
+Identical concurrent reads (the same search text, document or neighbourhood
+requested by many users at once) share one in-flight call, including the
+query embedding. Counts are exported as coalesced_calls_total.
+
+Writes through the document layer detach the reads in flight, so a request
+reading back what it just wrote never joins a read that started before the
+write. Reads that must see the request's writes (see app.core.consistency)
+only join reads routed to the primary.
+"""
+from typing import Any, Dict, List, Optional
+
+from app.core.consistency import primary_reads_required
+from app.core.singleflight import SingleFlight
+from app.database.base import (
+    DocumentStore,
+    DocumentStoreProxy,
+    GraphStore,
+    GraphStoreProxy,
+    copy_document,
+    copy_documents,
+)
+
+
+class CoalescingDocumentStore(DocumentStoreProxy):
+    """Coalesces concurrent identical search_documents and get_document calls"""
+
+    def __init__(self, store: DocumentStore):
+        super().__init__(store)
+        self._searches = SingleFlight("search_documents", copier=copy_documents)
+        self._gets = SingleFlight("get_document", copier=copy_document)
+
+    async def search_documents(
+        self, query: str, limit: int = 10, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        # Embeds through this layer, then searches through the wrapped layers
+        search = super().search_documents
+        key = (query, limit, category, primary_reads_required())
+        return await self._searches.do(key, lambda: search(query, limit, category))
+
+    async def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        key = (doc_id, primary_reads_required())
+        return await self._gets.do(key, lambda: self.store.get_document(doc_id))
+
+    async def create_document(self, doc_data: Dict[str, Any]) -> str:
+        doc_id = await self.store.create_document(doc_data)
+        self._fence(doc_id)
+        return doc_id
+
+    async def update_document(self, doc_id: str, update_data: Dict[str, Any]) -> bool:
+        try:
+            return await self.store.update_document(doc_id, update_data)
+        finally:
+            self._fence(doc_id)
+
+    async def delete_document(self, doc_id: str) -> bool:
+        try:
+            return await self.store.delete_document(doc_id)
+        finally:
+            self._fence(doc_id)
+
+    def _fence(self, doc_id: str) -> None:
+        """Detach in-flight reads that may predate a write to doc_id"""
+        for primary in (False, True):
+            self._gets.forget((doc_id, primary))
+        self._searches.clear()
+
+
+class CoalescingGraphStore(GraphStoreProxy):
+    """Coalesces concurrent identical get_related_documents calls"""
+
+    def __init__(self, store: GraphStore):
+        super().__init__(store)
+        self._related = SingleFlight("get_related_documents")
+
+    async def get_related_documents(
+        self, document_id: str, rel_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return await self._related.do(
+            (document_id, rel_type), lambda: self.store.get_related_documents(document_id, rel_type)
+        )
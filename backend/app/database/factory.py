@@ -0,0 +1,170 @@
+"""
+Storage backend selection
+
+The application-wide document and graph stores are created here from
+VECTOR_BACKEND and GRAPH_BACKEND, so the rest of the app only depends on
+the DocumentStore and GraphStore interfaces.
+"""
+import logging
+import os
+from typing import Optional
+
+from app.core.cache import GenerationalCache, TaggedCache, create_cache_backend
+from app.core.config import settings
+from app.core.dedup import DuplicateDetector
+from app.core.logging import get_logger, log_event
+from app.core.projection import load_projection
+from app.database.base import DocumentStore, GraphStore
+
+logger = get_logger(__name__)
+
+# Backends whose version history and duplicate signatures can live next to the documents
+# (memory keeps them in process, like its documents); LanceDB has no transactions to keep
+# them consistent with the table, so both features are unavailable there
+SIDE_TABLE_BACKENDS = ("postgres", "memory")
+
+
+def create_document_store(backend: str) -> DocumentStore:
+    """
+    Create a document store
+
+    Args:
+        backend: "postgres", "lancedb" or "memory"
+
+    Returns:
+        Unconnected document store
+    """
+    # Candidate search options shared by the postgres and memory stores
+    candidates = {
+        "quantization": settings.vector_quantization,
+        "rerank_factor": settings.quantization_rerank_factor,
+        "projection": load_projection(settings.reduced_projection_path, settings.reduced_dimensions),
+    }
+    if backend == "memory":
+        from app.database.memory import InMemoryDocumentStore
+        return InMemoryDocumentStore(**candidates)
+    if backend == "lancedb":
+        from app.database.lance import LanceDocumentStore
+        return LanceDocumentStore()
+    if backend == "postgres" and settings.postgres_shard_uris:
+        from app.database.sharded import ShardedDocumentStore, ShardRouter
+        from app.database.vector import DatabaseManager
+        shards = [DatabaseManager(uri, **candidates) for uri in settings.postgres_shard_uris]
+        router = ShardRouter(len(shards), settings.shard_strategy, settings.shard_regions)
+        return ShardedDocumentStore(shards, router, settings.shard_previous_count)
+    if backend == "postgres":
+        from app.database.replicas import ReplicaSet
+        from app.database.vector import DatabaseManager
+        candidates["replicas"] = ReplicaSet(
+            settings.postgres_replica_uris, settings.replica_max_lag_s, settings.replica_check_interval_s
+        )
+        # Default connection string; overridden by POSTGRES_URI in production
+        uri = os.getenv("POSTGRES_URI")
+        return DatabaseManager(uri, **candidates) if uri else DatabaseManager(**candidates)
+    raise ValueError(f"Unknown vector backend: {backend}")
+
+
+def create_graph_store(backend: str) -> GraphStore:
+    """
+    Create a graph store
+
+    Args:
+        backend: "neo4j" or "memory"
+
+    Returns:
+        Unconnected graph store
+    """
+    if backend == "memory":
+        from app.database.memory import InMemoryGraphStore
+        return InMemoryGraphStore()
+    if backend == "neo4j":
+        from app.database.graph import GraphManager
+        return GraphManager()
+    raise ValueError(f"Unknown graph backend: {backend}")
+
+
+def create_search_cache() -> Optional[GenerationalCache]:
+    """Search result cache from CACHE_BACKEND, or None when caching is disabled"""
+    backend = create_cache_backend(settings.cache_backend, settings.search_cache_max_entries)
+    if backend is None:
+        return None
+    return GenerationalCache("search", backend, settings.search_cache_ttl_s)
+
+
+def create_version_store(store: DocumentStore):
+    """
+    Version store matching the document store backend
+
+    Raises:
+        ValueError: The backend cannot keep version history
+    """
+    from app.database.versions import MemoryVersionStore, PostgresVersionStore
+    if settings.vector_backend not in SIDE_TABLE_BACKENDS:
+        raise ValueError(f"VERSIONING_ENABLED is not supported with VECTOR_BACKEND={settings.vector_backend}")
+    if settings.vector_backend == "postgres" and settings.postgres_shard_uris:
+        from app.database.sharded import ShardedVersionStore
+        return ShardedVersionStore([PostgresVersionStore(shard) for shard in store.shards], store.router)
+    if settings.vector_backend == "postgres":
+        return PostgresVersionStore(store)
+    return MemoryVersionStore()
+
+
+def build_document_store() -> DocumentStore:
+    """Configured document store with its versioning, caching and coalescing layers"""
+    store = create_document_store(settings.vector_backend)
+    if settings.versioning_enabled:
+        from app.database.versions import VersionedDocumentStore
+        store = VersionedDocumentStore(store, create_version_store(store))
+    if search_cache is not None:
+        from app.database.cached import CachedDocumentStore
+        store = CachedDocumentStore(store, search_cache)
+    if settings.single_flight_enabled:
+        from app.database.coalescing import CoalescingDocumentStore
+        # Outermost, so concurrent identical searches also share one cache miss
+        store = CoalescingDocumentStore(store)
+    return store
+
+
+def create_graph_cache() -> Optional[TaggedCache]:
+    """Graph node/neighbourhood cache, or None when GRAPH_CACHE_MAX_ENTRIES is 0"""
+    if settings.graph_cache_max_entries <= 0:
+        return None
+    return TaggedCache("graph", settings.graph_cache_max_entries, settings.graph_cache_ttl_s)
+
+
+def build_graph_store() -> GraphStore:
+    """Configured graph store with its caching and coalescing layers"""
+    store = create_graph_store(settings.graph_backend)
+    if graph_cache is not None:
+        from app.database.cached import CachedGraphStore
+        store = CachedGraphStore(store, graph_cache)
+    if settings.single_flight_enabled:
+        from app.database.coalescing import CoalescingGraphStore
+        store = CoalescingGraphStore(store)
+    return store
+
+
+def build_duplicate_detector(store: DocumentStore) -> Optional[DuplicateDetector]:
+    """Near-duplicate detector for the configured backend, or None when DEDUP_ENABLED is off"""
+    if not settings.dedup_enabled:
+        return None
+    if settings.vector_backend not in SIDE_TABLE_BACKENDS:
+        log_event(logger, logging.WARNING, "Near-duplicate detection is off for this backend",
+                  backend=settings.vector_backend)
+        return None
+    from app.database.signatures import MemorySignatureIndex, PostgresSignatureIndex
+    if settings.vector_backend == "postgres" and settings.postgres_shard_uris:
+        from app.database.sharded import ShardedSignatureIndex
+        indexes = [PostgresSignatureIndex(shard) for shard in store.shards]
+        return DuplicateDetector(ShardedSignatureIndex(indexes, store.router))
+    if settings.vector_backend == "postgres":
+        return DuplicateDetector(PostgresSignatureIndex(store))
+    return DuplicateDetector(MemorySignatureIndex())
+
+
+# Singleton instances
+search_cache = create_search_cache()
+graph_cache = create_graph_cache()
+db_manager = build_document_store()
+graph_manager = build_graph_store()
+duplicate_detector = build_duplicate_detector(db_manager)
@@ -2,15 +2,171 @@
 Neo4j graph database manager for document relationships
 """
 import os
+import re
+import time
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Sequence, Tuple, Union
 
 from neo4j import AsyncGraphDatabase
 from neo4j.exceptions import Neo4jError
 
+from app.core.logging import get_logger
+from app.core.metrics import NEO4J_QUERY_SECONDS
+from app.core.slow_queries import slow_query_log
+from app.core.tracing import span
+from app.database.base import GraphStore
 
-class GraphManager:
+logger = get_logger(__name__)
+
+# Relationship types are interpolated into Cypher, so only plain labels are accepted
+RELATIONSHIP_TYPE_PATTERN = re.compile(r"^[A-Z][A-Z0-9_]*$")
+# Arrow ends around a relationship pattern for each traversal direction
+DIRECTION_ARROWS = {"out": ("-", "->"), "in": ("<-", "-"), "both": ("-", "-")}
+
+
+def build_related_query(rel_type: Optional[str] = None) -> str:
+    """
+    Build the Cypher query for outgoing relationships of a document
+    
+    Args:
+        rel_type: Optional relationship type filter
+        
+    Returns:
+        Cypher query string (expects $id)
+    """
+    rel_filter = f":{rel_type}" if rel_type else ""
+    
+    return f"""
+    MATCH (d:Document {{id: $id}})-[r{rel_filter}]->(related)
+    RETURN related, r
+    """
+
+
+def build_metadata_search_query(filters: Dict[str, Any], limit: int = 10) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the Cypher query and parameters for a metadata search
+    
+    Args:
+        filters: Dictionary of metadata filters
+        limit: Maximum number of results
+        
+    Returns:
+        Tuple of (query, params)
+    """
+    conditions = []
+    params = {}
+    
+    for key, value in filters.items():
+        conditions.append(f"d.{key} = ${key}")
+        params[key] = value
+    
+    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    
+    query = f"""
+    MATCH (d:Document)
+    WHERE {where_clause}
+    RETURN d
+    LIMIT {limit}
+    """
+    return query, params
+
+
+def build_replace_relationships_queries(rel_type: str) -> Tuple[str, str]:
+    """
+    Build the Cypher queries replacing a batch job's outgoing edges
+
+    Args:
+        rel_type: Relationship type
+
+    Returns:
+        Tuple of (delete query expecting $source_ids and $origin,
+        create query expecting $edges and $origin)
+    """
+    delete_query = f"""
+    UNWIND $source_ids AS source_id
+    MATCH (:Document {{id: source_id}})-[r:{rel_type} {{origin: $origin}}]->()
+    DELETE r
+    """
+    create_query = f"""
+    UNWIND $edges AS edge
+    MATCH (source:Document {{id: edge.source}})
+    MATCH (target:Document {{id: edge.target}})
+    MERGE (source)-[r:{rel_type} {{origin: $origin}}]->(target)
+    SET r.confidence = edge.confidence,
+        r.created_at = datetime()
+    RETURN count(r) AS created
+    """
+    return delete_query, create_query
+
+
+def build_relationship_sources_query(rel_type: str) -> str:
+    """
+    Build the Cypher query for the sources of a batch job's edges into a set of targets
+
+    Args:
+        rel_type: Relationship type
+
+    Returns:
+        Query expecting $target_ids and $origin
+    """
+    return f"""
+    UNWIND $target_ids AS target_id
+    MATCH (source:Document)-[:{rel_type} {{origin: $origin}}]->(:Document {{id: target_id}})
+    RETURN DISTINCT source.id AS id
+    """
+
+
+def build_neighbourhood_query(
+    rel_types: Optional[Sequence[str]] = None, depth: int = 1, direction: str = "both"
+) -> str:
+    """
+    Build the Cypher query for the neighbourhoods of several documents at once
+
+    Each neighbour is reported once per source, through its best path:
+    highest product of edge confidences, then fewest hops.
+
+    Args:
+        rel_types: Relationship types to follow (all types if empty)
+        depth: Maximum number of hops
+        direction: "out", "in" or "both"
+
+    Returns:
+        Cypher query string (expects $ids and $limit, the neighbours kept per source)
+    """
+    rel_types = list(rel_types or [])
+    for rel_type in rel_types:
+        if not RELATIONSHIP_TYPE_PATTERN.match(rel_type):
+            raise ValueError(f"Invalid relationship type: {rel_type}")
+    if direction not in DIRECTION_ARROWS:
+        raise ValueError(f"Invalid direction: {direction}")
+    left, right = DIRECTION_ARROWS[direction]
+    type_filter = ":" + "|".join(rel_types) if rel_types else ""
+
+    return f"""
+    UNWIND $ids AS id
+    MATCH (d:Document {{id: id}}){left}[rels{type_filter}*1..{int(depth)}]{right}(n:Document)
+    WHERE n.id <> id
+    WITH id, n, rels, reduce(c = 1.0, r IN rels | c * coalesce(r.confidence, 0.0)) AS confidence
+    ORDER BY confidence DESC, size(rels)
+    WITH id, n, collect({{rel_types: [r IN rels | type(r)], depth: size(rels), confidence: confidence}})[0] AS best
+    ORDER BY best.confidence DESC, best.depth
+    WITH id, collect({{
+        node: n {{.*, updated_at: toString(n.updated_at)}},
+        rel_types: best.rel_types,
+        depth: best.depth,
+        confidence: best.confidence
+    }})[..$limit] AS neighbours
+    RETURN id AS source, neighbours
+    """
+
+
+def records_to_nodes(records: List[Dict[str, Any]], key: str = "d") -> List[Dict[str, Any]]:
+    """Extract node properties from query records"""
+    return [record[key] for record in records]
+
+
+class GraphManager(GraphStore):
     """Neo4j graph database manager for document relationships"""
     
     def __init__(self, uri: str = None, user: str = None, password: str = None):
@@ -26,6 +182,10 @@ class GraphManager:
         self.user = user or os.getenv("NEO4J_USER", "neo4j")
         self.password = password or os.getenv("NEO4J_PASSWORD", "password")
         self.driver = None
+    
+    @property
+    def is_connected(self) -> bool:
+        return self.driver is not None
         
     async def connect(self) -> bool:
         """
@@ -35,7 +195,7 @@ class GraphManager:
             True if connection successful
         """
         try:
-            print(f"Connecting to Neo4j at {self.uri}")
+            logger.info("Connecting to Neo4j")
             self.driver = AsyncGraphDatabase.driver(
                 self.uri, auth=(self.user, self.password)
             )
@@ -46,7 +206,7 @@ class GraphManager:
             await self._create_schema()
             return True
         except Exception as e:
-            print(f"Neo4j connection error: {e}")
+            logger.error(f"Neo4j connection error: {e}")
             return False
     
     async def close(self) -> None:
@@ -58,19 +218,22 @@ class GraphManager:
         """Create constraints and indexes for the graph schema"""
         # Create constraint on Document.id (unique)
         await self._execute_query(
-            "CREATE CONSTRAINT document_id IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE"
+            "CREATE CONSTRAINT document_id IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE",
+            name="create_schema"
         )
         
         # Create indexes for common query fields
         await self._execute_query(
-            "CREATE INDEX document_region IF NOT EXISTS FOR (d:Document) ON (d.region)"
+            "CREATE INDEX document_region IF NOT EXISTS FOR (d:Document) ON (d.region)",
+            name="create_schema"
         )
         await self._execute_query(
-            "CREATE INDEX document_topic IF NOT EXISTS FOR (d:Document) ON (d.topic)"
+            "CREATE INDEX document_topic IF NOT EXISTS FOR (d:Document) ON (d.topic)",
+            name="create_schema"
         )
     
     async def _execute_query(
-        self, query: str, params: Optional[Dict[str, Any]] = None
+        self, query: str, params: Optional[Dict[str, Any]] = None, name: str = "cypher"
     ) -> List[Dict[str, Any]]:
         """
         Execute a Cypher query
@@ -78,6 +241,7 @@ class GraphManager:
         Args:
             query: Cypher query string
             params: Query parameters
+            name: Stable query name used for metrics
             
         Returns:
             List of query results
@@ -87,13 +251,37 @@ class GraphManager:
             
         params = params or {}
         try:
-            async with self.driver.session() as session:
-                result = await session.run(query, params)
-                return [record.data() for record in await result.fetch_all()]
+            start = time.perf_counter()
+            with span(f"cypher.{name}") as s, NEO4J_QUERY_SECONDS.time(query=name):
+                async with self.driver.session() as session:
+                    result = await session.run(query, params)
+                    records = [record.data() for record in await result.fetch_all()]
+                    s.set_attribute("rows", len(records))
+            slow_query_log.observe(
+                "neo4j", name, query, params, time.perf_counter() - start,
+                explain=lambda: self.profile(query, params),
+            )
+            return records
         except Neo4jError as e:
-            print(f"Neo4j query error: {e}")
+            logger.error(f"Neo4j query error: {e}")
             return []
     
+    async def profile(self, query: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Capture the execution profile of a read query
+        
+        Args:
+            query: Cypher query string
+            params: Query parameters
+            
+        Returns:
+            Profiled plan (operators, rows and db hits per step)
+        """
+        async with self.driver.session() as session:
+            result = await session.run(f"PROFILE {query}", params or {})
+            summary = await result.consume()
+            return summary.profile
+    
     async def create_document_node(
         self, document_id: str, title: str, metadata: Optional[Dict[str, Any]] = None
     ) -> bool:
@@ -122,7 +310,7 @@ class GraphManager:
         result = await self._execute_query(query, {
             "id": document_id,
             "metadata": metadata
-        })
+        }, name="create_document_node")
         return len(result) > 0
     
     async def create_relationship(
@@ -155,7 +343,7 @@ class GraphManager:
             "source_id": source_id,
             "target_id": target_id,
             "confidence": confidence
-        })
+        }, name="create_relationship")
         return len(result) > 0
     
     async def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
@@ -173,7 +361,7 @@ class GraphManager:
         RETURN d
         """
         
-        result = await self._execute_query(query, {"id": document_id})
+        result = await self._execute_query(query, {"id": document_id}, name="get_document")
         return result[0]["d"] if result else None
     
     async def get_related_documents(
@@ -189,15 +377,38 @@ class GraphManager:
         Returns:
             List of related documents with relationship data
         """
-        rel_filter = f":{rel_type}" if rel_type else ""
-        
-        query = f"""
-        MATCH (d:Document {{id: $id}})-[r{rel_filter}]->(related)
-        RETURN related, r
-        """
-        
-        return await self._execute_query(query, {"id": document_id})
+        query = build_related_query(rel_type)
+        return await self._execute_query(query, {"id": document_id}, name="get_related_documents")
     
+    async def get_neighbourhoods(
+        self,
+        document_ids: Sequence[str],
+        rel_types: Optional[Sequence[str]] = None,
+        depth: int = 1,
+        direction: str = "both",
+        limit: int = 10,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Neighbourhoods of several documents in one UNWIND query
+
+        Args:
+            document_ids: Source document IDs
+            rel_types: Relationship types to follow (all types if empty)
+            depth: Maximum number of hops
+            direction: "out", "in" or "both"
+            limit: Neighbours kept per source, best paths first
+
+        Returns:
+            Neighbours by source ID, each with node, rel_types, depth and confidence
+        """
+        if not document_ids:
+            return {}
+        query = build_neighbourhood_query(rel_types, depth, direction)
+        result = await self._execute_query(
+            query, {"ids": list(document_ids), "limit": limit}, name="get_neighbourhoods"
+        )
+        return {record["source"]: record["neighbours"] for record in result}
+
     async def search_documents(
         self, filters: Dict[str, Any], limit: int = 10
     ) -> List[Dict[str, Any]]:
@@ -211,25 +422,71 @@ class GraphManager:
         Returns:
             List of matching documents
         """
-        conditions = []
-        params = {}
-        
-        for key, value in filters.items():
-            conditions.append(f"d.{key} = ${key}")
-            params[key] = value
-        
-        where_clause = " AND ".join(conditions) if conditions else "1=1"
-        
-        query = f"""
-        MATCH (d:Document)
-        WHERE {where_clause}
-        RETURN d
-        LIMIT {limit}
+        query, params = build_metadata_search_query(filters, limit)
+        result = await self._execute_query(query, params, name="search_documents")
+        return records_to_nodes(result)
+    
+    async def replace_relationships(
+        self, rel_type: str, origin: str, source_ids: Sequence[str], edges: Sequence[Dict[str, Any]]
+    ) -> int:
         """
-        
-        result = await self._execute_query(query, params)
-        return [record["d"] for record in result]
+        Replace the outgoing edges a batch job owns for a set of sources
 
+        Args:
+            rel_type: Relationship type (e.g. RELATED_TO)
+            origin: Name of the producer, stored on each edge
+            source_ids: Sources whose edges are replaced
+            edges: Dicts with "source", "target" and "confidence"
 
-# Singleton instance
-graph_manager = GraphManager()
+        Returns:
+            Number of edges created
+        """
+        delete_query, create_query = build_replace_relationships_queries(rel_type)
+        await self._execute_query(
+            delete_query, {"source_ids": list(source_ids), "origin": origin}, name="delete_relationships"
+        )
+        if not edges:
+            return 0
+        result = await self._execute_query(
+            create_query, {"edges": list(edges), "origin": origin}, name="create_relationships"
+        )
+        return result[0]["created"] if result else 0
+
+    async def relationship_sources(self, rel_type: str, origin: str, target_ids: Sequence[str]) -> List[str]:
+        """
+        IDs of the nodes with a rel_type edge tagged with origin to any of the targets
+
+        Args:
+            rel_type: Relationship type (e.g. RELATED_TO)
+            origin: Name of the producer the edges carry
+            target_ids: Targets of the edges
+
+        Returns:
+            Source node IDs
+        """
+        if not target_ids:
+            return []
+        result = await self._execute_query(
+            build_relationship_sources_query(rel_type),
+            {"target_ids": list(target_ids), "origin": origin},
+            name="relationship_sources",
+        )
+        return [record["id"] for record in result]
+
+    async def delete_document_node(self, document_id: str) -> bool:
+        """
+        Delete a document node and all its relationships
+        
+        Args:
+            document_id: Document ID
+            
+        Returns:
+            True if a node was deleted
+        """
+        query = """
+        MATCH (d:Document {id: $id})
+        DETACH DELETE d
+        RETURN count(*) AS deleted
+        """
+        result = await self._execute_query(query, {"id": document_id}, name="delete_document_node")
+        return bool(result) and result[0]["deleted"] > 0
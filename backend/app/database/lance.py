@@ -0,0 +1,364 @@
+"""
+LanceDB-backed document store
+
+Documents and their embeddings live in one on-disk Lance (Arrow columnar)
+table, so a single-node deployment needs no Postgres server. Reads come back
+as Arrow tables and are converted to dicts only at the edge; category
+filters are pushed down to LanceDB as SQL predicates. Once the table holds
+LANCEDB_INDEX_MIN_ROWS documents an IVF-PQ index is built on the vector
+column; below that, search is an exact flat scan, which is both accurate
+and fast at that size. Every write adds a small data fragment, so after
+LANCEDB_OPTIMIZE_EVERY writes the table is compacted (and new rows added
+to the indexes) in the background. Requires the optional ``lancedb`` package.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from app.core.admission import Overloaded
+from app.core.config import settings
+from app.core.logging import get_logger, log_event
+from app.core.metrics import LANCEDB_QUERY_SECONDS
+from app.core.tracing import span
+from app.database.base import EMBEDDING_DIMENSIONS, DocumentStore, VectorBatch
+
+logger = get_logger(__name__)
+
+DOCUMENT_FIELDS = ["id", "title", "content", "tags", "category", "created_at", "updated_at"]
+
+
+def sql_literal(value: str) -> str:
+    """Quote a string for a LanceDB SQL predicate"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def document_schema(dimensions: int = EMBEDDING_DIMENSIONS):
+    """Arrow schema of the documents table"""
+    import pyarrow as pa
+
+    return pa.schema([
+        pa.field("id", pa.string(), nullable=False),
+        pa.field("title", pa.string(), nullable=False),
+        pa.field("content", pa.string(), nullable=False),
+        pa.field("tags", pa.list_(pa.string())),
+        pa.field("category", pa.string(), nullable=False),
+        pa.field("vector", pa.list_(pa.float32(), dimensions), nullable=False),
+        pa.field("created_at", pa.timestamp("us"), nullable=False),
+        pa.field("updated_at", pa.timestamp("us"), nullable=False),
+    ])
+
+
+def record_to_document(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a LanceDB record into the document dict returned by the store"""
+    doc = {field: record[field] for field in DOCUMENT_FIELDS}
+    doc["tags"] = list(doc["tags"] or [])
+    doc["created_at"] = doc["created_at"].isoformat()
+    doc["updated_at"] = doc["updated_at"].isoformat()
+    return doc
+
+
+class LanceDocumentStore(DocumentStore):
+    """Document store on a local LanceDB table"""
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        table_name: Optional[str] = None,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+    ):
+        """
+        Args:
+            uri: LanceDB directory (defaults to LANCEDB_URI)
+            table_name: Table name (defaults to LANCEDB_TABLE)
+            dimensions: Embedding dimensions
+        """
+        super().__init__()
+        self.uri = uri or settings.lancedb_uri
+        self.table_name = table_name or settings.lancedb_table
+        self.dimensions = dimensions
+        self.index_min_rows = settings.lancedb_index_min_rows
+        self.nprobes = settings.lancedb_nprobes
+        self.refine_factor = settings.lancedb_refine_factor
+        self.optimize_every = settings.lancedb_optimize_every
+        self.db = None
+        self.table = None
+        self._vector_indexed = False
+        self._writes_since_optimize = 0
+        self._optimize_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.table is not None
+
+    async def connect(self) -> bool:
+        """Open (or create) the table and build any indexes it is ready for"""
+        try:
+            import lancedb
+
+            logger.info(f"Opening LanceDB table {self.table_name} at {self.uri}")
+            self.db = await lancedb.connect_async(self.uri)
+            self.table = await self.db.create_table(
+                self.table_name, schema=document_schema(self.dimensions), exist_ok=True
+            )
+            await self.ensure_indexes()
+            return True
+        except Exception:
+            logger.exception("Error connecting to LanceDB")
+            return False
+
+    async def ensure_indexes(self) -> None:
+        """Create the scalar indexes and, once there are enough rows, the IVF-PQ index"""
+        from lancedb.index import BTree
+
+        indexed = {column for index in await self.table.list_indices() for column in index.columns}
+        rows = await self.table.count_rows()
+        if rows == 0:
+            return
+        if "id" not in indexed:
+            await self.table.create_index("id", config=BTree())
+        if "vector" in indexed:
+            self._vector_indexed = True
+        elif rows >= self.index_min_rows:
+            await self.create_vector_index(rows)
+
+    async def create_vector_index(self, rows: Optional[int] = None) -> None:
+        """
+        Build (or rebuild) the IVF-PQ index on the vector column
+
+        Args:
+            rows: Current row count, used to size the partitions
+        """
+        from lancedb.index import IvfPq
+
+        rows = rows or await self.table.count_rows()
+        with span("lancedb.create_index", rows=rows):
+            await self.table.create_index(
+                "vector",
+                replace=True,
+                config=IvfPq(
+                    distance_type="cosine",
+                    # ~sqrt(n) partitions, each large enough to train PQ codebooks
+                    num_partitions=max(1, min(int(rows ** 0.5), rows // 256)),
+                    num_sub_vectors=self.dimensions // 16,
+                ),
+            )
+        self._vector_indexed = True
+        log_event(logger, logging.INFO, "LanceDB vector index built", rows=rows)
+
+    async def optimize(self) -> None:
+        """Compact small fragments, fold new rows into the indexes and build missing ones"""
+        with span("lancedb.optimize"):
+            await self.table.optimize()
+            await self.ensure_indexes()
+
+    def _record_writes(self, count: int = 1) -> None:
+        """Count writes and start a background optimize every LANCEDB_OPTIMIZE_EVERY"""
+        self._writes_since_optimize += count
+        if self._writes_since_optimize < self.optimize_every:
+            return
+        if self._optimize_task is not None and not self._optimize_task.done():
+            return
+        self._writes_since_optimize = 0
+
+        async def run():
+            try:
+                await self.optimize()
+            except Exception:
+                logger.exception("Error optimizing LanceDB table")
+
+        self._optimize_task = asyncio.get_running_loop().create_task(run())
+
+    async def _timed(self, name: str, operation):
+        """Await a LanceDB operation, recording its latency under a stable name"""
+        with span(f"lancedb.{name}"), LANCEDB_QUERY_SECONDS.time(query=name):
+            return await operation
+
+    def _row(self, doc: Dict[str, Any], vector) -> Dict[str, Any]:
+        """Table row for a document dict with ISO timestamps"""
+        return {
+            "id": doc["id"],
+            "title": doc["title"],
+            "content": doc["content"],
+            "tags": list(doc.get("tags") or []),
+            "category": doc["category"],
+            "vector": [float(v) for v in vector],
+            "created_at": datetime.fromisoformat(doc["created_at"]),
+            "updated_at": datetime.fromisoformat(doc["updated_at"]),
+        }
+
+    async def add_documents(self, docs: List[Dict[str, Any]], vectors: List[List[float]]) -> None:
+        """
+        Append fully formed documents with precomputed vectors in one write
+
+        Args:
+            docs: Document dicts including "id" and ISO timestamps
+            vectors: One embedding per document
+        """
+        rows = [self._row(doc, vector) for doc, vector in zip(docs, vectors)]
+        await self._timed("add_documents", self.table.add(rows))
+        self._record_writes(len(rows))
+
+    async def create_document(self, doc_data: Dict[str, Any]) -> str:
+        """Create a new document"""
+        try:
+            if not doc_data:
+                raise ValueError("Document data is empty")
+            for field in ("title", "content"):
+                if field not in doc_data:
+                    raise ValueError(f"Missing required field: {field}")
+
+            doc_id = str(uuid.uuid4())
+            now = datetime.now().isoformat()
+            vector = await self.document_embedding(doc_data)
+            doc = {
+                "id": doc_id,
+                "title": doc_data["title"],
+                "content": doc_data["content"],
+                "tags": doc_data.get("tags", []),
+                "category": doc_data.get("category", "general"),
+                "created_at": now,
+                "updated_at": now,
+            }
+            await self._timed("insert_document", self.table.add([self._row(doc, vector)]))
+            self._record_writes()
+            log_event(logger, logging.INFO, "Document added", doc_id=doc_id)
+            return doc_id
+        except Exception:
+            logger.exception("Error in create_document")
+            raise
+
+    async def _get_record(self, doc_id: str, with_vector: bool = False) -> Optional[Dict[str, Any]]:
+        columns = DOCUMENT_FIELDS + ["vector"] if with_vector else DOCUMENT_FIELDS
+        query = self.table.query().where(f"id = {sql_literal(doc_id)}").select(columns).limit(1)
+        records = await self._timed("get_document", query.to_list())
+        return records[0] if records else None
+
+    async def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get document by ID"""
+        try:
+            record = await self._get_record(doc_id)
+            return record_to_document(record) if record else None
+        except Exception:
+            logger.exception("Error in get_document")
+            return None
+
+    async def get_vectors(self, doc_ids: Sequence[str]) -> Dict[str, List[float]]:
+        """Stored embeddings by document ID"""
+        try:
+            if not doc_ids:
+                return {}
+            predicate = f"id IN ({', '.join(sql_literal(doc_id) for doc_id in doc_ids)})"
+            query = self.table.query().where(predicate).select(["id", "vector"])
+            records = await self._timed("get_vectors", query.to_list())
+            return {record["id"]: list(record["vector"]) for record in records}
+        except Exception:
+            logger.exception("Error in get_vectors")
+            return {}
+
+    async def iter_vectors(self, batch_size: int = 1000) -> AsyncIterator[VectorBatch]:
+        """Stream embeddings from a single scan of the id, vector and updated_at columns"""
+        table = await self._timed("iter_vectors", self.table.query().select(["id", "vector", "updated_at"]).to_arrow())
+        for batch in table.to_batches(max_chunksize=batch_size):
+            vectors = batch.column("vector").flatten().to_numpy().reshape(len(batch), self.dimensions)
+            updated_at = [value.isoformat() for value in batch.column("updated_at").to_pylist()]
+            yield batch.column("id").to_pylist(), vectors, updated_at
+
+    async def list_documents(
+        self, skip: int = 0, limit: int = 100, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """List documents with optional filtering"""
+        try:
+            query = self.table.query().select(["id", "created_at"])
+            if category:
+                query = query.where(f"category = {sql_literal(category)}")
+            # LanceDB has no ORDER BY: pick the page from the id and created_at
+            # columns, then read the full rows of that page only
+            keys = await self._timed("list_documents", query.to_arrow())
+            page = keys.sort_by([("created_at", "descending")]).slice(skip, limit).column("id").to_pylist()
+            if not page:
+                return []
+            predicate = f"id IN ({', '.join(sql_literal(doc_id) for doc_id in page)})"
+            rows = self.table.query().where(predicate).select(DOCUMENT_FIELDS)
+            records = {record["id"]: record for record in await self._timed("list_documents", rows.to_list())}
+            return [record_to_document(records[doc_id]) for doc_id in page if doc_id in records]
+        except Exception:
+            logger.exception("Error in list_documents")
+            return []
+
+    async def update_document(self, doc_id: str, update_data: Dict[str, Any]) -> bool:
+        """Update document"""
+        try:
+            record = await self._get_record(doc_id, with_vector=True)
+            if not record:
+                return False
+
+            doc = record_to_document(record)
+            for field in ("title", "content", "category", "tags"):
+                if field in update_data:
+                    doc[field] = update_data[field]
+            doc["updated_at"] = datetime.now().isoformat()
+
+            vector = record["vector"]
+            if "title" in update_data or "content" in update_data or "vector" in update_data:
+                vector = await self.document_embedding(dict(doc, vector=update_data.get("vector")))
+
+            merge = self.table.merge_insert("id").when_matched_update_all()
+            await self._timed("update_document", merge.execute([self._row(doc, vector)]))
+            self._record_writes()
+            return True
+        except Overloaded:
+            # Refused admission for the embedding: the API answers 503, not "not found"
+            raise
+        except Exception:
+            logger.exception("Error in update_document")
+            return False
+
+    async def delete_document(self, doc_id: str) -> bool:
+        """Delete document"""
+        try:
+            predicate = f"id = {sql_literal(doc_id)}"
+            if await self.table.count_rows(predicate) == 0:
+                return False
+            await self._timed("delete_document", self.table.delete(predicate))
+            self._record_writes()
+            return True
+        except Exception:
+            logger.exception("Error in delete_document")
+            return False
+
+    async def search_by_vector(
+        self, query_vector: List[float], limit: int = 10, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Nearest documents by cosine distance, filtering before the vector search"""
+        try:
+            query = (
+                self.table.vector_search(query_vector)
+                .distance_type("cosine")
+                .select(DOCUMENT_FIELDS)
+                .limit(limit)
+            )
+            if category:
+                query = query.where(f"category = {sql_literal(category)}")
+            if self._vector_indexed:
+                # Probe more partitions and re-rank PQ candidates on full vectors
+                query = query.nprobes(self.nprobes).refine_factor(self.refine_factor)
+            records = await self._timed("search_documents", query.to_list())
+            documents = []
+            for record in records:
+                doc = record_to_document(record)
+                doc["distance"] = float(record["_distance"])
+                documents.append(doc)
+            return documents
+        except Exception:
+            logger.exception("Error in search_documents")
+            return []
+
+    async def search_by_vectors(
+        self, queries: Sequence[Tuple[List[float], int, Optional[str]]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Run the searches concurrently; LanceDB executes them on its own threads"""
+        return list(await asyncio.gather(*(
+            self.search_by_vector(vector, limit, category) for vector, limit, category in queries
+        )))
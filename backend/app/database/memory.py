@@ -0,0 +1,546 @@
+"""
+In-memory document and graph stores
+
+InMemoryDocumentStore keeps every embedding, L2-normalised, in one
+contiguous float32 matrix so a search is a single matrix-vector product
+followed by a partial sort. InMemoryGraphStore keeps nodes in a dict with
+outgoing/incoming adjacency dicts. Both run with no external services,
+which makes them suitable for tests, benchmarks, profiling and small
+single-process deployments. Data is lost when the process exits.
+
+With quantization "halfvec" or "binary" the document store also keeps a
+compact copy of the matrix; searches scan the compact copy for
+limit * rerank_factor candidates and rank those exactly in float32. A PCA
+projection (set_projection) works the same way with a matrix of reduced
+vectors, and takes precedence over quantization.
+"""
+import copy
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.logging import get_logger, log_event
+from app.core.projection import Projection
+from app.core.quantization import QUANTIZATIONS, binary_quantize, hamming_distances, to_halfvec
+from app.core.tracing import span
+from app.database.base import EMBEDDING_DIMENSIONS, DocumentStore, GraphStore, VectorBatch, copy_document
+
+logger = get_logger(__name__)
+
+_INITIAL_CAPACITY = 1024
+# Rows converted from float16 to float32 at a time during halfvec scans
+_HALFVEC_BLOCK = 8192
+
+
+def normalize(vector) -> np.ndarray:
+    """Return a float32 unit vector (zero vectors are returned unchanged)"""
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm > 0 else array
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class InMemoryDocumentStore(DocumentStore):
+    """Document store doing brute-force cosine search over a float32 matrix"""
+
+    def __init__(
+        self,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        quantization: str = "none",
+        rerank_factor: int = 10,
+        projection: Optional[Projection] = None,
+    ):
+        """
+        Args:
+            dimensions: Embedding dimensions
+            quantization: "none", "halfvec" or "binary" candidate search
+            rerank_factor: Candidates scanned per requested result when quantized or reduced
+            projection: PCA projection for coarse-to-fine search
+        """
+        super().__init__()
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self.rerank_factor = max(1, rerank_factor)
+        self._vectors = np.zeros((_INITIAL_CAPACITY, dimensions), dtype=np.float32)
+        self._compact = self._quantize(self._vectors)
+        self.projection: Optional[Projection] = None
+        self._reduced: Optional[np.ndarray] = None
+        if projection is not None:
+            self.set_projection(projection)
+        self._categories = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._category_codes: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._documents: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def connect(self) -> bool:
+        return True
+
+    @property
+    def search_mode(self) -> str:
+        if self.projection is not None:
+            return f"pca{self.projection.dimensions}-{self.projection.fingerprint}"
+        return "exact" if self.quantization == "none" else self.quantization
+
+    def set_projection(self, projection: Optional[Projection]) -> None:
+        """Use a projection for search and new writes, projecting every stored row now"""
+        self.projection = projection
+        if projection is None:
+            self._reduced = None
+            return
+        self._reduced = np.zeros((len(self._vectors), projection.dimensions), dtype=np.float32)
+        if self._ids:
+            self._reduced[: len(self._ids)] = projection.project(self._vectors[: len(self._ids)])
+
+    async def prepare_reduced_vectors(self, dimensions: int) -> bool:
+        """Reduced vectors are kept in step by set_projection; nothing to prepare"""
+        return self._reduced is not None and self._reduced.shape[1] == dimensions
+
+    async def write_reduced_vectors(self, doc_ids: Sequence[str], vectors) -> int:
+        """Overwrite reduced vectors of existing documents"""
+        written = 0
+        for doc_id, vector in zip(doc_ids, vectors):
+            if doc_id in self._rows and self._reduced is not None:
+                self._reduced[self._rows[doc_id]] = vector
+                written += 1
+        return written
+
+    def _quantize(self, vectors: np.ndarray) -> Optional[np.ndarray]:
+        """Compact copy of rows for candidate search, or None when not quantized"""
+        if self.quantization == "halfvec":
+            return to_halfvec(vectors)
+        if self.quantization == "binary":
+            return binary_quantize(vectors)
+        return None
+
+    def _category_code(self, category: str) -> int:
+        if category not in self._category_codes:
+            self._category_codes[category] = len(self._category_codes)
+        return self._category_codes[category]
+
+    def _grow(self) -> None:
+        """Double the matrix capacity, keeping rows contiguous"""
+        capacity = len(self._vectors) * 2
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        vectors[: len(self._ids)] = self._vectors[: len(self._ids)]
+        categories = np.zeros(capacity, dtype=np.int32)
+        categories[: len(self._ids)] = self._categories[: len(self._ids)]
+        self._vectors, self._categories = vectors, categories
+        if self._compact is not None:
+            compact = np.zeros((capacity,) + self._compact.shape[1:], dtype=self._compact.dtype)
+            compact[: len(self._ids)] = self._compact[: len(self._ids)]
+            self._compact = compact
+        if self._reduced is not None:
+            reduced = np.zeros((capacity, self._reduced.shape[1]), dtype=np.float32)
+            reduced[: len(self._ids)] = self._reduced[: len(self._ids)]
+            self._reduced = reduced
+
+    def add(self, doc: Dict[str, Any], vector) -> None:
+        """
+        Insert or replace a fully formed document with a precomputed vector
+
+        Args:
+            doc: Document dict including "id" and all document fields
+            vector: Embedding for the document
+        """
+        doc_id = doc["id"]
+        row = self._rows.get(doc_id)
+        if row is None:
+            if len(self._ids) == len(self._vectors):
+                self._grow()
+            row = len(self._ids)
+            self._ids.append(doc_id)
+            self._rows[doc_id] = row
+        self._vectors[row] = normalize(vector)
+        if self._compact is not None:
+            self._compact[row] = self._quantize(self._vectors[row])
+        if self._reduced is not None:
+            self._reduced[row] = self.projection.project(self._vectors[row])
+        self._categories[row] = self._category_code(doc["category"])
+        self._documents[doc_id] = doc
+
+    def _remove(self, doc_id: str) -> None:
+        """Remove a row by moving the last row into its slot"""
+        row = self._rows.pop(doc_id)
+        last = len(self._ids) - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._vectors[row] = self._vectors[last]
+            if self._compact is not None:
+                self._compact[row] = self._compact[last]
+            if self._reduced is not None:
+                self._reduced[row] = self._reduced[last]
+            self._categories[row] = self._categories[last]
+            self._ids[row] = moved_id
+            self._rows[moved_id] = row
+        self._ids.pop()
+        del self._documents[doc_id]
+
+    async def create_document(self, doc_data: Dict[str, Any]) -> str:
+        """Create a new document"""
+        if not doc_data:
+            raise ValueError("Document data is empty")
+        for field in ("title", "content"):
+            if field not in doc_data:
+                raise ValueError(f"Missing required field: {field}")
+
+        # A caller may choose the ID (e.g. a sharded store placing the document)
+        doc_id = doc_data.get("id") or str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        vector = await self.document_embedding(doc_data)
+        self.add({
+            "id": doc_id,
+            "title": doc_data["title"],
+            "content": doc_data["content"],
+            "tags": list(doc_data.get("tags", [])),
+            "category": doc_data.get("category", "general"),
+            "created_at": now,
+            "updated_at": now,
+        }, vector)
+        log_event(logger, logging.INFO, "Document added", doc_id=doc_id)
+        return doc_id
+
+    async def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get document by ID"""
+        doc = self._documents.get(doc_id)
+        return copy_document(doc) if doc else None
+
+    async def list_documents(
+        self, skip: int = 0, limit: int = 100, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """List documents with optional filtering"""
+        docs = [d for d in self._documents.values() if category is None or d["category"] == category]
+        docs.sort(key=lambda d: d["created_at"], reverse=True)
+        return [copy_document(d) for d in docs[skip: skip + limit]]
+
+    async def update_document(self, doc_id: str, update_data: Dict[str, Any]) -> bool:
+        """Update document"""
+        existing = self._documents.get(doc_id)
+        if existing is None:
+            return False
+
+        doc = dict(existing)
+        for field in ("title", "content", "category", "tags"):
+            if field in update_data:
+                doc[field] = update_data[field]
+        doc["updated_at"] = datetime.now().isoformat()
+
+        if "title" in update_data or "content" in update_data or "vector" in update_data:
+            vector = await self.document_embedding(dict(doc, vector=update_data.get("vector")))
+        else:
+            vector = self._vectors[self._rows[doc_id]].copy()
+        self.add(doc, vector)
+        return True
+
+    async def delete_document(self, doc_id: str) -> bool:
+        """Delete document"""
+        if doc_id not in self._documents:
+            return False
+        self._remove(doc_id)
+        return True
+
+    async def export_documents(self, doc_ids: Sequence[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Documents with their vectors, for import_documents on another store"""
+        return {"documents": [
+            dict(copy_document(self._documents[doc_id]), vector=self._vectors[self._rows[doc_id]].tolist())
+            for doc_id in doc_ids if doc_id in self._documents
+        ]}
+
+    async def import_documents(self, export: Dict[str, List[Dict[str, Any]]]) -> int:
+        """Insert exported documents unchanged; IDs already present are skipped"""
+        imported = 0
+        for record in export.get("documents", []):
+            if record["id"] not in self._documents:
+                doc = dict(record)
+                self.add(doc, doc.pop("vector"))
+                imported += 1
+        return imported
+
+    async def drop_documents(
+        self, doc_ids: Sequence[str], versions: Optional[Dict[str, str]] = None
+    ) -> List[str]:
+        """Delete several documents, only those still at the given updated_at when versions is given"""
+        dropped = [
+            doc_id for doc_id in doc_ids
+            if doc_id in self._documents
+            and (versions is None or self._documents[doc_id]["updated_at"] == versions.get(doc_id))
+        ]
+        for doc_id in dropped:
+            self._remove(doc_id)
+        return dropped
+
+    async def get_vectors(self, doc_ids: Sequence[str]) -> Dict[str, List[float]]:
+        """Stored (normalised) embeddings by document ID"""
+        return {doc_id: self._vectors[self._rows[doc_id]].tolist() for doc_id in doc_ids if doc_id in self._rows}
+
+    async def iter_vectors(self, batch_size: int = 1000) -> AsyncIterator[VectorBatch]:
+        """Stream (normalised) embeddings in row order"""
+        for start in range(0, len(self._ids), batch_size):
+            ids = self._ids[start:start + batch_size]
+            yield ids, self._vectors[start:start + len(ids)].copy(), [self._documents[i]["updated_at"] for i in ids]
+
+    def _category_filter(self, scores: np.ndarray, category: Optional[str]) -> Optional[np.ndarray]:
+        """Scores with rows outside the category set to -inf, or None for an unknown category"""
+        if category is None:
+            return scores
+        code = self._category_codes.get(category)
+        if code is None:
+            return None
+        return np.where(self._categories[: len(scores)] == code, scores, -np.inf)
+
+    def _documents_at(self, rows, scores: np.ndarray) -> List[Dict[str, Any]]:
+        results = []
+        for row, score in zip(rows, scores):
+            if score == -np.inf:
+                break
+            doc = copy_document(self._documents[self._ids[row]])
+            doc["distance"] = float(1.0 - score)
+            results.append(doc)
+        return results
+
+    def _top_documents(self, scores: np.ndarray, limit: int, category: Optional[str]) -> List[Dict[str, Any]]:
+        """Best documents for one row of similarity scores"""
+        scores = self._category_filter(scores, category)
+        if scores is None:
+            return []
+        rows = top_k(scores, limit)
+        return self._documents_at(rows, scores[rows])
+
+    def _candidate_scores(self, query: np.ndarray, count: int) -> np.ndarray:
+        """Approximate similarity of every row from the reduced or compact copy (higher is closer)"""
+        if self._reduced is not None:
+            return self._reduced[:count] @ self.projection.project(query)
+        if self.quantization == "binary":
+            distances = hamming_distances(self._compact[:count], binary_quantize(query))
+            return -distances.astype(np.float32)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, _HALFVEC_BLOCK):
+            block = self._compact[start:min(count, start + _HALFVEC_BLOCK)].astype(np.float32)
+            scores[start:start + len(block)] = block @ to_halfvec(query).astype(np.float32)
+        return scores
+
+    def _quantized_search(self, query: np.ndarray, limit: int, category: Optional[str]) -> List[Dict[str, Any]]:
+        """Candidates from the reduced or compact copy, then exact float32 rerank of those rows only"""
+        count = len(self._ids)
+        approximate = self._category_filter(self._candidate_scores(query, count), category)
+        if approximate is None:
+            return []
+        candidates = top_k(approximate, limit * self.rerank_factor)
+        candidates = candidates[approximate[candidates] > -np.inf]
+        exact = self._vectors[candidates] @ query
+        order = np.argsort(-exact)[:limit]
+        return self._documents_at(candidates[order], exact[order])
+
+    async def search_by_vector(
+        self, query_vector: List[float], limit: int = 10, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Nearest documents by cosine distance, computed over the whole matrix"""
+        count = len(self._ids)
+        with span("memory.search_documents", rows=count):
+            if count == 0:
+                return []
+            if self._compact is not None or self._reduced is not None:
+                return self._quantized_search(normalize(query_vector), limit, category)
+            scores = self._vectors[:count] @ normalize(query_vector)
+            return self._top_documents(scores, limit, category)
+
+    async def search_by_vectors(
+        self, queries: Sequence[Tuple[List[float], int, Optional[str]]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Score every query against the matrix in one matrix multiplication"""
+        if self._compact is not None or self._reduced is not None:
+            return await super().search_by_vectors(queries)
+        count = len(self._ids)
+        with span("memory.search_documents_batch", rows=count, queries=len(queries)):
+            if count == 0:
+                return [[] for _ in queries]
+            query_matrix = np.stack([normalize(vector) for vector, _, _ in queries])
+            scores = query_matrix @ self._vectors[:count].T
+            return [
+                self._top_documents(row, limit, category)
+                for row, (_, limit, category) in zip(scores, queries)
+            ]
+
+
+class InMemoryGraphStore(GraphStore):
+    """Graph store keeping nodes and typed edges in adjacency dicts"""
+
+    def __init__(self):
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        # source id -> target id -> relationship type -> properties
+        self._out: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+        # target id -> set of source ids
+        self._in: Dict[str, set] = {}
+
+    async def connect(self) -> bool:
+        return True
+
+    async def create_document_node(
+        self, document_id: str, title: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Create or update a document node"""
+        node = self.nodes.setdefault(document_id, {"id": document_id})
+        node.update(metadata or {})
+        node["title"] = title
+        node["created_at"] = datetime.now().isoformat()
+        node["updated_at"] = node["created_at"]
+        return True
+
+    async def create_relationship(
+        self, source_id: str, target_id: str, rel_type: str,
+        confidence: float = 0.0, metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Create a relationship; False if either node is missing"""
+        if source_id not in self.nodes or target_id not in self.nodes:
+            return False
+        self._out.setdefault(source_id, {}).setdefault(target_id, {})[rel_type] = {
+            "confidence": confidence,
+            "created_at": datetime.now().isoformat(),
+        }
+        self._in.setdefault(target_id, set()).add(source_id)
+        return True
+
+    async def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Get a document node by ID"""
+        node = self.nodes.get(document_id)
+        return copy.deepcopy(node) if node else None
+
+    async def get_related_documents(
+        self, document_id: str, rel_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Outgoing neighbours with relationship properties"""
+        related = []
+        for target_id, edges in self._out.get(document_id, {}).items():
+            for edge_type, props in edges.items():
+                if rel_type is None or edge_type == rel_type:
+                    related.append({
+                        "related": copy.deepcopy(self.nodes[target_id]),
+                        "r": {"type": edge_type, **props},
+                    })
+        return related
+
+    def _edges(self, node_id: str, direction: str):
+        """(neighbour id, relationship type, properties, edge key) of a node's edges in a direction"""
+        if direction in ("out", "both"):
+            for target_id, edges in self._out.get(node_id, {}).items():
+                for rel_type, props in edges.items():
+                    yield target_id, rel_type, props, (node_id, target_id, rel_type)
+        if direction in ("in", "both"):
+            for source_id in self._in.get(node_id, set()):
+                for rel_type, props in self._out.get(source_id, {}).get(node_id, {}).items():
+                    yield source_id, rel_type, props, (source_id, node_id, rel_type)
+
+    async def get_neighbourhoods(
+        self,
+        document_ids: Sequence[str],
+        rel_types: Optional[Sequence[str]] = None,
+        depth: int = 1,
+        direction: str = "both",
+        limit: int = 10,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Neighbourhoods by depth-limited walks, keeping each neighbour's best path"""
+        if direction not in ("out", "in", "both"):
+            raise ValueError(f"Invalid direction: {direction}")
+        allowed = set(rel_types) if rel_types else None
+        neighbourhoods = {}
+        for source_id in document_ids:
+            if source_id not in self.nodes:
+                continue
+            best: Dict[str, Tuple[float, int, List[str]]] = {}
+            # Paths never reuse an edge, as in Cypher variable-length matches
+            stack = [(source_id, [], 1.0, frozenset())]
+            while stack:
+                node_id, path, confidence, used = stack.pop()
+                if len(path) == depth:
+                    continue
+                for other_id, rel_type, props, edge in self._edges(node_id, direction):
+                    if (allowed is not None and rel_type not in allowed) or edge in used:
+                        continue
+                    step = (confidence * (props.get("confidence") or 0.0), path + [rel_type])
+                    if other_id != source_id:
+                        current = best.get(other_id)
+                        if current is None or (-step[0], len(step[1])) < (-current[0], current[1]):
+                            best[other_id] = (step[0], len(step[1]), step[1])
+                    stack.append((other_id, step[1], step[0], used | {edge}))
+            ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[1][1]))[:limit]
+            if ranked:
+                neighbourhoods[source_id] = [
+                    {"node": copy.deepcopy(self.nodes[node_id]), "rel_types": rel_path,
+                     "depth": hops, "confidence": confidence}
+                    for node_id, (confidence, hops, rel_path) in ranked
+                ]
+        return neighbourhoods
+
+    async def search_documents(
+        self, filters: Dict[str, Any], limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Nodes whose properties equal all filters"""
+        matches = []
+        for node in self.nodes.values():
+            if all(node.get(key) == value for key, value in filters.items()):
+                matches.append(copy.deepcopy(node))
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    async def replace_relationships(
+        self, rel_type: str, origin: str, source_ids: Sequence[str], edges: Sequence[Dict[str, Any]]
+    ) -> int:
+        """Replace the rel_type edges tagged with origin going out of each source"""
+        for source_id in source_ids:
+            targets = self._out.get(source_id, {})
+            for target_id in list(targets):
+                props = targets[target_id].get(rel_type)
+                if props is not None and props.get("origin") == origin:
+                    del targets[target_id][rel_type]
+                    if not targets[target_id]:
+                        del targets[target_id]
+                        self._in.get(target_id, set()).discard(source_id)
+        created = 0
+        for edge in edges:
+            if edge["source"] not in self.nodes or edge["target"] not in self.nodes:
+                continue
+            self._out.setdefault(edge["source"], {}).setdefault(edge["target"], {})[rel_type] = {
+                "confidence": edge["confidence"],
+                "origin": origin,
+                "created_at": datetime.now().isoformat(),
+            }
+            self._in.setdefault(edge["target"], set()).add(edge["source"])
+            created += 1
+        return created
+
+    async def relationship_sources(self, rel_type: str, origin: str, target_ids: Sequence[str]) -> List[str]:
+        """IDs of the nodes with a rel_type edge tagged with origin to any of target_ids"""
+        sources = set()
+        for target_id in target_ids:
+            for source_id in self._in.get(target_id, set()):
+                props = self._out.get(source_id, {}).get(target_id, {}).get(rel_type)
+                if props is not None and props.get("origin") == origin:
+                    sources.add(source_id)
+        return sorted(sources)
+
+    async def delete_document_node(self, document_id: str) -> bool:
+        """Delete a node and all its relationships"""
+        if document_id not in self.nodes:
+            return False
+        for target_id in self._out.pop(document_id, {}):
+            self._in.get(target_id, set()).discard(document_id)
+        for source_id in self._in.pop(document_id, set()):
+            self._out.get(source_id, {}).pop(document_id, None)
+        del self.nodes[document_id]
+        return True
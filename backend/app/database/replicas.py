@@ -0,0 +1,149 @@
+"""
+Read replicas for the pgvector document store
+
+Each replica URI gets its own engine and connection pool. A health check
+runs on connect and then at most every REPLICA_CHECK_INTERVAL_S (started
+from the read path, so no background task has to be managed). A replica
+is healthy when it answers and its replay lag is at most REPLICA_MAX_LAG_S;
+reads are spread round-robin over healthy replicas. A replica whose query
+fails is dropped until the next check finds it healthy again.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.logging import get_logger, log_event
+from app.core.metrics import POSTGRES_REPLICA_HEALTHY, POSTGRES_REPLICA_LAG_SECONDS
+
+logger = get_logger(__name__)
+
+# Zero when everything received has been replayed (an idle primary would otherwise
+# look like growing lag); NULL on a server that is not replicating
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END AS lag_s
+""")
+
+
+def replica_name(uri: str) -> str:
+    """host:port/database of a URI, without credentials (used in logs and metrics)"""
+    url = make_url(uri)
+    return f"{url.host}:{url.port or 5432}/{url.database}"
+
+
+class Replica:
+    """One read replica and its last health check"""
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.name = replica_name(uri)
+        self.engine = None
+        self.session_factory = None
+        self.healthy = False
+        self.lag_s: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def connect(self) -> None:
+        self.engine = create_async_engine(self.uri, pool_pre_ping=True)
+        self.session_factory = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    def set_health(self, healthy: bool, lag_s: Optional[float] = None, error: Optional[str] = None) -> None:
+        if healthy != self.healthy:
+            log_event(logger, logging.INFO if healthy else logging.WARNING,
+                      "Replica healthy" if healthy else "Replica dropped", replica=self.name, lag_s=lag_s, error=error)
+        self.healthy, self.lag_s, self.error = healthy, lag_s, error
+        POSTGRES_REPLICA_HEALTHY.set(1 if healthy else 0, replica=self.name)
+        if lag_s is not None:
+            POSTGRES_REPLICA_LAG_SECONDS.set(lag_s, replica=self.name)
+
+
+class ReplicaSet:
+    """Health-checked read replicas chosen round-robin"""
+
+    def __init__(self, uris: Sequence[str] = (), max_lag_s: float = 10.0,
+                 check_interval_s: float = 5.0, check_timeout_s: float = 2.0):
+        """
+        Args:
+            uris: Replica connection URIs (empty: every read goes to the primary)
+            max_lag_s: Replay lag beyond which a replica is not used
+            check_interval_s: Minimum time between health checks
+            check_timeout_s: Time a replica has to answer the health check
+        """
+        self.replicas = [Replica(uri) for uri in uris]
+        self.max_lag_s = max_lag_s
+        self.check_interval_s = check_interval_s
+        self.check_timeout_s = check_timeout_s
+        self._next = itertools.count()
+        self._last_check = 0.0
+        self._check_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    async def connect(self) -> None:
+        """Create the replica pools and run a first health check"""
+        for replica in self.replicas:
+            if replica.engine is None:
+                replica.connect()
+        await self.check()
+
+    async def check(self) -> None:
+        """Check every replica concurrently"""
+        self._last_check = time.monotonic()
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            async with replica.session_factory() as session:
+                result = await asyncio.wait_for(session.execute(LAG_QUERY), self.check_timeout_s)
+                lag = result.scalar()
+        except Exception as e:
+            replica.set_health(False, error=str(e) or type(e).__name__)
+            return
+        lag_s = float(lag) if lag is not None else 0.0
+        if lag_s > self.max_lag_s:
+            replica.set_health(False, lag_s, f"Replay lag {lag_s:.1f}s exceeds {self.max_lag_s}s")
+        else:
+            replica.set_health(True, lag_s)
+
+    def _maybe_check(self) -> None:
+        """Start a background health check when the last one is older than the interval"""
+        if time.monotonic() - self._last_check < self.check_interval_s:
+            return
+        if self._check_task is not None and not self._check_task.done():
+            return
+        self._last_check = time.monotonic()
+        self._check_task = asyncio.ensure_future(self.check())
+
+    def choose(self) -> Optional[Replica]:
+        """Next healthy replica, or None when reads must go to the primary"""
+        if not self.replicas:
+            return None
+        self._maybe_check()
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    def mark_unhealthy(self, replica: Replica, error: Exception) -> None:
+        """Drop a replica whose query failed until a later check passes"""
+        replica.set_health(False, replica.lag_s, str(error) or type(error).__name__)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [{"replica": r.name, "healthy": r.healthy, "lag_s": r.lag_s, "error": r.error}
+                for r in self.replicas]
+
+    async def close(self) -> None:
+        for replica in self.replicas:
+            if replica.engine is not None:
+                await replica.engine.dispose()
+                replica.engine = replica.session_factory = None
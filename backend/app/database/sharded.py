@@ -0,0 +1,425 @@
+"""
+Sharded document storage across several document stores
+
+Every document is owned by one shard, chosen by a jump consistent hash of
+its ID, so a read by ID goes straight to one shard and adding a shard only
+moves about 1/N of the documents. With SHARD_STRATEGY=region a new
+document is placed on the shard mapped to its metadata region: its ID is
+drawn until it hashes to that shard, so the ID still routes reads. Adding
+shards later may move some region documents away; run the rebalancer
+(python -m app.jobs.rebalance_shards) after changing the shard list.
+
+Searches and lists are scattered to every shard concurrently and the
+per-shard results, each already sorted, are merged with a heap. While
+documents are waiting to be rebalanced after a shard was added
+(SHARD_PREVIOUS_COUNT), a lookup by ID that misses the owning shard is
+retried on the one shard the ID hashed to before, so a missing document
+costs at most two queries.
+
+Version history and duplicate signatures keep living next to their
+document: ShardedVersionStore and ShardedSignatureIndex route them the
+same way.
+"""
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.logging import get_logger, log_event
+from app.core.metrics import SHARD_FALLBACK_LOOKUPS, SHARD_QUERY_SECONDS
+from app.core.tracing import span
+from app.database.base import DocumentStore, VectorBatch
+from app.database.signatures import SignatureIndex
+from app.database.versions import VersionStore
+
+logger = get_logger(__name__)
+
+SHARD_STRATEGIES = ("hash", "region")
+
+# Copies of a document move_documents makes while it keeps being written
+MOVE_ATTEMPTS = 3
+
+
+def stable_hash(key: str) -> int:
+    """64-bit hash of a string that is the same in every process (unlike hash())"""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Jump consistent hash (Lamping and Veach)
+
+    Growing buckets from n to n + 1 moves only the keys that land in the
+    new bucket, about 1/(n + 1) of them.
+    """
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+class ShardRouter:
+    """Owning shard of a document ID and placement of new documents"""
+
+    def __init__(self, shards: int, strategy: str = "hash", regions: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            shards: Number of shards
+            strategy: "hash" (spread by ID) or "region" (by metadata region)
+            regions: Shard index per region for the region strategy; other
+                regions are spread by ID
+        """
+        if shards < 1:
+            raise ValueError("At least one shard is required")
+        if strategy not in SHARD_STRATEGIES:
+            raise ValueError(f"Unknown shard strategy: {strategy}")
+        regions = regions or {}
+        for region, shard in regions.items():
+            if not 0 <= shard < shards:
+                raise ValueError(f"Region {region} is mapped to shard {shard}, but there are {shards} shards")
+        self.shards = shards
+        self.strategy = strategy
+        self.regions = regions
+
+    def owner(self, doc_id: str) -> int:
+        """Shard owning a document ID"""
+        return jump_hash(stable_hash(doc_id), self.shards)
+
+    def placement(self, doc_data: Dict[str, Any]) -> Optional[int]:
+        """Shard a new document should go to, or None to spread it by ID"""
+        if self.strategy != "region":
+            return None
+        region = (doc_data.get("metadata") or {}).get("region")
+        return self.regions.get(region)
+
+    def new_id(self, shard: Optional[int] = None) -> str:
+        """Random document ID, owned by the given shard when one is given"""
+        while True:
+            doc_id = str(uuid.uuid4())
+            if shard is None or self.owner(doc_id) == shard:
+                return doc_id
+
+    def group(self, doc_ids: Sequence[str]) -> Dict[int, List[str]]:
+        """Document IDs by owning shard"""
+        groups: Dict[int, List[str]] = {}
+        for doc_id in doc_ids:
+            groups.setdefault(self.owner(doc_id), []).append(doc_id)
+        return groups
+
+
+def merge_by_distance(results: Sequence[List[Dict[str, Any]]], limit: int) -> List[Dict[str, Any]]:
+    """Top limit documents of per-shard result lists, each sorted by ascending distance"""
+    return list(itertools.islice(heapq.merge(*results, key=lambda doc: doc["distance"]), limit))
+
+
+def merge_newest_first(results: Sequence[List[Dict[str, Any]]], skip: int, limit: int) -> List[Dict[str, Any]]:
+    """Page of per-shard lists, each sorted newest first by created_at"""
+    merged = heapq.merge(*results, key=lambda doc: datetime.fromisoformat(doc["created_at"]), reverse=True)
+    return list(itertools.islice(merged, skip, skip + limit))
+
+
+class ShardedDocumentStore(DocumentStore):
+    """Documents spread over several stores, searched by scatter-gather"""
+
+    def __init__(self, shards: Sequence[DocumentStore], router: Optional[ShardRouter] = None,
+                 previous_shards: int = 0):
+        """
+        Args:
+            shards: One store per shard, in shard index order
+            router: Document placement (hash by ID over len(shards) by default)
+            previous_shards: Shard count before shards were last added; while
+                set, a document missing from its owner is looked up on the
+                shard that owned it then. 0 looks on the owner only
+        """
+        super().__init__()
+        self.shards = list(shards)
+        self.router = router or ShardRouter(len(self.shards))
+        if self.router.shards != len(self.shards):
+            raise ValueError(f"Router expects {self.router.shards} shards, got {len(self.shards)}")
+        if not 0 <= previous_shards <= len(self.shards):
+            raise ValueError(f"Previous shard count {previous_shards} is not between 0 and {len(self.shards)}")
+        self.previous_shards = previous_shards
+
+    @property
+    def is_connected(self) -> bool:
+        return all(shard.is_connected for shard in self.shards)
+
+    @property
+    def search_mode(self) -> str:
+        return self.shards[0].search_mode
+
+    async def _timed(self, index: int, operation: str, call: Awaitable[Any]) -> Any:
+        """Await one shard call, recording its latency under the shard index"""
+        with span(f"shard.{operation}", shard=index), SHARD_QUERY_SECONDS.time(shard=str(index), operation=operation):
+            return await call
+
+    async def _scatter(self, operation: str, fn: Callable[[DocumentStore], Awaitable[Any]],
+                       indexes: Optional[Sequence[int]] = None) -> List[Any]:
+        """Run fn on several shards (all by default) concurrently; results in index order"""
+        indexes = range(len(self.shards)) if indexes is None else indexes
+        return await asyncio.gather(*(self._timed(i, operation, fn(self.shards[i])) for i in indexes))
+
+    async def connect(self) -> bool:
+        return all(await self._scatter("connect", lambda shard: shard.connect()))
+
+    def previous_owner(self, doc_id: str) -> Optional[int]:
+        """
+        Shard a document may still be on before rebalancing, if not its owner
+
+        Jump hashing only moves IDs to the added shards, so a document not
+        yet moved is on the shard its ID hashed to with previous_shards.
+        """
+        if not self.previous_shards or self.previous_shards == len(self.shards):
+            return None
+        previous = jump_hash(stable_hash(doc_id), self.previous_shards)
+        return previous if previous != self.router.owner(doc_id) else None
+
+    async def _locate(self, doc_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Shard holding a document and the document, trying its owner first"""
+        owner = self.router.owner(doc_id)
+        doc = await self._timed(owner, "get_document", self.shards[owner].get_document(doc_id))
+        if doc is not None:
+            return owner, doc
+        previous = self.previous_owner(doc_id)
+        if previous is None:
+            return None
+        doc = await self._timed(previous, "get_document", self.shards[previous].get_document(doc_id))
+        SHARD_FALLBACK_LOOKUPS.inc(result="found" if doc is not None else "missing")
+        return (previous, doc) if doc is not None else None
+
+    async def create_document(self, doc_data: Dict[str, Any]) -> str:
+        doc_id = doc_data.get("id") or self.router.new_id(self.router.placement(doc_data))
+        # Embedded once here, so the shards never load a model
+        vector = await self.document_embedding(doc_data)
+        owner = self.router.owner(doc_id)
+        await self._timed(owner, "create_document",
+                          self.shards[owner].create_document(dict(doc_data, id=doc_id, vector=vector)))
+        return doc_id
+
+    async def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        located = await self._locate(doc_id)
+        return located[1] if located is not None else None
+
+    async def list_documents(
+        self, skip: int = 0, limit: int = 100, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        pages = await self._scatter("list_documents", lambda shard: shard.list_documents(0, skip + limit, category))
+        return merge_newest_first(pages, skip, limit)
+
+    async def update_document(self, doc_id: str, update_data: Dict[str, Any]) -> bool:
+        located = await self._locate(doc_id)
+        if located is None:
+            return False
+        index, existing = located
+        if ("title" in update_data or "content" in update_data) and update_data.get("vector") is None:
+            update_data = dict(update_data, vector=await self.document_embedding({
+                "title": update_data.get("title", existing["title"]),
+                "content": update_data.get("content", existing["content"]),
+            }))
+        return await self._timed(index, "update_document", self.shards[index].update_document(doc_id, update_data))
+
+    async def delete_document(self, doc_id: str) -> bool:
+        located = await self._locate(doc_id)
+        if located is None:
+            return False
+        index = located[0]
+        return await self._timed(index, "delete_document", self.shards[index].delete_document(doc_id))
+
+    async def get_vectors(self, doc_ids: Sequence[str]) -> Dict[str, List[float]]:
+        groups = self.router.group(doc_ids)
+        found: Dict[str, List[float]] = {}
+        for vectors in await asyncio.gather(*(
+            self._timed(index, "get_vectors", self.shards[index].get_vectors(ids)) for index, ids in groups.items()
+        )):
+            found.update(vectors)
+        previous: Dict[int, List[str]] = {}
+        for doc_id in dict.fromkeys(doc_ids):
+            index = self.previous_owner(doc_id) if doc_id not in found else None
+            if index is not None:
+                previous.setdefault(index, []).append(doc_id)
+        for vectors in await asyncio.gather(*(
+            self._timed(index, "get_vectors", self.shards[index].get_vectors(ids)) for index, ids in previous.items()
+        )):
+            found.update(vectors)
+        return found
+
+    async def iter_vectors(self, batch_size: int = 1000) -> AsyncIterator[VectorBatch]:
+        """Stream every shard's embeddings, one shard after another"""
+        for shard in self.shards:
+            async for batch in shard.iter_vectors(batch_size):
+                yield batch
+
+    async def search_by_vector(
+        self, query_vector: List[float], limit: int = 10, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        results = await self._scatter(
+            "search_documents", lambda shard: shard.search_by_vector(query_vector, limit, category)
+        )
+        return merge_by_distance(results, limit)
+
+    async def search_by_vectors(
+        self, queries: Sequence[Tuple[List[float], int, Optional[str]]]
+    ) -> List[List[Dict[str, Any]]]:
+        if not queries:
+            return []
+        per_shard = await self._scatter("search_documents_batch", lambda shard: shard.search_by_vectors(queries))
+        return [
+            merge_by_distance([results[q] for results in per_shard], limit)
+            for q, (_, limit, _) in enumerate(queries)
+        ]
+
+    # Reduced vectors (app.jobs.reduce_dimensions) on every shard
+
+    def set_projection(self, projection) -> None:
+        for shard in self.shards:
+            shard.set_projection(projection)
+
+    async def prepare_reduced_vectors(self, dimensions: int) -> bool:
+        return all(await self._scatter("prepare_reduced_vectors",
+                                       lambda shard: shard.prepare_reduced_vectors(dimensions)))
+
+    async def write_reduced_vectors(self, doc_ids: Sequence[str], vectors) -> int:
+        vectors = np.asarray(vectors)
+        positions = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+        written = 0
+        for index, ids in self.router.group(doc_ids).items():
+            rows = vectors[[positions[doc_id] for doc_id in ids]]
+            written += await self._timed(index, "write_reduced_vectors",
+                                         self.shards[index].write_reduced_vectors(ids, rows))
+        return written
+
+    # Rebalancing (app.jobs.rebalance_shards)
+
+    async def misplaced(self, batch_size: int = 1000) -> Dict[Tuple[int, int], List[str]]:
+        """IDs of documents not on their owning shard, by (current shard, owner)"""
+        moves: Dict[Tuple[int, int], List[str]] = {}
+        for index, shard in enumerate(self.shards):
+            async for ids, _, _ in shard.iter_vectors(batch_size):
+                for doc_id in ids:
+                    owner = self.router.owner(doc_id)
+                    if owner != index:
+                        moves.setdefault((index, owner), []).append(doc_id)
+        return moves
+
+    async def move_documents(self, source: int, target: int, doc_ids: Sequence[str]) -> int:
+        """
+        Copy documents (with their dependent rows) to another shard, then delete the originals
+
+        Reads and writes try the owning (target) shard first, so once a copy
+        is there it receives every later write. An original is only deleted
+        if it is unchanged since it was copied (same updated_at); one written
+        or deleted on the source in between has its copy dropped from the
+        target again and is copied anew, up to MOVE_ATTEMPTS times. A copy
+        already written through the target is newer than the original and
+        is kept. Documents still changing after that stay on the source for
+        the next run. The copy skips rows already on the target, so an
+        interrupted move can simply be run again.
+
+        Returns:
+            Number of documents removed from the source shard
+        """
+        pending, moved = list(doc_ids), 0
+        for _ in range(MOVE_ATTEMPTS):
+            if not pending:
+                break
+            export = await self._timed(source, "export_documents", self.shards[source].export_documents(pending))
+            await self._timed(target, "import_documents", self.shards[target].import_documents(export))
+            copied = {doc["id"]: doc["updated_at"] for doc in export.get("documents", [])}
+            dropped = await self._timed(source, "drop_documents",
+                                        self.shards[source].drop_documents(list(copied), copied))
+            moved += len(dropped)
+            changed = {doc_id: version for doc_id, version in copied.items() if doc_id not in set(dropped)}
+            if not changed:
+                return moved
+            # Written or deleted on the source after the copy: drop the stale copy and copy again
+            discarded = await self._timed(target, "drop_documents",
+                                          self.shards[target].drop_documents(list(changed), changed))
+            newer = [doc_id for doc_id in changed if doc_id not in set(discarded)]
+            if newer:
+                # Written through the target since the copy, so the copy is newer
+                moved += len(await self._timed(source, "drop_documents", self.shards[source].drop_documents(newer)))
+            pending = discarded
+        if pending:
+            log_event(logger, logging.WARNING, "Documents kept changing during the move, left on the source",
+                      source=source, target=target, documents=len(pending))
+        return moved
+
+
+class ShardedVersionStore(VersionStore):
+    """Version store per shard, routed like the documents"""
+
+    def __init__(self, stores: Sequence[VersionStore], router: ShardRouter):
+        self.stores = list(stores)
+        self.router = router
+
+    def _store(self, doc_id: str) -> VersionStore:
+        return self.stores[self.router.owner(doc_id)]
+
+    async def connect(self) -> bool:
+        return all(await asyncio.gather(*(store.connect() for store in self.stores)))
+
+    async def update_with_version(
+        self,
+        store: DocumentStore,
+        doc_id: str,
+        update_data: Dict[str, Any],
+        record: Dict[str, Any],
+        chunks: Optional[Dict[str, List[float]]] = None,
+    ) -> bool:
+        # store is the ShardedDocumentStore; write on the shard holding the document
+        located = await store._locate(doc_id)
+        if located is None:
+            return False
+        index = located[0]
+        return await self.stores[index].update_with_version(store.shards[index], doc_id, update_data, record, chunks)
+
+    async def list_versions(self, doc_id: str) -> List[Dict[str, Any]]:
+        return await self._store(doc_id).list_versions(doc_id)
+
+    async def changed_since(self, since: datetime, limit: int = 100) -> List[Dict[str, Any]]:
+        results = await asyncio.gather(*(store.changed_since(since, limit) for store in self.stores))
+        merged = heapq.merge(*results, key=lambda change: str(change["superseded_at"]), reverse=True)
+        return list(itertools.islice(merged, limit))
+
+    async def get_chunks(self, doc_id: str) -> Dict[str, List[float]]:
+        return await self._store(doc_id).get_chunks(doc_id)
+
+    async def set_chunks(self, doc_id: str, chunks: Dict[str, List[float]]) -> None:
+        await self._store(doc_id).set_chunks(doc_id, chunks)
+
+    async def delete(self, doc_id: str) -> None:
+        await self._store(doc_id).delete(doc_id)
+
+
+class ShardedSignatureIndex(SignatureIndex):
+    """Signature index per shard; candidate lookups ask every shard"""
+
+    def __init__(self, indexes: Sequence[SignatureIndex], router: ShardRouter):
+        self.indexes = list(indexes)
+        self.router = router
+
+    async def connect(self) -> bool:
+        return all(await asyncio.gather(*(index.connect() for index in self.indexes)))
+
+    async def add(self, doc_id: str, signature: np.ndarray, buckets: List[int]) -> None:
+        await self.indexes[self.router.owner(doc_id)].add(doc_id, signature, buckets)
+
+    async def remove(self, doc_id: str) -> None:
+        await self.indexes[self.router.owner(doc_id)].remove(doc_id)
+
+    async def candidates(self, buckets: List[int]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        for candidates in await asyncio.gather(*(index.candidates(buckets) for index in self.indexes)):
+            found.update(candidates)
+        return found
+
+    async def count(self) -> int:
+        return sum(await asyncio.gather(*(index.count() for index in self.indexes)))
@@ -0,0 +1,166 @@
+"""
+Signature indexes for near-duplicate detection
+
+A SignatureIndex stores one MinHash signature per document plus its LSH
+band buckets, and answers "which documents share a bucket with these"
+without scanning every signature.
+
+- MemorySignatureIndex: per-process dicts; used with the in-memory and
+  LanceDB document stores (rebuild it with the dedup backfill job).
+- PostgresSignatureIndex: document_signatures and document_lsh_buckets
+  tables next to documents, sharing the DatabaseManager's engine; rows
+  are removed with their document (ON DELETE CASCADE).
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class SignatureIndex(ABC):
+    """Stores MinHash signatures and finds candidates by band bucket"""
+
+    @abstractmethod
+    async def connect(self) -> bool:
+        """Prepare storage; returns True on success"""
+
+    @abstractmethod
+    async def add(self, doc_id: str, signature: np.ndarray, buckets: List[int]) -> None:
+        """Store (or replace) a document's signature and band buckets"""
+
+    @abstractmethod
+    async def remove(self, doc_id: str) -> None:
+        """Forget a document"""
+
+    @abstractmethod
+    async def candidates(self, buckets: List[int]) -> Dict[str, np.ndarray]:
+        """Signatures of documents sharing at least one band bucket"""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Number of indexed documents"""
+
+
+class MemorySignatureIndex(SignatureIndex):
+    """Signature index held in process memory"""
+
+    def __init__(self):
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+        self._doc_buckets: Dict[str, List[Tuple[int, int]]] = {}
+
+    async def connect(self) -> bool:
+        return True
+
+    async def add(self, doc_id: str, signature: np.ndarray, buckets: List[int]) -> None:
+        await self.remove(doc_id)
+        keys = list(enumerate(buckets))
+        for key in keys:
+            self._buckets.setdefault(key, set()).add(doc_id)
+        self._doc_buckets[doc_id] = keys
+        self._signatures[doc_id] = signature
+
+    async def remove(self, doc_id: str) -> None:
+        for key in self._doc_buckets.pop(doc_id, []):
+            members = self._buckets.get(key)
+            if members is not None:
+                members.discard(doc_id)
+                if not members:
+                    del self._buckets[key]
+        self._signatures.pop(doc_id, None)
+
+    async def candidates(self, buckets: List[int]) -> Dict[str, np.ndarray]:
+        found: Set[str] = set()
+        for key in enumerate(buckets):
+            found |= self._buckets.get(key, set())
+        return {doc_id: self._signatures[doc_id] for doc_id in found}
+
+    async def count(self) -> int:
+        return len(self._signatures)
+
+
+class PostgresSignatureIndex(SignatureIndex):
+    """Signature index in Postgres tables beside documents"""
+
+    def __init__(self, manager):
+        """
+        Args:
+            manager: Connected (or connectable) DatabaseManager whose engine is shared
+        """
+        self.manager = manager
+
+    async def connect(self) -> bool:
+        try:
+            if not self.manager.is_connected and not await self.manager.connect():
+                return False
+            async with self.manager.engine.begin() as conn:
+                await conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS document_signatures (
+                        doc_id VARCHAR(36) PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+                        minhash BYTEA NOT NULL
+                    )
+                """))
+                await conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS document_lsh_buckets (
+                        band SMALLINT NOT NULL,
+                        bucket BIGINT NOT NULL,
+                        doc_id VARCHAR(36) NOT NULL REFERENCES document_signatures(doc_id) ON DELETE CASCADE,
+                        PRIMARY KEY (band, bucket, doc_id)
+                    )
+                """))
+                await conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS document_lsh_buckets_doc_id_idx ON document_lsh_buckets (doc_id)"
+                ))
+            return True
+        except Exception:
+            logger.exception("Error creating signature tables")
+            return False
+
+    async def add(self, doc_id: str, signature: np.ndarray, buckets: List[int]) -> None:
+        async with self.manager.session_factory() as session:
+            await self.manager._execute(session, "upsert_signature", text("""
+                INSERT INTO document_signatures (doc_id, minhash) VALUES (:doc_id, :minhash)
+                ON CONFLICT (doc_id) DO UPDATE SET minhash = EXCLUDED.minhash
+            """), {"doc_id": doc_id, "minhash": signature.astype(np.uint32).tobytes()})
+            await self.manager._execute(session, "delete_lsh_buckets", text(
+                "DELETE FROM document_lsh_buckets WHERE doc_id = :doc_id"
+            ), {"doc_id": doc_id})
+            await self.manager._execute(session, "insert_lsh_buckets", text("""
+                INSERT INTO document_lsh_buckets (band, bucket, doc_id)
+                SELECT band - 1, bucket, :doc_id
+                FROM unnest(CAST(:buckets AS bigint[])) WITH ORDINALITY AS b(bucket, band)
+                ON CONFLICT DO NOTHING
+            """), {"doc_id": doc_id, "buckets": buckets})
+            await session.commit()
+
+    async def remove(self, doc_id: str) -> None:
+        async with self.manager.session_factory() as session:
+            await self.manager._execute(session, "delete_signature", text(
+                "DELETE FROM document_signatures WHERE doc_id = :doc_id"
+            ), {"doc_id": doc_id})
+            await session.commit()
+
+    async def candidates(self, buckets: List[int]) -> Dict[str, np.ndarray]:
+        async with self.manager.session_factory() as session:
+            rows = await self.manager._fetch_all(session, "lsh_candidates", text("""
+                SELECT s.doc_id, s.minhash
+                FROM document_signatures s
+                WHERE s.doc_id IN (
+                    SELECT l.doc_id
+                    FROM unnest(CAST(:buckets AS bigint[])) WITH ORDINALITY AS b(bucket, band)
+                    JOIN document_lsh_buckets l ON l.band = b.band - 1 AND l.bucket = b.bucket
+                )
+            """), {"buckets": buckets})
+        return {row.doc_id: np.frombuffer(row.minhash, dtype=np.uint32) for row in rows}
+
+    async def count(self) -> int:
+        async with self.manager.session_factory() as session:
+            rows = await self.manager._fetch_all(
+                session, "count_signatures", text("SELECT count(*) AS n FROM document_signatures"), {}
+            )
+        return rows[0].n
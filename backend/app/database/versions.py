@@ -0,0 +1,509 @@
+"""
+Document version history and chunk-level incremental re-embedding
+
+VersionedDocumentStore wraps a DocumentStore. Every update stores the
+replaced version as a compressed delta that rebuilds it from the version
+after it (a reverse delta), so the current text stays a single full copy
+in documents and history costs roughly the size of the amendments.
+Older versions are rebuilt by walking the deltas back from the current
+text.
+
+Embeddings are assembled from chunks: the title and each content chunk
+(see app.core.chunking) are embedded separately and the document vector
+is their normalised mean. Chunk embeddings are stored by content hash, so
+an update only embeds the chunks it changed.
+
+Because each delta only makes sense against the version after it, an
+update and the record of the version it replaces are written together:
+the version store locks the document, checks that it is still the version
+the delta was computed from, numbers the new record and applies the
+update, all or nothing. An update that lost the race to another one is
+recomputed against the new current text.
+
+- MemoryVersionStore: per-process dicts; used with the in-memory and
+  LanceDB document stores.
+- PostgresVersionStore: document_versions and document_chunks tables
+  next to documents, deleted with their document (ON DELETE CASCADE).
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from app.core.chunking import chunk_hash, split_chunks
+from app.core.config import settings
+from app.core.consistency import require_primary_reads
+from app.core.logging import get_logger, log_event
+from app.core.metrics import CHUNK_EMBEDDINGS
+from app.core.versioning import apply_delta, diff_texts, make_delta
+from app.database.base import DocumentStore, DocumentStoreProxy
+
+logger = get_logger(__name__)
+
+# Version fields returned by the API (the delta stays internal)
+VERSION_FIELDS = ("version", "title", "category", "tags", "updated_at", "superseded_at", "content_bytes", "stored_bytes")
+# Times an update is recomputed when other updates keep landing first
+UPDATE_ATTEMPTS = 5
+
+
+class ConcurrentUpdateError(Exception):
+    """Raised when a document kept changing while an update was being prepared"""
+
+
+class VersionStore(ABC):
+    """Stores reverse deltas of past versions and chunk embeddings"""
+
+    @abstractmethod
+    async def connect(self) -> bool:
+        """Prepare storage; returns True on success"""
+
+    @abstractmethod
+    async def update_with_version(
+        self,
+        store: DocumentStore,
+        doc_id: str,
+        update_data: Dict[str, Any],
+        record: Dict[str, Any],
+        chunks: Optional[Dict[str, List[float]]] = None,
+    ) -> bool:
+        """
+        Apply an update and store the version it replaces, atomically
+
+        Nothing is written unless the document is still the version the
+        record describes (same updated_at). The record is numbered after the
+        document is locked, so concurrent updates never share a number.
+
+        Args:
+            store: Document store holding the document
+            doc_id: Document ID
+            update_data: Fields to change, with the new "vector" if the text changed
+            record: The replaced version: doc_id, title, category, tags,
+                updated_at (when it was written), superseded_at, content_bytes
+                and delta
+            chunks: New chunk embeddings by hash, if the text changed
+
+        Returns:
+            True when written; False when the document changed or disappeared
+            since it was read
+
+        Raises:
+            Exception: Storage errors; neither the update nor the version is written
+        """
+
+    @abstractmethod
+    async def list_versions(self, doc_id: str) -> List[Dict[str, Any]]:
+        """Stored versions of a document, newest first, including deltas"""
+
+    @abstractmethod
+    async def changed_since(self, since: datetime, limit: int = 100) -> List[Dict[str, Any]]:
+        """Versions superseded since a time ({"doc_id", "version", "superseded_at"}), newest first"""
+
+    @abstractmethod
+    async def get_chunks(self, doc_id: str) -> Dict[str, List[float]]:
+        """Stored chunk embeddings by chunk hash"""
+
+    @abstractmethod
+    async def set_chunks(self, doc_id: str, chunks: Dict[str, List[float]]) -> None:
+        """Replace a document's chunk embeddings"""
+
+    @abstractmethod
+    async def delete(self, doc_id: str) -> None:
+        """Forget a document's versions and chunks"""
+
+
+class MemoryVersionStore(VersionStore):
+    """Version store held in process memory"""
+
+    def __init__(self):
+        self._versions: Dict[str, List[Dict[str, Any]]] = {}
+        self._chunks: Dict[str, Dict[str, List[float]]] = {}
+        self._write_lock = asyncio.Lock()
+
+    async def connect(self) -> bool:
+        return True
+
+    async def update_with_version(
+        self,
+        store: DocumentStore,
+        doc_id: str,
+        update_data: Dict[str, Any],
+        record: Dict[str, Any],
+        chunks: Optional[Dict[str, List[float]]] = None,
+    ) -> bool:
+        # The lock stands in for the row lock: no other versioned update can interleave
+        async with self._write_lock:
+            current = await store.get_document(doc_id)
+            if current is None or current["updated_at"] != record["updated_at"]:
+                return False
+            if not await store.update_document(doc_id, update_data):
+                return False
+            versions = self._versions.setdefault(doc_id, [])
+            versions.append(dict(record, version=versions[-1]["version"] + 1 if versions else 1))
+            if chunks is not None:
+                self._chunks[doc_id] = dict(chunks)
+            return True
+
+    async def list_versions(self, doc_id: str) -> List[Dict[str, Any]]:
+        return [dict(record) for record in reversed(self._versions.get(doc_id, []))]
+
+    async def changed_since(self, since: datetime, limit: int = 100) -> List[Dict[str, Any]]:
+        changes = [
+            {"doc_id": record["doc_id"], "version": record["version"], "superseded_at": record["superseded_at"]}
+            for records in self._versions.values()
+            for record in records
+            if datetime.fromisoformat(record["superseded_at"]) >= since
+        ]
+        return sorted(changes, key=lambda change: change["superseded_at"], reverse=True)[:limit]
+
+    async def get_chunks(self, doc_id: str) -> Dict[str, List[float]]:
+        return dict(self._chunks.get(doc_id, {}))
+
+    async def set_chunks(self, doc_id: str, chunks: Dict[str, List[float]]) -> None:
+        self._chunks[doc_id] = dict(chunks)
+
+    async def delete(self, doc_id: str) -> None:
+        self._versions.pop(doc_id, None)
+        self._chunks.pop(doc_id, None)
+
+
+class PostgresVersionStore(VersionStore):
+    """Version store in Postgres tables beside documents"""
+
+    def __init__(self, manager):
+        """
+        Args:
+            manager: DatabaseManager whose engine is shared
+        """
+        self.manager = manager
+
+    async def connect(self) -> bool:
+        try:
+            async with self.manager.engine.begin() as conn:
+                await conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS document_versions (
+                        doc_id VARCHAR(36) NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                        version INT NOT NULL,
+                        title TEXT NOT NULL,
+                        category VARCHAR(50) NOT NULL,
+                        tags JSONB NOT NULL,
+                        updated_at TIMESTAMP NOT NULL,
+                        superseded_at TIMESTAMP NOT NULL,
+                        content_bytes INT NOT NULL,
+                        delta BYTEA NOT NULL,
+                        PRIMARY KEY (doc_id, version)
+                    )
+                """))
+                await conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS document_versions_superseded_at_idx "
+                    "ON document_versions (superseded_at)"
+                ))
+                await conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS document_chunks (
+                        doc_id VARCHAR(36) NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                        chunk_hash CHAR(32) NOT NULL,
+                        vector vector(384) NOT NULL,
+                        PRIMARY KEY (doc_id, chunk_hash)
+                    )
+                """))
+            return True
+        except Exception:
+            logger.exception("Error creating version tables")
+            return False
+
+    async def update_with_version(
+        self,
+        store: DocumentStore,
+        doc_id: str,
+        update_data: Dict[str, Any],
+        record: Dict[str, Any],
+        chunks: Optional[Dict[str, List[float]]] = None,
+    ) -> bool:
+        # store is self.manager (or one of its layers); everything runs in one transaction on the primary
+        require_primary_reads()
+        async with self.manager.session_factory() as session:
+            async with session.begin():
+                rows = await self.manager._fetch_all(session, "lock_document", text(
+                    "SELECT updated_at FROM documents WHERE id = :doc_id FOR UPDATE"
+                ), {"doc_id": doc_id})
+                if not rows or rows[0].updated_at != datetime.fromisoformat(record["updated_at"]):
+                    return False
+                rows = await self.manager._fetch_all(session, "latest_version", text(
+                    "SELECT COALESCE(MAX(version), 0) AS version FROM document_versions WHERE doc_id = :doc_id"
+                ), {"doc_id": doc_id})
+                await self.manager._execute(session, "insert_version", text("""
+                    INSERT INTO document_versions
+                        (doc_id, version, title, category, tags, updated_at, superseded_at, content_bytes, delta)
+                    VALUES
+                        (:doc_id, :version, :title, :category, :tags, :updated_at, :superseded_at, :content_bytes, :delta)
+                """), {
+                    **record,
+                    "version": rows[0].version + 1,
+                    "tags": json.dumps(record["tags"]),
+                    "updated_at": datetime.fromisoformat(record["updated_at"]),
+                    "superseded_at": datetime.fromisoformat(record["superseded_at"]),
+                })
+                query, params = self.manager.update_statement(doc_id, update_data, update_data.get("vector"))
+                await self.manager._execute(session, "update_document", query, params)
+                if chunks is not None:
+                    await self._write_chunks(session, doc_id, chunks)
+        return True
+
+    async def list_versions(self, doc_id: str) -> List[Dict[str, Any]]:
+        async with self.manager.session_factory() as session:
+            rows = await self.manager._fetch_all(session, "list_versions", text("""
+                SELECT doc_id, version, title, category, tags, updated_at, superseded_at, content_bytes, delta
+                FROM document_versions
+                WHERE doc_id = :doc_id
+                ORDER BY version DESC
+            """), {"doc_id": doc_id})
+        versions = []
+        for row in rows:
+            record = dict(row._mapping)
+            record["tags"] = json.loads(record["tags"]) if isinstance(record["tags"], str) else record["tags"]
+            record["delta"] = bytes(record["delta"])
+            record["updated_at"] = record["updated_at"].isoformat()
+            record["superseded_at"] = record["superseded_at"].isoformat()
+            versions.append(record)
+        return versions
+
+    async def changed_since(self, since: datetime, limit: int = 100) -> List[Dict[str, Any]]:
+        async with self.manager.session_factory() as session:
+            rows = await self.manager._fetch_all(session, "changed_since", text("""
+                SELECT doc_id, version, superseded_at
+                FROM document_versions
+                WHERE superseded_at >= :since
+                ORDER BY superseded_at DESC
+                LIMIT :limit
+            """), {"since": since, "limit": limit})
+        return [
+            {"doc_id": row.doc_id, "version": row.version, "superseded_at": row.superseded_at.isoformat()}
+            for row in rows
+        ]
+
+    async def get_chunks(self, doc_id: str) -> Dict[str, List[float]]:
+        async with self.manager.session_factory() as session:
+            rows = await self.manager._fetch_all(session, "get_chunks", text(
+                "SELECT chunk_hash, CAST(vector AS text) AS vector FROM document_chunks WHERE doc_id = :doc_id"
+            ), {"doc_id": doc_id})
+        return {row.chunk_hash: json.loads(row.vector) for row in rows}
+
+    async def set_chunks(self, doc_id: str, chunks: Dict[str, List[float]]) -> None:
+        async with self.manager.session_factory() as session:
+            async with session.begin():
+                await self._write_chunks(session, doc_id, chunks)
+
+    async def _write_chunks(self, session, doc_id: str, chunks: Dict[str, List[float]]) -> None:
+        from app.database.vector import to_pgvector
+
+        await self.manager._execute(session, "delete_chunks", text(
+            "DELETE FROM document_chunks WHERE doc_id = :doc_id"
+        ), {"doc_id": doc_id})
+        await self.manager._execute(session, "insert_chunks", text("""
+            INSERT INTO document_chunks (doc_id, chunk_hash, vector)
+            SELECT :doc_id, h, CAST(v AS vector)
+            FROM unnest(CAST(:hashes AS text[]), CAST(:vectors AS text[])) AS c(h, v)
+        """), {
+            "doc_id": doc_id,
+            "hashes": list(chunks),
+            "vectors": [to_pgvector(vector) for vector in chunks.values()],
+        })
+
+    async def delete(self, doc_id: str) -> None:
+        # Rows are removed with the document (ON DELETE CASCADE)
+        return None
+
+
+class VersionedDocumentStore(DocumentStoreProxy):
+    """DocumentStore layer keeping version history and chunk embeddings"""
+
+    def __init__(self, store: DocumentStore, versions: VersionStore, max_chunk_chars: Optional[int] = None):
+        """
+        Args:
+            store: Document store doing the actual work
+            versions: Store for past versions and chunk embeddings
+            max_chunk_chars: Longest chunk embedded separately (VERSION_CHUNK_CHARS)
+        """
+        super().__init__(store)
+        self.versions = versions
+        self.max_chunk_chars = max_chunk_chars or settings.version_chunk_chars
+
+    async def connect(self) -> bool:
+        return await self.store.connect() and await self.versions.connect()
+
+    async def embed_chunks(
+        self, title: str, content: str, previous: Optional[Dict[str, List[float]]] = None
+    ) -> Tuple[List[float], Dict[str, List[float]]]:
+        """
+        Document embedding assembled from chunk embeddings
+
+        Args:
+            title: Document title (embedded as its own chunk)
+            content: Document content
+            previous: Chunk embeddings already stored, by hash
+
+        Returns:
+            (normalised mean of the chunk vectors, chunk vectors by hash);
+            only chunks missing from previous are embedded
+        """
+        previous = previous or {}
+        chunks = {chunk_hash(chunk): chunk for chunk in [title, *split_chunks(content, self.max_chunk_chars)]}
+        missing = [digest for digest in chunks if digest not in previous]
+        vectors = {digest: previous[digest] for digest in chunks if digest in previous}
+        if missing:
+            for digest, vector in zip(missing, await self.embed_many([chunks[d] for d in missing])):
+                vectors[digest] = [float(v) for v in vector]
+        CHUNK_EMBEDDINGS.inc(len(missing), result="embedded")
+        CHUNK_EMBEDDINGS.inc(len(chunks) - len(missing), result="reused")
+
+        mean = np.mean(np.asarray(list(vectors.values()), dtype=np.float32), axis=0)
+        norm = np.linalg.norm(mean)
+        return (mean / norm if norm > 0 else mean).tolist(), vectors
+
+    async def create_document(self, doc_data: Dict[str, Any]) -> str:
+        for field in ("title", "content"):
+            if field not in doc_data:
+                raise ValueError(f"Missing required field: {field}")
+        vector, chunks = await self.embed_chunks(doc_data["title"], doc_data["content"])
+        doc_id = await self.store.create_document(dict(doc_data, vector=vector))
+        await self.versions.set_chunks(doc_id, chunks)
+        return doc_id
+
+    async def update_document(self, doc_id: str, update_data: Dict[str, Any]) -> bool:
+        """
+        Update a document and record the version it replaces
+
+        Raises:
+            ConcurrentUpdateError: Other updates kept landing first
+        """
+        # Read what the delta is computed from where the update will be written
+        require_primary_reads()
+        for _ in range(UPDATE_ATTEMPTS):
+            existing = await self.store.get_document(doc_id)
+            if existing is None:
+                return False
+
+            title = update_data.get("title", existing["title"])
+            content = update_data.get("content", existing["content"])
+            chunks = None
+            if title != existing["title"] or content != existing["content"]:
+                vector, chunks = await self.embed_chunks(title, content, await self.versions.get_chunks(doc_id))
+                changes = dict(update_data, vector=vector)
+            else:
+                # Unchanged text keeps its embedding
+                changes = {k: v for k, v in update_data.items() if k not in ("title", "content")}
+
+            record = {
+                "doc_id": doc_id,
+                "title": existing["title"],
+                "category": existing["category"],
+                "tags": list(existing["tags"]),
+                "updated_at": existing["updated_at"],
+                "superseded_at": datetime.now().isoformat(),
+                "content_bytes": len(existing["content"].encode()),
+                "delta": make_delta(content, existing["content"]),
+            }
+            if await self.versions.update_with_version(self.store, doc_id, changes, record, chunks):
+                return True
+            log_event(logger, logging.DEBUG, "Document changed during update, retrying", doc_id=doc_id)
+        raise ConcurrentUpdateError(f"Document {doc_id} kept changing during the update")
+
+    async def delete_document(self, doc_id: str) -> bool:
+        deleted = await self.store.delete_document(doc_id)
+        if deleted:
+            await self.versions.delete(doc_id)
+        return deleted
+
+    async def document_versions(self, doc_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Version history of a document, current version first
+
+        Returns:
+            Version metadata (see VERSION_FIELDS), or None if the document does not exist
+        """
+        current = await self.store.get_document(doc_id)
+        if current is None:
+            return None
+        stored = await self.versions.list_versions(doc_id)
+        content_bytes = len(current["content"].encode())
+        history = [{
+            "version": (stored[0]["version"] if stored else 0) + 1,
+            "title": current["title"],
+            "category": current["category"],
+            "tags": current["tags"],
+            "updated_at": current["updated_at"],
+            "superseded_at": None,
+            "content_bytes": content_bytes,
+            "stored_bytes": content_bytes,
+        }]
+        for record in stored:
+            history.append({field: record.get(field) for field in VERSION_FIELDS[:-1]})
+            history[-1]["stored_bytes"] = len(record["delta"])
+        return history
+
+    async def get_document_version(self, doc_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """
+        A document as it was at a version, rebuilt from the current text
+
+        Returns:
+            Document dict of that version (with "version"), or None if either does not exist
+        """
+        current = await self.store.get_document(doc_id)
+        if current is None:
+            return None
+        stored = await self.versions.list_versions(doc_id)
+        latest = (stored[0]["version"] if stored else 0) + 1
+        if version == latest:
+            return dict(current, version=latest)
+        if not 1 <= version < latest:
+            return None
+
+        content = current["content"]
+        for record in stored:
+            content = apply_delta(content, record["delta"])
+            if record["version"] == version:
+                return dict(
+                    current,
+                    title=record["title"],
+                    category=record["category"],
+                    tags=list(record["tags"]),
+                    content=content,
+                    updated_at=record["updated_at"],
+                    version=version,
+                )
+        return None
+
+    async def diff_versions(
+        self, doc_id: str, from_version: Optional[int] = None, to_version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Sentence-level unified diff between two versions
+
+        Args:
+            doc_id: Document ID
+            from_version: Older version (defaults to the one before to_version)
+            to_version: Newer version (defaults to the current one)
+
+        Returns:
+            {"from_version", "to_version", "diff", "added", "removed"}, or None
+            if the document or a version does not exist
+        """
+        history = await self.document_versions(doc_id)
+        if history is None:
+            return None
+        to_version = to_version or history[0]["version"]
+        from_version = from_version or max(to_version - 1, 1)
+        new = await self.get_document_version(doc_id, to_version)
+        old = await self.get_document_version(doc_id, from_version)
+        if new is None or old is None:
+            return None
+        result = diff_texts(old["content"], new["content"], f"v{from_version}", f"v{to_version}")
+        return {"from_version": from_version, "to_version": to_version, **result}
+
+    async def changed_since(self, since: datetime, limit: int = 100) -> List[Dict[str, Any]]:
+        """Versions superseded since a time, newest first"""
+        return await self.versions.changed_since(since, limit)
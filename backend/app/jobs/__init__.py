@@ -0,0 +1,3 @@
+"""
+Batch jobs run outside the request path (python -m app.jobs.<name>)
+"""
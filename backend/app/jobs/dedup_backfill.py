@@ -0,0 +1,122 @@
+"""
+Near-duplicate backfill for the existing corpus
+
+Computes a MinHash signature for every stored document, then walks the
+documents from oldest to newest: each is matched against the documents
+indexed before it, linked to its near-duplicates in the graph
+(DUPLICATE_OF / SUPERSEDES from the newer document) and indexed itself.
+Matches against documents created later are ignored, so the job can be
+re-run safely; edges are merged, not duplicated, in Neo4j.
+
+From backend/:
+    python -m app.jobs.dedup_backfill
+    python -m app.jobs.dedup_backfill --no-link   # only (re)build the signature index
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.dedup import DuplicateDetector
+from app.core.logging import get_logger, log_event
+from app.core.metrics import DUPLICATE_MATCHES
+from app.core.tracing import span
+from app.database.base import DocumentStore, GraphStore
+
+logger = get_logger(__name__)
+
+
+async def backfill(
+    store: DocumentStore,
+    detector: DuplicateDetector,
+    graph: Optional[GraphStore] = None,
+    page_size: int = 500,
+) -> Dict[str, Any]:
+    """
+    Index every document and link near-duplicates
+
+    Args:
+        store: Document store to read from
+        detector: Detector whose index is filled
+        graph: Graph store for the edges (None to only build the index)
+        page_size: Documents read per list_documents call
+
+    Returns:
+        Run statistics
+    """
+    start = time.perf_counter()
+    signed: List[Tuple[datetime, str, np.ndarray]] = []
+    with span("dedup_backfill.signatures"):
+        skip = 0
+        while True:
+            page = await store.list_documents(skip=skip, limit=page_size)
+            for doc in page:
+                signature = detector.hasher.signature(f"{doc['title']} {doc['content']}")
+                signed.append((datetime.fromisoformat(doc["created_at"]), doc["id"], signature))
+            if len(page) < page_size:
+                break
+            skip += page_size
+
+    signed.sort(key=lambda item: item[:2])
+    created_at = {doc_id: created for created, doc_id, _ in signed}
+    matches_found, edges = 0, 0
+    with span("dedup_backfill.index", documents=len(signed)):
+        for created, doc_id, signature in signed:
+            matches = [
+                match for match in await detector.find(signature, exclude=doc_id)
+                if match["id"] in created_at and (created_at[match["id"]], match["id"]) < (created, doc_id)
+            ]
+            await detector.index.add(doc_id, signature, detector.hasher.buckets(signature))
+            for match in matches:
+                DUPLICATE_MATCHES.inc(relation=match["relation"])
+            matches_found += len(matches)
+            if graph is not None and matches:
+                edges += await detector.link(graph, doc_id, matches)
+
+    stats = {
+        "documents": len(signed),
+        "matches": matches_found,
+        "edges_created": edges,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+    }
+    log_event(logger, logging.INFO, "Near-duplicate backfill finished", **stats)
+    return stats
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.database.factory import db_manager, duplicate_detector, graph_manager
+
+    if duplicate_detector is None:
+        raise RuntimeError("DEDUP_ENABLED is off")
+    if not await db_manager.connect():
+        raise RuntimeError("Could not connect to the document store")
+    graph = None
+    if not args.no_link:
+        if not await graph_manager.connect():
+            raise RuntimeError("Could not connect to the graph store")
+        graph = graph_manager
+    try:
+        return await backfill(db_manager, duplicate_detector, graph, page_size=args.page_size)
+    finally:
+        if graph is not None:
+            await graph.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-link", action="store_true", help="Only build the signature index")
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
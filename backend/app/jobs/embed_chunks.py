@@ -0,0 +1,101 @@
+"""
+Chunk re-embedding for the existing corpus
+
+With VERSIONING_ENABLED, a document's embedding is the normalised mean of
+its title and content chunk embeddings instead of one embedding of the
+whole text. Documents stored before versioning was enabled still carry
+the old embedding, which lives in a different part of the vector space,
+so turning versioning on for an existing corpus leaves search ranking the
+two kinds of vectors against each other. This job re-embeds every
+document whose stored chunks do not match its current text, and stores
+its chunks so later updates only embed what they change. Documents
+already embedded by chunks are skipped, so the job can be re-run.
+
+Run it right after enabling VERSIONING_ENABLED. A document updated while
+the job is working on it is skipped (the update embedded it already).
+
+From backend/:
+    VERSIONING_ENABLED=true python -m app.jobs.embed_chunks
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.chunking import chunk_hash, split_chunks
+from app.core.logging import get_logger, log_event
+from app.core.tracing import span
+from app.database.versions import VersionedDocumentStore
+
+logger = get_logger(__name__)
+
+
+async def embed_chunks(store: VersionedDocumentStore, page_size: int = 500) -> Dict[str, Any]:
+    """
+    Re-embed documents whose stored chunks do not match their text
+
+    Args:
+        store: Versioned document store
+        page_size: Documents read per list_documents call
+
+    Returns:
+        Run statistics
+    """
+    start = time.perf_counter()
+    stats = {"documents": 0, "embedded": 0, "skipped": 0, "changed": 0}
+    skip = 0
+    while True:
+        # Writes only replace vectors, so the newest-first pages stay stable
+        page = await store.store.list_documents(skip=skip, limit=page_size)
+        with span("embed_chunks.page", documents=len(page)):
+            for doc in page:
+                stats["documents"] += 1
+                stored = await store.versions.get_chunks(doc["id"])
+                texts = [doc["title"], *split_chunks(doc["content"], store.max_chunk_chars)]
+                if set(stored) == {chunk_hash(chunk) for chunk in texts}:
+                    stats["skipped"] += 1
+                    continue
+                vector, chunks = await store.embed_chunks(doc["title"], doc["content"], stored)
+                current = await store.store.get_document(doc["id"])
+                if current is None or current["updated_at"] != doc["updated_at"]:
+                    stats["changed"] += 1
+                    continue
+                await store.store.update_document(doc["id"], {"vector": vector})
+                await store.versions.set_chunks(doc["id"], chunks)
+                stats["embedded"] += 1
+        if len(page) < page_size:
+            break
+        skip += page_size
+
+    stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+    log_event(logger, logging.INFO, "Chunk re-embedding finished", **stats)
+    return stats
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.database.factory import db_manager
+
+    store = db_manager
+    while not isinstance(store, VersionedDocumentStore):
+        store = getattr(store, "store", None)
+        if store is None:
+            raise RuntimeError("Version history is disabled (set VERSIONING_ENABLED=true)")
+    if not await db_manager.connect():
+        raise RuntimeError("Could not connect to the document store")
+    return await embed_chunks(store, page_size=args.page_size)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
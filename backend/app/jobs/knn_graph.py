@@ -0,0 +1,245 @@
+"""
+Corpus-wide kNN graph job proposing RELATED_TO edges
+
+Streams every stored embedding from the document store, finds each
+document's k most similar documents with blocked matrix multiplication
+(one block of queries against the whole corpus at a time, so memory stays
+bounded by block_size x corpus size scores) and writes them to the graph as
+RELATED_TO edges with confidence = cosine similarity. Edges are tagged
+origin="knn" and replaced per source, so manually created edges are never
+touched.
+
+Runs are incremental by default: only documents created or updated since
+the previous run (tracked by their updated_at in KNN_STATE_PATH) are
+recomputed, together with their current neighbours (similarity is
+symmetric, so these are the lists a changed document is most likely to
+enter) and the documents whose kNN edges point at a changed document (whose
+lists it may have left). Lists that a changed document has not touched can
+still miss it; use --full now and then to rebuild every list.
+
+From backend/:
+    python -m app.jobs.knn_graph            # incremental
+    python -m app.jobs.knn_graph --full --k 10 --min-similarity 0.6
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import get_logger, log_event
+from app.core.tracing import span
+from app.database.base import DocumentStore, GraphStore
+
+logger = get_logger(__name__)
+
+REL_TYPE = "RELATED_TO"
+ORIGIN = "knn"
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalise each row (zero rows are left as zeros)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1)
+
+
+def blocked_top_k(
+    queries: np.ndarray,
+    corpus: np.ndarray,
+    k: int,
+    block_size: int = 1024,
+    self_rows: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k corpus rows by dot product for every query row
+
+    Args:
+        queries: (q, d) float32 unit vectors
+        corpus: (n, d) float32 unit vectors
+        k: Neighbours per query
+        block_size: Query rows scored per matrix multiplication
+        self_rows: Corpus row of each query, excluded from its own results
+
+    Returns:
+        (indices, scores), both (q, min(k, n)) and best first; excluded
+        slots have score -inf
+    """
+    k = min(k, len(corpus))
+    indices = np.empty((len(queries), k), dtype=np.int64)
+    scores = np.empty((len(queries), k), dtype=np.float32)
+    for start in range(0, len(queries), block_size):
+        block = queries[start:start + block_size] @ corpus.T
+        if self_rows is not None:
+            block[np.arange(len(block)), self_rows[start:start + block_size]] = -np.inf
+        candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(block, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        indices[start:start + len(block)] = np.take_along_axis(candidates, order, axis=1)
+        scores[start:start + len(block)] = np.take_along_axis(candidate_scores, order, axis=1)
+    return indices, scores
+
+
+def load_state(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(path: str, state: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+class KnnGraphJob:
+    """Computes document kNN lists and writes them as graph edges"""
+
+    def __init__(
+        self,
+        store: DocumentStore,
+        graph: GraphStore,
+        k: Optional[int] = None,
+        min_similarity: Optional[float] = None,
+        block_size: Optional[int] = None,
+        write_batch_size: int = 500,
+        state_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            store: Document store the vectors are read from
+            graph: Graph store the edges are written to
+            k: Neighbours per document (defaults to KNN_K)
+            min_similarity: Edges below this cosine similarity are dropped (KNN_MIN_SIMILARITY)
+            block_size: Query rows per matrix multiplication (KNN_BLOCK_SIZE)
+            write_batch_size: Source documents per graph write
+            state_path: File recording the last run's watermark (KNN_STATE_PATH)
+        """
+        self.store = store
+        self.graph = graph
+        self.k = k or settings.knn_k
+        self.min_similarity = settings.knn_min_similarity if min_similarity is None else min_similarity
+        self.block_size = block_size or settings.knn_block_size
+        self.write_batch_size = write_batch_size
+        self.state_path = state_path or settings.knn_state_path
+
+    async def load_vectors(self) -> Tuple[List[str], np.ndarray, List[datetime]]:
+        """Stream every embedding into one normalised matrix"""
+        ids: List[str] = []
+        blocks: List[np.ndarray] = []
+        updated_at: List[datetime] = []
+        async for batch_ids, vectors, batch_updated_at in self.store.iter_vectors():
+            ids.extend(batch_ids)
+            blocks.append(np.asarray(vectors, dtype=np.float32))
+            updated_at.extend(datetime.fromisoformat(value) for value in batch_updated_at)
+        matrix = normalize_rows(np.vstack(blocks)) if blocks else np.zeros((0, 0), dtype=np.float32)
+        return ids, matrix, updated_at
+
+    def _neighbours(self, matrix: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return blocked_top_k(matrix[rows], matrix, self.k, self.block_size, self_rows=rows)
+
+    async def write_edges(
+        self, ids: List[str], rows: np.ndarray, indices: np.ndarray, scores: np.ndarray
+    ) -> int:
+        """Replace the kNN edges of the given source rows, in batches"""
+        written = 0
+        for start in range(0, len(rows), self.write_batch_size):
+            end = start + self.write_batch_size
+            source_ids = [ids[row] for row in rows[start:end]]
+            edges = [
+                {"source": source_id, "target": ids[target], "confidence": round(float(score), 4)}
+                for source_id, targets, row_scores in zip(source_ids, indices[start:end], scores[start:end])
+                for target, score in zip(targets, row_scores)
+                if score >= self.min_similarity
+            ]
+            written += await self.graph.replace_relationships(REL_TYPE, ORIGIN, source_ids, edges)
+        return written
+
+    async def run(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Recompute kNN edges
+
+        Args:
+            full: Recompute every document instead of only changed ones and their neighbours
+
+        Returns:
+            Run statistics
+        """
+        start = time.perf_counter()
+        state = {} if full else load_state(self.state_path)
+        watermark = datetime.fromisoformat(state["watermark"]) if state.get("watermark") else None
+
+        with span("knn_graph.load_vectors"):
+            ids, matrix, updated_at = await self.load_vectors()
+        stats: Dict[str, Any] = {"mode": "incremental" if watermark else "full", "documents": len(ids)}
+        if len(ids) < 2:
+            stats.update(sources=0, edges_written=0, elapsed_s=round(time.perf_counter() - start, 3))
+            return stats
+
+        with span("knn_graph.top_k", documents=len(ids)):
+            if watermark is None:
+                rows = np.arange(len(ids))
+            else:
+                changed = np.array([i for i, value in enumerate(updated_at) if value > watermark], dtype=np.int64)
+                if len(changed):
+                    changed_indices, _ = self._neighbours(matrix, changed)
+                    rows = np.union1d(changed, changed_indices.ravel())
+                    # Lists holding a changed document from before its change
+                    positions = {doc_id: i for i, doc_id in enumerate(ids)}
+                    pointing = await self.graph.relationship_sources(REL_TYPE, ORIGIN, [ids[i] for i in changed])
+                    stale = [positions[doc_id] for doc_id in pointing if doc_id in positions]
+                    rows = np.union1d(rows, np.array(stale, dtype=np.int64))
+                else:
+                    rows = changed
+            indices, scores = self._neighbours(matrix, rows) if len(rows) else (rows, rows)
+
+        with span("knn_graph.write_edges", sources=len(rows)):
+            written = await self.write_edges(ids, rows, indices, scores)
+
+        save_state(self.state_path, {
+            "watermark": max(updated_at).isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "k": self.k,
+            "min_similarity": self.min_similarity,
+        })
+        stats.update(
+            sources=int(len(rows)),
+            edges_written=written,
+            elapsed_s=round(time.perf_counter() - start, 3),
+        )
+        log_event(logger, logging.INFO, "kNN graph job finished", **stats)
+        return stats
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.database.factory import db_manager, graph_manager
+
+    if not await db_manager.connect() or not await graph_manager.connect():
+        raise RuntimeError("Could not connect to the document and graph stores")
+    try:
+        job = KnnGraphJob(db_manager, graph_manager, k=args.k, min_similarity=args.min_similarity)
+        return await job.run(full=args.full)
+    finally:
+        await graph_manager.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="Recompute every document's neighbours")
+    parser.add_argument("--k", type=int, help="Neighbours per document (default: KNN_K)")
+    parser.add_argument("--min-similarity", type=float, help="Minimum cosine similarity (default: KNN_MIN_SIMILARITY)")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
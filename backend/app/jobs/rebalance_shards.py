@@ -0,0 +1,94 @@
+"""
+Shard rebalancing for POSTGRES_SHARD_URIS
+
+After a shard is added (append its URI; never reorder the list, and set
+SHARD_PREVIOUS_COUNT to the old count), the jump hash gives about 1/N of
+the documents a new owner. plan lists how many documents each shard holds
+that belong elsewhere; run moves them in batches, copying each document
+with its versions, chunks and duplicate signatures before deleting the
+original. The API keeps serving during the move: reads by ID find
+documents not yet moved on their previous shard, and an original written
+after it was copied is copied again rather than deleted (see
+ShardedDocumentStore.move_documents). An interrupted run can simply be
+started again; once plan reports nothing to move, unset
+SHARD_PREVIOUS_COUNT. Graph nodes are not sharded and are left untouched.
+
+From backend/:
+    python -m app.jobs.rebalance_shards plan
+    python -m app.jobs.rebalance_shards run --batch-size 500
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.logging import get_logger, log_event
+from app.core.metrics import SHARD_DOCUMENTS_MOVED
+from app.core.tracing import span
+from app.database.sharded import ShardedDocumentStore
+
+logger = get_logger(__name__)
+
+
+async def rebalance(store: ShardedDocumentStore, batch_size: int = 500, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Move every document to the shard owning its ID
+
+    Args:
+        store: Sharded document store
+        batch_size: Documents per scan batch and per move
+        dry_run: Only count the documents that would move
+
+    Returns:
+        Run statistics, with the documents to move (or moved) per "source->target"
+    """
+    start = time.perf_counter()
+    with span("rebalance_shards.scan"):
+        moves = await store.misplaced(batch_size)
+    stats: Dict[str, Any] = {
+        "shards": len(store.shards),
+        "misplaced": {f"{source}->{target}": len(ids) for (source, target), ids in sorted(moves.items())},
+        "moved": {},
+    }
+    if not dry_run:
+        for (source, target), ids in sorted(moves.items()):
+            moved = 0
+            with span("rebalance_shards.move", source=source, target=target, documents=len(ids)):
+                for offset in range(0, len(ids), batch_size):
+                    moved += await store.move_documents(source, target, ids[offset:offset + batch_size])
+            SHARD_DOCUMENTS_MOVED.inc(moved, source=str(source), target=str(target))
+            stats["moved"][f"{source}->{target}"] = moved
+    stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+    log_event(logger, logging.INFO, "Shard rebalance finished", dry_run=dry_run, **stats)
+    return stats
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.database.factory import db_manager
+
+    # Move on the sharded store itself, below the cache and version layers
+    store = db_manager
+    while not isinstance(store, ShardedDocumentStore):
+        store = getattr(store, "store", None)
+        if store is None:
+            raise RuntimeError("Sharding is not configured (set POSTGRES_SHARD_URIS)")
+    if not await db_manager.connect():
+        raise RuntimeError("Could not connect to every shard")
+    return await rebalance(store, args.batch_size, dry_run=args.command == "plan")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["plan", "run"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
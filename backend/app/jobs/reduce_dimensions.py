@@ -0,0 +1,140 @@
+"""
+Projection fitting and reduced-vector backfill for coarse-to-fine search
+
+fit streams the stored embeddings, fits a PCA projection on a uniform
+sample of them and saves it to REDUCED_PROJECTION_PATH. backfill projects
+every stored embedding and writes it to the reduced column (recreated when
+the dimensions change). refit does both. Running workers keep the
+projection they loaded at startup, so restart them after a refit.
+
+From backend/:
+    python -m app.jobs.reduce_dimensions refit --dimensions 64
+    python -m app.jobs.reduce_dimensions fit --dimensions 128 --sample 50000
+    python -m app.jobs.reduce_dimensions backfill
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import get_logger, log_event
+from app.core.projection import Projection
+from app.core.tracing import span
+from app.database.base import DocumentStore
+
+logger = get_logger(__name__)
+
+
+async def sample_vectors(store: DocumentStore, sample_size: int, seed: int = 0, batch_size: int = 1000) -> np.ndarray:
+    """Uniform sample of stored embeddings (reservoir sampling over iter_vectors)"""
+    rng = random.Random(seed)
+    sample: List[np.ndarray] = []
+    seen = 0
+    async for _, vectors, _ in store.iter_vectors(batch_size):
+        for vector in vectors:
+            if len(sample) < sample_size:
+                sample.append(vector)
+            else:
+                slot = rng.randrange(seen + 1)
+                if slot < sample_size:
+                    sample[slot] = vector
+            seen += 1
+    return np.array(sample, dtype=np.float32)
+
+
+async def fit_projection(store: DocumentStore, dimensions: int, sample_size: int = 20000, seed: int = 0) -> Projection:
+    """
+    Fit a PCA projection on the stored embeddings
+
+    Args:
+        store: Document store to read embeddings from
+        dimensions: Reduced dimensions
+        sample_size: Maximum embeddings used for the fit
+        seed: Sampling seed
+
+    Returns:
+        Fitted projection
+    """
+    with span("reduce_dimensions.fit", dimensions=dimensions):
+        sample = await sample_vectors(store, sample_size, seed)
+        projection = Projection.fit(sample, dimensions)
+    log_event(
+        logger, logging.INFO, "Projection fitted",
+        dimensions=dimensions, sample=len(sample), fingerprint=projection.fingerprint,
+        explained_variance=round(float(projection.explained_variance.sum()), 4),
+    )
+    return projection
+
+
+async def backfill(store: DocumentStore, projection: Projection, batch_size: int = 1000) -> Dict[str, Any]:
+    """
+    Write reduced vectors for every stored document and switch the store to the projection
+
+    Args:
+        store: Postgres or memory document store (or a layer over one)
+        projection: Projection to apply
+        batch_size: Documents per read and write
+
+    Returns:
+        Run statistics
+    """
+    if not hasattr(store, "write_reduced_vectors"):
+        raise RuntimeError("This document store has no reduced vector support")
+    start = time.perf_counter()
+    store.set_projection(projection)
+    if not await store.prepare_reduced_vectors(projection.dimensions):
+        raise RuntimeError("Could not prepare the reduced vector column")
+    written = 0
+    with span("reduce_dimensions.backfill", dimensions=projection.dimensions):
+        async for ids, vectors, _ in store.iter_vectors(batch_size):
+            written += await store.write_reduced_vectors(ids, projection.project(vectors))
+    stats = {
+        "dimensions": projection.dimensions,
+        "fingerprint": projection.fingerprint,
+        "explained_variance": round(float(projection.explained_variance.sum()), 4),
+        "documents": written,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+    }
+    log_event(logger, logging.INFO, "Reduced vector backfill finished", **stats)
+    return stats
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.database.factory import db_manager
+
+    if not await db_manager.connect():
+        raise RuntimeError("Could not connect to the document store")
+    stats: Dict[str, Any] = {}
+    if args.command in ("fit", "refit"):
+        projection = await fit_projection(db_manager, args.dimensions, args.sample, args.seed)
+        projection.save(args.path)
+        stats.update(path=args.path, fingerprint=projection.fingerprint,
+                     explained_variance=round(float(projection.explained_variance.sum()), 4))
+    if args.command in ("backfill", "refit"):
+        stats.update(await backfill(db_manager, Projection.load(args.path), args.batch_size))
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["fit", "backfill", "refit"])
+    parser.add_argument("--dimensions", type=int, default=settings.reduced_dimensions or 64)
+    parser.add_argument("--sample", type=int, default=20000, help="Embeddings used to fit the projection")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--path", default=settings.reduced_projection_path)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
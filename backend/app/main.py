@@ -4,14 +4,19 @@ Main application entry point for the AI Legislation Tracking System
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database.vector import db_manager
-from app.routers import health, document, graph
+from app.core.consistency import ConsistencyMiddleware
+from app.core.logging import RequestLoggingMiddleware
+from app.core.metrics import MetricsMiddleware, TimedJSONResponse
+from app.core.profiling import ProfilingMiddleware
+from app.core.tracing import TracingMiddleware
+from app.routers import health, document, graph, metrics, admin
 
 # Create FastAPI application
 app = FastAPI(
     title="AI Legislation Tracking System",
     description="API for tracking and analyzing AI legislation",
     version="0.1.0",
+    default_response_class=TimedJSONResponse,
 )
 
 # Configure CORS middleware
@@ -23,7 +28,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profile individual requests on demand (PROFILING_ENABLED + X-Profile header)
+app.add_middleware(ProfilingMiddleware)
+
+# Log one structured line per request and tag records with the route
+app.add_middleware(RequestLoggingMiddleware)
+
+# Record total latency per route for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Scope read-your-writes routing (X-Read-Your-Writes, or a write earlier in the request) to one request
+app.add_middleware(ConsistencyMiddleware)
+
+# Open a sampled trace per request (see TRACE_EXPORTER / TRACE_SAMPLE_RATE)
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(health.router)
 app.include_router(document.router)
 app.include_router(graph.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
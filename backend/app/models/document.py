@@ -44,6 +44,96 @@ class DocumentResponse(DocumentBase):
         from_attributes = True
 
 
+class SearchQuery(BaseModel):
+    """One query of a batch search"""
+    q: str = Field(..., description="Search query")
+    limit: int = Field(default=10, ge=1, le=100, description="Maximum number of results")
+    category: Optional[str] = Field(default=None, description="Optional category filter")
+
+
+class BatchSearchRequest(BaseModel):
+    """Several searches run together; results are returned in the same order"""
+    queries: List[SearchQuery] = Field(..., min_length=1, max_length=100, description="Queries to run")
+
+
+class DocumentVersion(BaseModel):
+    """One version in a document's history"""
+    version: int
+    title: str
+    category: str
+    tags: List[str] = Field(default_factory=list)
+    updated_at: datetime = Field(..., description="When this version was written")
+    superseded_at: Optional[datetime] = Field(default=None, description="When the next version replaced it")
+    content_bytes: int = Field(..., description="Size of the version's content")
+    stored_bytes: int = Field(..., description="Bytes stored for it (full text for the current version, delta otherwise)")
+
+
+class DocumentVersionContent(DocumentResponse):
+    """A document as it was at a version"""
+    version: int
+
+
+class DocumentDiff(BaseModel):
+    """Sentence-level difference between two versions"""
+    from_version: int
+    to_version: int
+    diff: str = Field(..., description="Unified diff, one sentence per line")
+    added: int
+    removed: int
+
+
+class DocumentChange(BaseModel):
+    """A version replaced by an update"""
+    doc_id: str
+    version: int
+    superseded_at: datetime
+
+
+class ExpandedNeighbour(BaseModel):
+    """A graph neighbour of a search hit, through its best path"""
+    id: str
+    title: str = ""
+    rel_types: List[str] = Field(..., description="Relationship types along the path")
+    depth: int = Field(..., description="Hops from the hit")
+    confidence: float = Field(..., description="Product of edge confidences along the path")
+    score: float
+    node: Dict[str, Any] = Field(default_factory=dict, description="Graph node properties")
+
+
+class RelatedDocument(ExpandedNeighbour):
+    """A neighbour merged across all hits"""
+    via: List[str] = Field(..., description="Hits it was reached from")
+
+
+class ExpandedHit(BaseModel):
+    """A vector search hit with its graph neighbourhood"""
+    document: DocumentResponse
+    distance: float
+    score: float = Field(..., description="Cosine similarity to the query")
+    neighbours: List[ExpandedNeighbour] = Field(default_factory=list)
+
+
+class ExpandedSearchResponse(BaseModel):
+    """Vector search hits plus their neighbours, merged and ranked"""
+    hits: List[ExpandedHit]
+    related: List[RelatedDocument] = Field(default_factory=list)
+
+
+class IngestionJob(BaseModel):
+    """Status of an asynchronous ingestion job"""
+    id: str
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    total: int
+    completed: int
+    failed: int
+    progress: float = Field(..., description="Fraction of documents finished (succeeded or failed)")
+    document_ids: List[Optional[str]] = Field(..., description="Created document IDs, in submission order")
+    errors: List[str] = Field(default_factory=list)
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 # PostgreSQL Schema (for reference)
 # CREATE TABLE documents (
 #     id VARCHAR(36) PRIMARY KEY,
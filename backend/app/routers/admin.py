@@ -0,0 +1,50 @@
+"""
+Administrative endpoints for inspecting runtime diagnostics
+"""
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Query
+
+from app.core.slow_queries import slow_query_log
+from app.database.factory import db_manager, graph_cache, search_cache
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/slow-queries", response_model=List[Dict[str, Any]])
+async def list_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    engine: Optional[str] = Query(None, description="Filter by engine (postgres or neo4j)"),
+):
+    """Return recent slow statements with redacted parameters and captured plans"""
+    return slow_query_log.recent(limit=limit, engine=engine)
+
+
+@router.delete("/slow-queries", response_model=Dict[str, bool])
+async def clear_slow_queries():
+    """Clear the slow-query log"""
+    slow_query_log.clear()
+    return {"success": True}
+
+
+@router.get("/cache", response_model=List[Dict[str, Any]])
+async def cache_stats():
+    """Return hit rates and sizes of the result caches"""
+    return [cache.stats() for cache in (search_cache, graph_cache) if cache is not None]
+
+
+@router.delete("/cache", response_model=Dict[str, bool])
+async def clear_caches():
+    """Drop all cached results (generation counters are kept)"""
+    if search_cache is not None:
+        await search_cache.clear()
+    if graph_cache is not None:
+        graph_cache.clear()
+    return {"success": True}
+
+
+@router.get("/replicas", response_model=List[Dict[str, Any]])
+async def replica_health():
+    """Return the health and replay lag of each Postgres read replica"""
+    replicas = getattr(db_manager, "replicas", None)
+    return replicas.stats() if replicas is not None else []
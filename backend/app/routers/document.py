@@ -1,23 +1,66 @@
-from fastapi import APIRouter, HTTPException, Query, Depends, BackgroundTasks
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Body, HTTPException, Query, Depends
+from fastapi.responses import JSONResponse
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Dict, Any
 from datetime import datetime
-import os
-from app.models.document import DocumentCreate, DocumentUpdate, DocumentResponse
-from app.database.vector import DatabaseManager, db_manager
-from app.database.graph import GraphManager, graph_manager
+import logging
+from app.core.admission import AdmissionController, Overloaded, admission_scope
+from app.core.config import settings
+from app.core.expansion import expand_search_results
+from app.core.ingestion import IngestionQueue, QueueFull
+from app.core.logging import get_logger, log_event
+from app.core.metrics import SERIALIZATION_SECONDS
+from app.models.document import (
+    BatchSearchRequest,
+    DocumentChange,
+    DocumentCreate,
+    DocumentDiff,
+    DocumentResponse,
+    DocumentUpdate,
+    DocumentVersion,
+    DocumentVersionContent,
+    ExpandedSearchResponse,
+    IngestionJob,
+)
+from app.database.base import DocumentStore, GraphStore
+from app.database.factory import db_manager, duplicate_detector, graph_manager
+from app.database.versions import ConcurrentUpdateError
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
+logger = get_logger(__name__)
+
+
+def _build_document_response(doc: Dict[str, Any]) -> DocumentResponse:
+    """Convert a stored document dict into the API response model"""
+    return DocumentResponse(
+        id=doc["id"],
+        title=doc["title"],
+        content=doc["content"],
+        tags=doc["tags"],
+        category=doc["category"],
+        created_at=datetime.fromisoformat(doc["created_at"]),
+        updated_at=datetime.fromisoformat(doc["updated_at"])
+    )
+
+
+def to_document_response(doc: Dict[str, Any]) -> DocumentResponse:
+    """Build a single response model, timing the conversion"""
+    with SERIALIZATION_SECONDS.time(stage="model"):
+        return _build_document_response(doc)
+
+
+def to_document_responses(documents: List[Dict[str, Any]]) -> List[DocumentResponse]:
+    """Build response models for a list of documents, timing the conversion"""
+    with SERIALIZATION_SECONDS.time(stage="model"):
+        return [_build_document_response(doc) for doc in documents]
+
 async def get_db():
     """Dependency to get database manager"""
     try:
-        # Initialize database connection from environment variable if available
-        if os.environ.get("POSTGRES_URI") and db_manager.db_uri != os.environ.get("POSTGRES_URI"):
-            db_manager.db_uri = os.environ.get("POSTGRES_URI")
-            db_manager.engine = None
-        
-        if db_manager.engine is None or db_manager.session_factory is None:
-            print("Database connection not initialized, connecting...")
+        # POSTGRES_URI is applied when the store is created (app.database.factory)
+        if not db_manager.is_connected:
+            logger.info("Database connection not initialized, connecting...")
             success = await db_manager.connect()
             if not success:
                 raise HTTPException(
@@ -26,21 +69,35 @@ async def get_db():
                 )
         return db_manager
     except Exception as e:
-        import traceback
-        print(f"Error in get_db dependency: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in get_db dependency")
         raise HTTPException(
             status_code=500,
             detail=f"Database connection error: {str(e)}"
         )
 
+def versioned(db: DocumentStore) -> DocumentStore:
+    """The store if version history is enabled, else a 404"""
+    if getattr(db, "document_versions", None) is None:
+        raise HTTPException(status_code=404, detail="Version history is disabled")
+    return db
+
+async def record_duplicates(doc_id: str, title: str, content: str, graph_db: GraphStore) -> None:
+    """Index a document's signature and link its near-duplicates; never fails the request"""
+    if duplicate_detector is None:
+        return
+    try:
+        matches = await duplicate_detector.index_document(doc_id, f"{title} {content}")
+        await duplicate_detector.link(graph_db, doc_id, matches)
+    except Exception:
+        logger.exception(f"Error detecting near-duplicates of {doc_id}")
+
 async def get_graph_db():
     """Dependency to get graph database manager"""
     try:
         # In test environments, the graph_manager might be mocked
         # so we should avoid trying to connect if we're in a test
-        if not hasattr(get_graph_db, "_is_test") and graph_manager.driver is None:
-            print("Graph database connection not initialized, connecting...")
+        if not hasattr(get_graph_db, "_is_test") and not graph_manager.is_connected:
+            logger.info("Graph database connection not initialized, connecting...")
             success = await graph_manager.connect()
             if not success:
                 raise HTTPException(
@@ -49,107 +106,155 @@ async def get_graph_db():
                 )
         return graph_manager
     except Exception as e:
-        import traceback
-        print(f"Error in get_graph_db dependency: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in get_graph_db dependency")
         raise HTTPException(
             status_code=500,
             detail=f"Graph database connection error: {str(e)}"
         )
 
-@router.post("/", response_model=DocumentResponse)
+def graph_metadata(document: DocumentCreate) -> Dict[str, Any]:
+    """Graph node properties for a new document"""
+    if document.metadata:
+        # Convert Pydantic model to dict for Neo4j
+        return document.metadata.model_dump()
+    # Create default metadata
+    return {
+        "region": "unknown",
+        "topic": "general",
+        "document_type": "article",
+        "custom_fields": {}
+    }
+
+embedding_admission = AdmissionController(
+    "embedding",
+    max_in_flight=settings.admission_max_in_flight,
+    max_queued=settings.admission_queue_size,
+    retry_after_s=settings.admission_retry_after_s,
+)
+
+@contextmanager
+def admitted(priority: str) -> Iterator[None]:
+    """
+    Admit the block's embeddings at a priority; answers 503 with Retry-After when refused
+
+    A slot is only held while text is embedded (see app.core.admission),
+    not across the database and graph work around it.
+    """
+    try:
+        with admission_scope(embedding_admission, priority):
+            yield
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after_s)})
+
+async def ingest_item(item: Dict[str, Any]) -> None:
+    """
+    Ingestion worker step for one document: vector insert, graph node, duplicates
+
+    A retry after the insert succeeded only repeats the graph steps.
+    """
+    document: DocumentCreate = item["document"]
+    db, graph_db = item["context"]["db"], item["context"]["graph_db"]
+    if item["doc_id"] is None:
+        # Embedding waits behind interactive searches and writes instead of being refused
+        with admission_scope(embedding_admission, "ingest", bounded=False):
+            item["doc_id"] = await db.create_document(document.model_dump())
+    if not await graph_db.create_document_node(
+        document_id=item["doc_id"], title=document.title, metadata=graph_metadata(document)
+    ):
+        raise RuntimeError("Failed to create document node in graph database")
+    await record_duplicates(item["doc_id"], document.title, document.content, graph_db)
+
+ingestion_queue = IngestionQueue(
+    ingest_item,
+    concurrency=settings.ingest_concurrency,
+    max_queued=settings.ingest_queue_size,
+    max_attempts=settings.ingest_max_attempts,
+    retry_backoff_s=settings.ingest_retry_backoff_s,
+    history=settings.ingest_job_history,
+)
+
+def submit_ingestion(documents: List[DocumentCreate], db: DocumentStore, graph_db: GraphStore) -> JSONResponse:
+    """Queue documents for the ingestion workers and answer 202 with the job"""
+    try:
+        job = ingestion_queue.submit(documents, {"db": db, "graph_db": graph_db})
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return JSONResponse(
+        status_code=202,
+        content=IngestionJob(**job).model_dump(mode="json"),
+        headers={"Location": f"{router.prefix}/jobs/{job['id']}"},
+    )
+
+@router.post("/", response_model=DocumentResponse, responses={202: {"model": IngestionJob}})
 async def create_document(
     document: DocumentCreate,
-    db: DatabaseManager = Depends(get_db),
-    graph_db: GraphManager = Depends(get_graph_db)
+    async_mode: bool = Query(False, alias="async", description="Queue the document and answer 202 with a job"),
+    db: DocumentStore = Depends(get_db),
+    graph_db: GraphStore = Depends(get_graph_db)
 ):
     """Create a new document in both vector and graph databases"""
-    try:
-        # Print debugging information
-        print(f"Creating document: {document.model_dump()}")
-        print(f"Database connection: {db.db_uri}")
+    if async_mode:
+        return submit_ingestion([document], db, graph_db)
+    with admitted("write"):
+        try:
+            # Check if the store is connected
+            if not db.is_connected:
+                logger.warning("Document store not connected, attempting to reconnect")
+                await db.connect()
+                if not db.is_connected:
+                    logger.error("Document store still not connected after reconnect")
+                    raise ValueError("Database engine is not initialized")
         
-        # Check if engine is initialized
-        if db.engine is None:
-            print("ERROR: Engine is None, attempting to reconnect")
-            await db.connect()
-            if db.engine is None:
-                print("ERROR: Engine is still None after reconnect")
-                raise ValueError("Database engine is not initialized")
+            # Create document in vector database
+            doc_id = await db.create_document(document.model_dump())
         
-        # Create document in vector database
-        doc_id = await db.create_document(document.model_dump())
-        print(f"Document created with ID: {doc_id}")
+            # Retrieve the created document
+            created_doc = await db.get_document(doc_id)
+            log_event(logger, logging.DEBUG, "Retrieved created document", doc_id=doc_id, document=created_doc)
         
-        # Retrieve the created document
-        created_doc = await db.get_document(doc_id)
-        print(f"Retrieved document: {created_doc}")
+            if not created_doc:
+                raise HTTPException(status_code=500, detail="Failed to create document")
         
-        if not created_doc:
-            raise HTTPException(status_code=500, detail="Failed to create document")
+            # Create document node in graph database
+            graph_success = await graph_db.create_document_node(
+                document_id=doc_id,
+                title=document.title,
+                metadata=graph_metadata(document)
+            )
         
-        # Use the document's metadata directly if available
-        if hasattr(document, "metadata") and document.metadata:
-            # Convert Pydantic model to dict for Neo4j
-            metadata_dict = document.metadata.model_dump()
-        else:
-            # Create default metadata
-            metadata_dict = {
-                "region": "unknown",
-                "topic": "general",
-                "document_type": "article",
-                "custom_fields": {}
-            }
+            if not graph_success:
+                log_event(logger, logging.WARNING, "Failed to create document node in graph database", doc_id=doc_id)
         
-        # Create document node in graph database
-        graph_success = await graph_db.create_document_node(
-            document_id=doc_id,
-            title=document.title,
-            metadata=metadata_dict
-        )
+            # Link copies of the same text arriving from other sources
+            await record_duplicates(doc_id, created_doc["title"], created_doc["content"], graph_db)
         
-        if not graph_success:
-            print("WARNING: Failed to create document node in graph database")
-        
-        return DocumentResponse(
-            id=created_doc["id"],
-            title=created_doc["title"],
-            content=created_doc["content"],
-            tags=created_doc["tags"],
-            category=created_doc["category"],
-            created_at=datetime.fromisoformat(created_doc["created_at"]),
-            updated_at=datetime.fromisoformat(created_doc["updated_at"])
-        )
-    except Exception as e:
-        # Print detailed error information
-        import traceback
-        print(f"ERROR creating document: {str(e)}")
-        print(f"ERROR type: {type(e)}")
-        print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Error creating document: {str(e)}")
+            return to_document_response(created_doc)
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.exception("Error creating document")
+            raise HTTPException(status_code=500, detail=f"Error creating document: {str(e)}")
+
+@router.post("/bulk", status_code=202, response_model=IngestionJob)
+async def create_documents_bulk(
+    documents: List[DocumentCreate] = Body(..., min_length=1, max_length=1000),
+    db: DocumentStore = Depends(get_db),
+    graph_db: GraphStore = Depends(get_graph_db)
+):
+    """Queue several documents as one ingestion job; poll /documents/jobs/{job_id} for progress"""
+    return submit_ingestion(documents, db, graph_db)
 
 @router.get("/", response_model=List[DocumentResponse])
 async def list_documents(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     category: Optional[str] = Query(None),
-    db: DatabaseManager = Depends(get_db)
+    db: DocumentStore = Depends(get_db)
 ):
     """List documents with optional filtering"""
     try:
         documents = await db.list_documents(skip=skip, limit=limit, category=category)
-        return [
-            DocumentResponse(
-                id=doc["id"],
-                title=doc["title"],
-                content=doc["content"],
-                tags=doc["tags"],
-                category=doc["category"],
-                created_at=datetime.fromisoformat(doc["created_at"]),
-                updated_at=datetime.fromisoformat(doc["updated_at"])
-            )
-            for doc in documents
-        ]
+        return to_document_responses(documents)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing documents: {str(e)}")
 
@@ -158,30 +263,112 @@ async def search_documents(
     q: str = Query(..., description="Search query"),
     limit: int = Query(10, ge=1, le=100),
     category: Optional[str] = Query(None),
-    db: DatabaseManager = Depends(get_db)
+    db: DocumentStore = Depends(get_db)
 ):
     """Vector search documents"""
-    try:
-        documents = await db.search_documents(query=q, limit=limit, category=category)
-        return [
-            DocumentResponse(
-                id=doc["id"],
-                title=doc["title"],
-                content=doc["content"],
-                tags=doc["tags"],
-                category=doc["category"],
-                created_at=datetime.fromisoformat(doc["created_at"]),
-                updated_at=datetime.fromisoformat(doc["updated_at"])
+    with admitted("search"):
+        try:
+            documents = await db.search_documents(query=q, limit=limit, category=category)
+            return to_document_responses(documents)
+        except Overloaded:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
+
+@router.post("/search/batch", response_model=List[List[DocumentResponse]])
+async def search_documents_batch(
+    request: BatchSearchRequest,
+    db: DocumentStore = Depends(get_db)
+):
+    """Vector search several queries at once; results are returned in query order"""
+    with admitted("search"):
+        try:
+            results = await db.search_documents_batch(
+                [(query.q, query.limit, query.category) for query in request.queries]
+            )
+            return [to_document_responses(documents) for documents in results]
+        except Overloaded:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
+
+@router.get("/search/expanded", response_model=ExpandedSearchResponse)
+async def search_documents_expanded(
+    q: str = Query(..., description="Search query"),
+    limit: int = Query(10, ge=1, le=100),
+    category: Optional[str] = Query(None),
+    rel_types: Optional[List[str]] = Query(None, description="Relationship types to follow (repeat the parameter)"),
+    depth: int = Query(1, ge=1, le=3, description="Maximum hops from each hit"),
+    direction: str = Query("both", pattern="^(out|in|both)$"),
+    neighbours: int = Query(10, ge=1, le=50, description="Neighbours kept per hit"),
+    rescore: bool = Query(False, description="Weight neighbour scores by edge confidence"),
+    db: DocumentStore = Depends(get_db),
+    graph_db: GraphStore = Depends(get_graph_db)
+):
+    """Vector search plus the graph neighbourhoods of all hits, fetched in one graph query"""
+    with admitted("search"):
+        try:
+            hits = await db.search_by_vector(await db.embed(q), limit, category)
+            neighbourhoods = await graph_db.get_neighbourhoods(
+                [doc["id"] for doc in hits], rel_types, depth, direction, neighbours
             )
-            for doc in documents
-        ]
+            expanded = expand_search_results(hits, neighbourhoods, rescore)
+            for hit in expanded["hits"]:
+                hit["document"] = to_document_response(hit["document"])
+            return expanded
+        except Overloaded:
+            raise
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
+
+@router.get("/similar", response_model=Dict[str, List[DocumentResponse]])
+async def similar_documents_batch(
+    ids: List[str] = Query(..., description="Source document IDs (repeat the parameter)"),
+    limit: int = Query(10, ge=1, le=100),
+    category: Optional[str] = Query(None),
+    db: DocumentStore = Depends(get_db)
+):
+    """Documents similar to each of several stored documents, keyed by source ID"""
+    if len(ids) > 100:
+        raise HTTPException(status_code=400, detail="At most 100 ids per request")
+    try:
+        results = await db.similar_documents(ids, limit=limit, category=category)
+        return {doc_id: to_document_responses(documents) for doc_id, documents in results.items()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error finding similar documents: {str(e)}")
+
+@router.get("/changes", response_model=List[DocumentChange])
+async def list_changes(
+    since: datetime = Query(..., description="Only versions replaced at or after this time"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: DocumentStore = Depends(get_db)
+):
+    """Document versions replaced by updates since a time, newest first"""
+    store = versioned(db)
+    try:
+        return await store.changed_since(since, limit)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error listing changes: {str(e)}")
+
+@router.get("/jobs", response_model=List[IngestionJob])
+async def list_ingestion_jobs(limit: int = Query(100, ge=1, le=1000)):
+    """Recent ingestion jobs in this process, newest first"""
+    return ingestion_queue.list_jobs(limit)
+
+@router.get("/jobs/{job_id}", response_model=IngestionJob)
+async def get_ingestion_job(job_id: str):
+    """Status and progress of an ingestion job"""
+    job = ingestion_queue.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: str,
-    db: DatabaseManager = Depends(get_db)
+    db: DocumentStore = Depends(get_db)
 ):
     """Get document by ID"""
     try:
@@ -189,15 +376,7 @@ async def get_document(
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        return DocumentResponse(
-            id=doc["id"],
-            title=doc["title"],
-            content=doc["content"],
-            tags=doc["tags"],
-            category=doc["category"],
-            created_at=datetime.fromisoformat(doc["created_at"]),
-            updated_at=datetime.fromisoformat(doc["updated_at"])
-        )
+        return to_document_response(doc)
     except HTTPException:
         raise
     except Exception as e:
@@ -207,7 +386,8 @@ async def get_document(
 async def update_document(
     document_id: str,
     document: DocumentUpdate,
-    db: DatabaseManager = Depends(get_db)
+    db: DocumentStore = Depends(get_db),
+    graph_db: GraphStore = Depends(get_graph_db)
 ):
     """Update document"""
     try:
@@ -217,30 +397,31 @@ async def update_document(
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields to update")
         
-        success = await db.update_document(document_id, update_data)
+        # Only a title or content change embeds, and only the embedding takes a slot
+        with admitted("write"):
+            success = await db.update_document(document_id, update_data)
         if not success:
             raise HTTPException(status_code=404, detail="Document not found")
         
         updated_doc = await db.get_document(document_id)
-        return DocumentResponse(
-            id=updated_doc["id"],
-            title=updated_doc["title"],
-            content=updated_doc["content"],
-            tags=updated_doc["tags"],
-            category=updated_doc["category"],
-            created_at=datetime.fromisoformat(updated_doc["created_at"]),
-            updated_at=datetime.fromisoformat(updated_doc["updated_at"])
-        )
+        if updated_doc is None:
+            # Deleted by another request since the update
+            raise HTTPException(status_code=404, detail="Document not found")
+        if "title" in update_data or "content" in update_data:
+            await record_duplicates(document_id, updated_doc["title"], updated_doc["content"], graph_db)
+        return to_document_response(updated_doc)
     except HTTPException:
         raise
+    except ConcurrentUpdateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating document: {str(e)}")
 
 @router.delete("/{document_id}", response_model=Dict[str, bool])
 async def delete_document(
     document_id: str,
-    db: DatabaseManager = Depends(get_db),
-    graph_db: GraphManager = Depends(get_graph_db)
+    db: DocumentStore = Depends(get_db),
+    graph_db: GraphStore = Depends(get_graph_db)
 ):
     """Delete a document from both vector and graph databases"""
     try:
@@ -254,16 +435,18 @@ async def delete_document(
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete document from vector database")
         
-        # Delete from graph database (Neo4j will automatically remove relationships)
+        # Delete from graph database (the node's relationships are removed with it)
         # Note: This is a best-effort operation; we don't fail if graph deletion fails
         try:
-            # Use Cypher query to delete the node and all its relationships
-            await graph_db._execute_query(
-                "MATCH (d:Document {id: $id}) DETACH DELETE d",
-                {"id": document_id}
-            )
+            await graph_db.delete_document_node(document_id)
         except Exception as e:
-            print(f"WARNING: Error deleting document from graph database: {str(e)}")
+            logger.warning(f"Error deleting document from graph database: {str(e)}")
+        
+        if duplicate_detector is not None:
+            try:
+                await duplicate_detector.remove(document_id)
+            except Exception as e:
+                logger.warning(f"Error removing document signature: {str(e)}")
         
         return {"success": True}
     except HTTPException:
@@ -277,8 +460,8 @@ async def create_relationship(
     target_id: str = Query(..., description="Target document ID"),
     rel_type: str = Query(..., description="Relationship type (e.g., REFERENCES, AMENDS)"),
     confidence: float = Query(0.0, ge=0.0, le=1.0, description="Confidence score (0.0-1.0)"),
-    graph_db: GraphManager = Depends(get_graph_db),
-    db: DatabaseManager = Depends(get_db)
+    graph_db: GraphStore = Depends(get_graph_db),
+    db: DocumentStore = Depends(get_db)
 ):
     """Create a relationship between two documents"""
     try:
@@ -308,11 +491,84 @@ async def create_relationship(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating relationship: {str(e)}")
 
+@router.get("/{document_id}/similar", response_model=List[DocumentResponse])
+async def similar_documents(
+    document_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    category: Optional[str] = Query(None),
+    db: DocumentStore = Depends(get_db)
+):
+    """Documents most similar to a stored document, using its stored embedding"""
+    try:
+        results = await db.similar_documents([document_id], limit=limit, category=category)
+        if document_id not in results:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        return to_document_responses(results[document_id])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error finding similar documents: {str(e)}")
+
+@router.get("/{document_id}/versions", response_model=List[DocumentVersion])
+async def list_document_versions(
+    document_id: str,
+    db: DocumentStore = Depends(get_db)
+):
+    """Version history of a document, current version first"""
+    store = versioned(db)
+    try:
+        versions = await store.document_versions(document_id)
+        if versions is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        return versions
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing versions: {str(e)}")
+
+@router.get("/{document_id}/versions/{version}", response_model=DocumentVersionContent)
+async def get_document_version(
+    document_id: str,
+    version: int,
+    db: DocumentStore = Depends(get_db)
+):
+    """A document as it was at a version"""
+    store = versioned(db)
+    try:
+        doc = await store.get_document_version(document_id, version)
+        if doc is None:
+            raise HTTPException(status_code=404, detail="Document version not found")
+        return DocumentVersionContent(**to_document_response(doc).model_dump(), version=doc["version"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting version: {str(e)}")
+
+@router.get("/{document_id}/diff", response_model=DocumentDiff)
+async def diff_document_versions(
+    document_id: str,
+    from_version: Optional[int] = Query(None, ge=1, description="Older version (default: the one before to_version)"),
+    to_version: Optional[int] = Query(None, ge=1, description="Newer version (default: current)"),
+    db: DocumentStore = Depends(get_db)
+):
+    """Sentence-level diff between two versions of a document"""
+    store = versioned(db)
+    try:
+        diff = await store.diff_versions(document_id, from_version, to_version)
+        if diff is None:
+            raise HTTPException(status_code=404, detail="Document or version not found")
+        return diff
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error diffing versions: {str(e)}")
+
 @router.get("/{document_id}/related", response_model=List[Dict[str, Any]])
 async def get_related_documents(
     document_id: str,
     rel_type: Optional[str] = Query(None, description="Filter by relationship type"),
-    graph_db: GraphManager = Depends(get_graph_db)
+    graph_db: GraphStore = Depends(get_graph_db)
 ):
     """Get documents related to the specified document"""
     try:
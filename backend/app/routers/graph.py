@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Dict, Any, Optional
-from app.database.graph import GraphManager
+from app.database.base import GraphStore
 from app.models.graph import DocumentNode, RelationshipCreate
 from app.routers.document import get_graph_db
 
@@ -9,7 +9,7 @@ router = APIRouter(prefix="/graph", tags=["graph"])
 @router.post("/documents/", response_model=Dict[str, bool])
 async def create_document_node(
     document: DocumentNode,
-    graph_db: GraphManager = Depends(get_graph_db)
+    graph_db: GraphStore = Depends(get_graph_db)
 ):
     """Create a document node in the graph database"""
     try:
@@ -31,7 +31,7 @@ async def create_document_node(
 @router.post("/relationships/", response_model=Dict[str, bool])
 async def create_relationship(
     relationship: RelationshipCreate,
-    graph_db: GraphManager = Depends(get_graph_db)
+    graph_db: GraphStore = Depends(get_graph_db)
 ):
     """Create a relationship between two documents"""
     try:
@@ -54,7 +54,7 @@ async def create_relationship(
 @router.get("/documents/{document_id}", response_model=Dict[str, Any])
 async def get_document(
     document_id: str,
-    graph_db: GraphManager = Depends(get_graph_db)
+    graph_db: GraphStore = Depends(get_graph_db)
 ):
     """Get a document node from the graph database"""
     try:
@@ -73,7 +73,7 @@ async def get_document(
 async def get_related_documents(
     document_id: str,
     rel_type: Optional[str] = Query(None, description="Filter by relationship type"),
-    graph_db: GraphManager = Depends(get_graph_db)
+    graph_db: GraphStore = Depends(get_graph_db)
 ):
     """Get documents related to the specified document"""
     try:
@@ -93,7 +93,7 @@ async def search_documents(
     region: Optional[str] = Query(None, description="Filter by region"),
     topic: Optional[str] = Query(None, description="Filter by topic"),
     document_type: Optional[str] = Query(None, description="Filter by document type"),
-    graph_db: GraphManager = Depends(get_graph_db)
+    graph_db: GraphStore = Depends(get_graph_db)
 ):
     """Search for documents by metadata"""
     try:
@@ -0,0 +1,181 @@
+"""
+Component microbenchmarks that run offline
+
+Covers embedding (single vs batched), SQL building and row conversion,
+Cypher building and record mapping, and end-to-end route overhead through
+the ASGI app with in-memory fakes, plus the in-memory store search paths.
+"""
+import asyncio
+from typing import Any, Dict, List
+
+import httpx
+import numpy as np
+
+from app.database.graph import build_metadata_search_query, records_to_nodes
+from app.core.cache import GenerationalCache, MemoryCacheBackend
+from app.database.cached import CachedDocumentStore
+from app.database.coalescing import CoalescingDocumentStore
+from app.database.memory import InMemoryDocumentStore, InMemoryGraphStore
+from app.jobs.knn_graph import blocked_top_k, normalize_rows
+from app.database.vector import DatabaseManager, build_search_query, row_to_document
+from app.main import app
+from app.routers.document import get_db, get_graph_db, to_document_responses
+from benchmarks.fakes import (
+    FakeDatabaseManager,
+    FakeEmbeddingModel,
+    FakeGraphManager,
+    fake_records,
+    fake_rows,
+)
+from benchmarks.harness import abench, bench
+
+ROW_COUNTS = (10, 100, 1000)
+
+
+def embedding_benchmarks(quick: bool = False) -> List[Dict[str, Any]]:
+    """generate_embedding called per text vs generate_embeddings batched"""
+    manager = DatabaseManager()
+    manager.model = FakeEmbeddingModel()
+    texts = [f"Article {i} on high-risk AI systems and conformity assessment" for i in range(32)]
+    number = 5 if quick else 20
+    return [
+        bench("embedding.single_x32", lambda: [manager.generate_embedding(t) for t in texts],
+              number=number, params={"texts": len(texts)}),
+        bench("embedding.batched_x32", lambda: manager.generate_embeddings(texts),
+              number=number, params={"texts": len(texts)}),
+    ]
+
+
+def sql_benchmarks(quick: bool = False) -> List[Dict[str, Any]]:
+    """SQL building and row -> dict -> DocumentResponse conversion"""
+    vector = FakeEmbeddingModel().encode("ai act").tolist()
+    results = [bench("sql.build_search_query", lambda: build_search_query(vector, 10, "legal"),
+                     number=200 if quick else 1000)]
+    for count in ROW_COUNTS:
+        rows = fake_rows(count)
+        number = max(1, (200 if quick else 2000) // count)
+        results.append(bench("sql.row_to_document", lambda: [row_to_document(r) for r in rows],
+                             number=number, params={"rows": count}))
+        docs = [row_to_document(r) for r in rows]
+        results.append(bench("sql.to_document_responses", lambda: to_document_responses(docs),
+                             number=number, params={"rows": count}))
+    return results
+
+
+def cypher_benchmarks(quick: bool = False) -> List[Dict[str, Any]]:
+    """Cypher building and record mapping in GraphManager"""
+    filters = {"region": "EU", "topic": "AI", "document_type": "regulation"}
+    results = [bench("cypher.build_metadata_search_query", lambda: build_metadata_search_query(filters, 10),
+                     number=200 if quick else 2000)]
+    for count in ROW_COUNTS:
+        records = fake_records(count)
+        results.append(bench("cypher.records_to_nodes", lambda: records_to_nodes(records),
+                             number=max(1, (200 if quick else 2000) // count), params={"rows": count}))
+    return results
+
+
+async def _route_benchmarks(quick: bool) -> List[Dict[str, Any]]:
+    fake_db = FakeDatabaseManager()
+    app.dependency_overrides[get_db] = lambda: fake_db
+    app.dependency_overrides[get_graph_db] = lambda: FakeGraphManager()
+    number = 20 if quick else 200
+    body = {"title": "AI Act", "content": "Article 1. " * 200, "tags": ["AI"], "category": "legal"}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            created = (await client.post("/documents/", json=body)).json()
+            for _ in range(99):
+                await client.post("/documents/", json=body)
+            return [
+                await abench("route.health_ping", lambda: client.get("/health/ping"), number=number),
+                await abench("route.create_document", lambda: client.post("/documents/", json=body), number=number),
+                await abench("route.get_document", lambda: client.get(f"/documents/{created['id']}"), number=number),
+                await abench("route.search_documents", lambda: client.get("/documents/search?q=ai&limit=10"),
+                             number=number, params={"limit": 10}),
+                await abench("route.list_documents", lambda: client.get("/documents/?limit=100"),
+                             number=number, params={"limit": 100}),
+            ]
+    finally:
+        app.dependency_overrides.clear()
+
+
+def route_benchmarks(quick: bool = False) -> List[Dict[str, Any]]:
+    """End-to-end request overhead through middleware, validation and serialization"""
+    return asyncio.run(_route_benchmarks(quick))
+
+
+def _memory_store(count: int) -> InMemoryDocumentStore:
+    """In-memory store preloaded with count documents across four categories"""
+    store = InMemoryDocumentStore()
+    store.model = FakeEmbeddingModel()
+    vectors = np.random.default_rng(7).standard_normal((count, store.dimensions)).astype(np.float32)
+    for i, (row, vector) in enumerate(zip(fake_rows(count, content_length=100), vectors)):
+        row = dict(row, category=("legal", "policy", "technical", "general")[i % 4],
+                   created_at=row["created_at"].isoformat(), updated_at=row["updated_at"].isoformat())
+        store.add(row, vector)
+    return store
+
+
+async def _memory_benchmarks(quick: bool) -> List[Dict[str, Any]]:
+    results = []
+    query_vector = FakeEmbeddingModel().encode("high-risk ai systems").tolist()
+    for count in (1000, 10000) if quick else (1000, 10000, 100000):
+        store = _memory_store(count)
+        number = 20 if quick else 200
+        results.append(await abench("memory.search_by_vector",
+                                    lambda: store.search_by_vector(query_vector, 10),
+                                    number=number, params={"rows": count}))
+        results.append(await abench("memory.search_by_vector_category",
+                                    lambda: store.search_by_vector(query_vector, 10, "legal"),
+                                    number=number, params={"rows": count}))
+        cached = CachedDocumentStore(store, GenerationalCache("bench", MemoryCacheBackend(), ttl_s=60))
+        results.append(await abench("memory.search_by_vector_cache_hit",
+                                    lambda: cached.search_by_vector(query_vector, 10),
+                                    number=number, params={"rows": count}))
+
+    # A burst of identical searches, e.g. a trending regulation
+    store = _memory_store(10000)
+    coalescing = CoalescingDocumentStore(store)
+    for name, target in (("memory.search_burst_x32", store), ("memory.search_burst_x32_coalesced", coalescing)):
+        results.append(await abench(
+            name, lambda target=target: asyncio.gather(*(target.search_documents("ai act") for _ in range(32))),
+            number=5 if quick else 20, params={"rows": 10000},
+        ))
+
+    # kNN graph job kernel: every document's top-10 over the whole corpus
+    count = 5000 if quick else 20000
+    corpus = normalize_rows(np.random.default_rng(7).standard_normal((count, 384)).astype(np.float32))
+    for block_size in (256, 1024):
+        results.append(bench("memory.knn_blocked_top_k",
+                             lambda block_size=block_size: blocked_top_k(corpus, corpus, 10, block_size,
+                                                                         self_rows=np.arange(count)),
+                             number=1, repeat=3, params={"rows": count, "block_size": block_size}))
+
+    graph = InMemoryGraphStore()
+    for i in range(1000):
+        await graph.create_document_node(str(i), f"Regulation {i}", {"region": "EU"})
+    for i in range(1000):
+        for j in range(1, 11):
+            await graph.create_relationship(str(i), str((i + j) % 1000), "REFERENCES", 0.5)
+    results.append(await abench("memory.get_related_documents",
+                                lambda: graph.get_related_documents("1"),
+                                number=200 if quick else 2000, params={"degree": 10}))
+    hits = [str(i) for i in range(0, 1000, 100)]
+    results.append(await abench("memory.get_neighbourhoods",
+                                lambda: graph.get_neighbourhoods(hits, ["REFERENCES"], depth=2, direction="out"),
+                                number=5 if quick else 20, params={"hits": len(hits), "depth": 2}))
+    return results
+
+
+def memory_benchmarks(quick: bool = False) -> List[Dict[str, Any]]:
+    """Brute-force search and adjacency lookups in the in-memory stores"""
+    return asyncio.run(_memory_benchmarks(quick))
+
+
+SUITES = {
+    "embedding": embedding_benchmarks,
+    "sql": sql_benchmarks,
+    "cypher": cypher_benchmarks,
+    "routes": route_benchmarks,
+    "memory": memory_benchmarks,
+}
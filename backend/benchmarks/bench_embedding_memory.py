@@ -0,0 +1,128 @@
+"""
+Worker memory with the in-process model versus the embedding sidecar
+
+Starts --workers worker processes the way uvicorn would, once per mode:
+
+- in-process: each worker loads its own SentenceTransformer
+- sidecar: one app.core.embedding_service process holds the model and the
+  workers set EMBEDDING_SOCKET
+
+Each worker imports the document store, reports its resident set size
+(VmRSS), embeds a text through DocumentStore.embed (which loads the model
+or connects to the sidecar) and reports its RSS again. The totals include
+the sidecar. Needs sentence-transformers and Linux (/proc).
+
+From backend/:
+    python -m benchmarks.bench_embedding_memory --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from app.database.base import EMBEDDING_MODEL
+
+
+def rss_mb(pid: str = "self") -> float:
+    """Resident set size of a process in MB"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return 0.0
+
+
+async def _worker() -> Dict[str, float]:
+    from app.database.memory import InMemoryDocumentStore
+
+    store = InMemoryDocumentStore()
+    before = rss_mb()
+    await store.embed("Transparency obligations for general-purpose AI models")
+    return {"before_mb": before, "after_mb": rss_mb()}
+
+
+def run_workers(count: int, env: Dict[str, str]) -> List[Dict[str, float]]:
+    """Start the workers at once, as uvicorn --workers does, and collect their reports"""
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.bench_embedding_memory", "--worker"],
+                         env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(count)
+    ]
+    return [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in processes]
+
+
+def summarize(workers: List[Dict[str, float]], sidecar_mb: float = 0.0) -> Dict[str, Any]:
+    return {
+        "workers": workers,
+        "worker_before_mb": round(sum(w["before_mb"] for w in workers) / len(workers), 1),
+        "worker_after_mb": round(sum(w["after_mb"] for w in workers) / len(workers), 1),
+        "sidecar_mb": sidecar_mb,
+        "total_mb": round(sum(w["after_mb"] for w in workers) + sidecar_mb, 1),
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    env = dict(os.environ, EMBEDDING_SOCKET="")
+    report: Dict[str, Any] = {"model": args.model, "worker_count": args.workers}
+    report["in_process"] = summarize(run_workers(args.workers, env))
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "embeddings.sock")
+    sidecar = subprocess.Popen([sys.executable, "-m", "app.core.embedding_service",
+                                "--socket", socket_path, "--model", args.model])
+    try:
+        deadline = time.monotonic() + args.startup_timeout
+        while not os.path.exists(socket_path):
+            if time.monotonic() > deadline or sidecar.poll() is not None:
+                raise RuntimeError("Embedding sidecar did not start")
+            time.sleep(0.2)
+        workers = run_workers(args.workers, dict(env, EMBEDDING_SOCKET=socket_path))
+        report["sidecar"] = summarize(workers, rss_mb(str(sidecar.pid)))
+    finally:
+        sidecar.terminate()
+        sidecar.wait(10)
+
+    in_process, shared = report["in_process"], report["sidecar"]
+    report["saved_per_worker_mb"] = round(in_process["worker_after_mb"] - shared["worker_after_mb"], 1)
+    report["saved_total_mb"] = round(in_process["total_mb"] - shared["total_mb"], 1)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['worker_count']} workers, model {report['model']}\n")
+    print(f"{'mode':12s} {'worker before':>14s} {'worker after':>13s} {'sidecar':>9s} {'total':>9s}")
+    for mode in ("in_process", "sidecar"):
+        entry = report[mode]
+        print(f"{mode:12s} {entry['worker_before_mb']:11.1f} MB {entry['worker_after_mb']:10.1f} MB "
+              f"{entry['sidecar_mb']:6.1f} MB {entry['total_mb']:6.1f} MB")
+    print(f"\nSaved {report['saved_per_worker_mb']} MB per worker, {report['saved_total_mb']} MB in total")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--startup-timeout", type=float, default=120.0,
+                        help="Seconds the sidecar has to load the model")
+    parser.add_argument("--output", default="benchmarks/results/embedding-memory-latest.json")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(asyncio.run(_worker())))
+        return 0
+    report = run(args)
+    print_report(report)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
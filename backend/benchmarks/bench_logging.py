@@ -0,0 +1,61 @@
+"""
+Measure the cost of application logging on the request path
+
+Usage (from backend/):
+    python -m benchmarks.bench_logging
+"""
+import contextlib
+import io
+import logging
+import os
+import time
+
+from app.core import logging as app_logging
+from app.core.logging import get_logger, log_event
+
+ITERATIONS = 20000
+DOCUMENT = {"title": "AI Act", "content": "Article 1. " * 2000, "tags": ["AI", "EU"]}
+
+
+def _per_call_us(fn, iterations: int = ITERATIONS) -> float:
+    """Return the average cost of fn() in microseconds"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    # Send listener output to /dev/null so the terminal is not the bottleneck
+    devnull = open(os.devnull, "w")
+    app_logging._listener.handlers[0].setStream(devnull)
+    logger = get_logger("benchmarks.logging")
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["print full document (old behaviour)"] = _per_call_us(
+            lambda: print(f"Document data: {DOCUMENT}"), 2000
+        )
+    results["log_event below level (DEBUG gated)"] = _per_call_us(
+        lambda: log_event(logger, logging.DEBUG, "Creating document", doc_data=DOCUMENT)
+    )
+    results["log_event enqueued (INFO)"] = _per_call_us(
+        lambda: log_event(logger, logging.INFO, "Document added", doc_id="123")
+    )
+
+    original_rates = app_logging.sampler.rates
+    app_logging.sampler.rates = [("/documents/search", 0.1)]
+    token = app_logging.current_route.set("/documents/search")
+    results["log_event sampled at 10%"] = _per_call_us(
+        lambda: log_event(logger, logging.INFO, "Search", q="ai act")
+    )
+    app_logging.current_route.reset(token)
+    app_logging.sampler.rates = original_rates
+
+    app_logging.stop_logging()
+    for name, value in results.items():
+        print(f"{name:45s} {value:10.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measure metrics overhead and check it against a per-request budget
+
+Usage (from backend/):
+    python -m benchmarks.bench_metrics
+
+Exits non-zero if any measurement exceeds its budget.
+"""
+import asyncio
+import sys
+import time
+
+from app.core.metrics import Histogram, MetricsMiddleware, registry
+
+ITERATIONS = 50000
+
+# Budgets in microseconds per call
+BUDGETS_US = {
+    "histogram.observe": 2.0,
+    "histogram.time() block": 4.0,
+    "MetricsMiddleware per request": 25.0,
+    "registry.render()": 5000.0,
+}
+
+
+def _per_call_us(fn, iterations: int = ITERATIONS) -> float:
+    """Return the average cost of fn() in microseconds"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def _timed_block(histogram: Histogram) -> None:
+    with histogram.time(query="get_document"):
+        pass
+
+
+async def _middleware_overhead_us(iterations: int = ITERATIONS) -> float:
+    """Compare an ASGI app with and without MetricsMiddleware"""
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    async def run(target) -> float:
+        scope = {"type": "http", "method": "GET", "path": "/documents/search"}
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await target(scope, None, send)
+        return (time.perf_counter() - start) / iterations * 1e6
+
+    return await run(MetricsMiddleware(app)) - await run(app)
+
+
+def main() -> int:
+    histogram = Histogram("bench_seconds", "benchmark", ("query",))
+    results = {
+        "histogram.observe": _per_call_us(lambda: histogram.observe(0.003, query="get_document")),
+        "histogram.time() block": _per_call_us(lambda: _timed_block(histogram)),
+        "MetricsMiddleware per request": asyncio.run(_middleware_overhead_us()),
+        "registry.render()": _per_call_us(registry.render, 1000),
+    }
+
+    failed = False
+    for name, value in results.items():
+        budget = BUDGETS_US[name]
+        status = "ok" if value <= budget else "OVER BUDGET"
+        failed = failed or value > budget
+        print(f"{name:32s} {value:10.2f} us  (budget {budget:.1f} us) {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Synthetic legislation corpus for load testing
+
+Documents get log-normally distributed lengths (most are a few pages, a
+few are very long), regions and topics drawn with skewed weights, and a
+citation graph built by preferential attachment: newer documents cite
+older ones, favouring documents that are already widely cited.
+
+Usage (from backend/):
+    python -m benchmarks.corpus --documents 1000 --output corpus.jsonl
+"""
+import argparse
+import json
+import math
+import random
+from typing import Any, Dict, Iterator, List, Tuple
+
+REGIONS = [("EU", 30), ("US", 25), ("UK", 10), ("China", 10), ("Canada", 6), ("Japan", 5),
+           ("Singapore", 4), ("Brazil", 4), ("India", 3), ("Australia", 3)]
+TOPICS = [("AI Safety", 20), ("Data Protection", 18), ("Transparency", 12), ("Biometrics", 8),
+          ("Liability", 8), ("Copyright", 7), ("Employment", 7), ("Healthcare AI", 6),
+          ("Autonomous Vehicles", 5), ("Public Sector AI", 5), ("Competition", 4)]
+DOCUMENT_TYPES = [("regulation", 35), ("law", 25), ("guideline", 20), ("policy", 12), ("article", 8)]
+CATEGORIES = ["legal", "policy", "guidance", "general"]
+RELATIONSHIP_TYPES = [("REFERENCES", 60), ("AMENDS", 15), ("IMPLEMENTS", 15), ("SUPERSEDES", 10)]
+
+PHRASES = [
+    "high-risk AI systems", "conformity assessment", "the provider shall", "fundamental rights",
+    "market surveillance authority", "transparency obligations", "human oversight",
+    "personal data", "data subject", "automated decision-making", "risk management system",
+    "technical documentation", "post-market monitoring", "notified body", "general-purpose AI model",
+    "serious incident", "competent authority", "administrative fines", "codes of practice",
+    "regulatory sandbox", "biometric identification", "training data", "accuracy and robustness",
+]
+
+# Log-normal content length in words: median ~1,800 words, long tail to ~100k
+LENGTH_MU = math.log(1800)
+LENGTH_SIGMA = 1.0
+MAX_WORDS = 100_000
+
+
+def _weighted(rng: random.Random, choices: List[Tuple[str, int]]) -> str:
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _content(rng: random.Random, words: int) -> str:
+    """Generate article-structured legal text of roughly the given length"""
+    parts = []
+    count = 0
+    article = 1
+    while count < words:
+        sentence = " ".join(rng.choice(PHRASES) for _ in range(rng.randint(3, 7)))
+        if count == 0 or rng.random() < 0.05:
+            parts.append(f"\n\nArticle {article}.")
+            article += 1
+        parts.append(sentence.capitalize() + ".")
+        count += len(sentence.split())
+    return " ".join(parts).strip()
+
+
+def generate_documents(count: int, seed: int = 7) -> Iterator[Dict[str, Any]]:
+    """
+    Generate synthetic documents
+
+    Args:
+        count: Number of documents
+        seed: Random seed (same seed, same corpus)
+
+    Yields:
+        Request bodies for POST /documents/, with a "ref" index for citations
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        region = _weighted(rng, REGIONS)
+        topic = _weighted(rng, TOPICS)
+        document_type = _weighted(rng, DOCUMENT_TYPES)
+        words = min(int(rng.lognormvariate(LENGTH_MU, LENGTH_SIGMA)), MAX_WORDS)
+        yield {
+            "ref": i,
+            "title": f"{region} {topic} {document_type.title()} {2015 + i % 10}/{i}",
+            "content": _content(rng, max(words, 50)),
+            "tags": [topic, region],
+            "category": rng.choice(CATEGORIES),
+            "metadata": {"region": region, "topic": topic, "document_type": document_type},
+        }
+
+
+def generate_citations(count: int, mean_citations: float = 3.0, seed: int = 7) -> List[Dict[str, Any]]:
+    """
+    Build a preferential-attachment citation graph over document indexes
+
+    Args:
+        count: Number of documents
+        mean_citations: Average outgoing citations per document
+        seed: Random seed
+
+    Returns:
+        Edges as {"source": i, "target": j, "rel_type": ..., "confidence": ...}
+    """
+    rng = random.Random(seed + 1)
+    edges = []
+    # Each document appears once plus once per citation received
+    attachment_pool: List[int] = []
+    for source in range(count):
+        if attachment_pool:
+            cited = set()
+            for _ in range(min(len(attachment_pool), int(rng.expovariate(1 / mean_citations)))):
+                target = rng.choice(attachment_pool)
+                if target != source and target not in cited:
+                    cited.add(target)
+                    edges.append({
+                        "source": source,
+                        "target": target,
+                        "rel_type": _weighted(rng, RELATIONSHIP_TYPES),
+                        "confidence": round(rng.uniform(0.5, 1.0), 2),
+                    })
+            attachment_pool.extend(cited)
+        attachment_pool.append(source)
+    return edges
+
+
+def search_queries(count: int, seed: int = 11) -> List[str]:
+    """Search phrases with a skewed popularity, like real traffic"""
+    rng = random.Random(seed)
+    topics = [topic for topic, _ in TOPICS]
+    return [
+        f"{rng.choice(topics)} {rng.choice(PHRASES)}" if rng.random() < 0.5 else rng.choice(PHRASES[:5])
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic legislation corpus")
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="corpus.jsonl")
+    args = parser.parse_args()
+
+    with open(args.output, "w") as f:
+        for doc in generate_documents(args.documents, args.seed):
+            f.write(json.dumps(doc) + "\n")
+    with open(args.output.replace(".jsonl", "") + ".citations.json", "w") as f:
+        json.dump(generate_citations(args.documents, seed=args.seed), f)
+    print(f"Wrote {args.documents} documents to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
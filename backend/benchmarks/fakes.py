@@ -0,0 +1,117 @@
+"""
+In-process fakes used to benchmark without a model or database
+"""
+import hashlib
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+DIMENSIONS = 384
+
+
+class FakeEmbeddingModel:
+    """
+    Deterministic stand-in for SentenceTransformer.encode
+
+    Each call pays a fixed cost (a dense layer over the batch) plus a
+    per-text cost proportional to its length, which mirrors why batching
+    helps with the real model while staying fast and offline.
+    """
+
+    def __init__(self, dimensions: int = DIMENSIONS):
+        rng = np.random.default_rng(42)
+        self.dimensions = dimensions
+        self.projection = rng.standard_normal((256, dimensions)).astype(np.float32)
+
+    def _features(self, text: str) -> np.ndarray:
+        features = np.zeros(256, dtype=np.float32)
+        for token in text.lower().split()[:256]:
+            features[hashlib.md5(token.encode()).digest()[0]] += 1.0
+        return features
+
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        single = isinstance(texts, str)
+        batch = np.stack([self._features(t) for t in ([texts] if single else texts)])
+        vectors = np.tanh(batch @ self.projection)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9
+        return vectors[0] if single else vectors
+
+
+def fake_rows(count: int, content_length: int = 2000) -> List[Dict[str, Any]]:
+    """Rows shaped like the documents SELECT result"""
+    now = datetime(2024, 1, 1)
+    return [
+        {
+            "id": str(uuid.UUID(int=i)),
+            "title": f"Regulation {i}",
+            "content": "x" * content_length,
+            "tags": '["AI", "regulation"]',
+            "category": "legal",
+            "created_at": now + timedelta(minutes=i),
+            "updated_at": now + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def fake_records(count: int) -> List[Dict[str, Any]]:
+    """Records shaped like the Neo4j metadata search result"""
+    return [
+        {"d": {"id": str(i), "title": f"Regulation {i}", "region": "EU", "topic": "AI"}}
+        for i in range(count)
+    ]
+
+
+class FakeDatabaseManager:
+    """Dict-backed stand-in for DatabaseManager used by route benchmarks"""
+
+    def __init__(self):
+        self.engine = object()
+        self.session_factory = object()
+        self.db_uri = "fake://"
+        self.documents: Dict[str, Dict[str, Any]] = {}
+
+    async def connect(self) -> bool:
+        return True
+
+    async def create_document(self, doc_data: Dict[str, Any]) -> str:
+        doc_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        self.documents[doc_id] = {
+            "id": doc_id,
+            "title": doc_data["title"],
+            "content": doc_data["content"],
+            "tags": doc_data.get("tags", []),
+            "category": doc_data.get("category", "general"),
+            "created_at": now,
+            "updated_at": now,
+        }
+        return doc_id
+
+    async def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self.documents.get(doc_id)
+
+    async def list_documents(self, skip: int = 0, limit: int = 100, category: Optional[str] = None):
+        docs = [d for d in self.documents.values() if not category or d["category"] == category]
+        return docs[skip:skip + limit]
+
+    async def search_documents(self, query: str, limit: int = 10, category: Optional[str] = None):
+        return await self.list_documents(0, limit, category)
+
+
+class FakeGraphManager:
+    """Stand-in for GraphManager used by route benchmarks"""
+
+    driver = object()
+
+    async def create_document_node(self, document_id: str, title: str, metadata=None) -> bool:
+        return True
+
+    async def create_relationship(self, source_id: str, target_id: str, rel_type: str,
+                                  confidence: float = 0.0, metadata=None) -> bool:
+        return True
+
+    async def get_related_documents(self, document_id: str, rel_type: Optional[str] = None):
+        return []
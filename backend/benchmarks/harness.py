@@ -0,0 +1,125 @@
+"""
+Timing, result storage and regression comparison for benchmarks
+"""
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+def _stats(name: str, samples: List[float], number: int, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summarize per-call timings (microseconds) of one benchmark"""
+    per_call = sorted(sample / number * 1e6 for sample in samples)
+    return {
+        "name": name,
+        "params": params or {},
+        "number": number,
+        "repeat": len(samples),
+        "min_us": round(per_call[0], 3),
+        "median_us": round(statistics.median(per_call), 3),
+        "mean_us": round(statistics.fmean(per_call), 3),
+        "max_us": round(per_call[-1], 3),
+    }
+
+
+def bench(
+    name: str, fn: Callable[[], Any], number: int = 100, repeat: int = 5,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Time a synchronous callable
+
+    Args:
+        name: Benchmark name
+        fn: Callable to time
+        number: Calls per sample
+        repeat: Number of samples
+        params: Parameters recorded with the result (e.g. row count)
+
+    Returns:
+        Result dict with per-call min/median/mean/max in microseconds
+    """
+    fn()  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append(time.perf_counter() - start)
+    return _stats(name, samples, number, params)
+
+
+async def abench(
+    name: str, fn: Callable[[], Awaitable[Any]], number: int = 100, repeat: int = 5,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Time an async callable (see bench)"""
+    await fn()  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        samples.append(time.perf_counter() - start)
+    return _stats(name, samples, number, params)
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    """Stable identifier of a benchmark result, including its parameters"""
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]" if params else result["name"]
+
+
+def save_results(results: List[Dict[str, Any]], path: str) -> None:
+    """Write results with environment metadata to a JSON file"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    """Read results written by save_results"""
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(
+    current: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float = 0.2
+) -> List[Dict[str, Any]]:
+    """
+    Compare median timings against a baseline
+
+    Args:
+        current: Results of this run
+        baseline: Results of the baseline run
+        threshold: Relative slowdown treated as a regression (0.2 = 20%)
+
+    Returns:
+        One row per benchmark present in both runs, with the ratio and a
+        regression flag
+    """
+    baseline_by_key = {result_key(r): r for r in baseline}
+    rows = []
+    for result in current:
+        key = result_key(result)
+        before = baseline_by_key.get(key)
+        if before is None or before["median_us"] <= 0:
+            continue
+        ratio = result["median_us"] / before["median_us"]
+        rows.append({
+            "benchmark": key,
+            "baseline_us": before["median_us"],
+            "current_us": result["median_us"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
@@ -0,0 +1,290 @@
+"""
+Open-loop load generator for the running API
+
+Seeds the API with a synthetic legislation corpus (documents plus a
+citation graph), then issues a configurable mix of create/search/list/
+get/related requests at a target rate with Poisson arrivals. Reports
+throughput, p50/p95/p99 latency and error rate per endpoint, saves the
+results as JSON and can diff them against a stored baseline.
+
+Start the stack first (docker-compose up -d), then from backend/:
+    python -m benchmarks.loadgen --base-url http://localhost:8000 \\
+        --documents 500 --rate 50 --duration 60 \\
+        --mix create=1,search=6,list=2,get=3,related=2 \\
+        --output benchmarks/results/load-baseline.json
+
+    python -m benchmarks.loadgen ... --skip-seed --baseline benchmarks/results/load-baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.corpus import generate_citations, generate_documents, search_queries
+
+DEFAULT_MIX = "create=1,search=6,list=2,get=3,related=2"
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse "create=1,search=6" into operation weights"""
+    mix = {}
+    for item in value.split(","):
+        name, weight = item.split("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"Unknown operations in mix: {sorted(unknown)}")
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoadState:
+    """Document ids (oldest first, created ones appended) and sample data shared by the operations"""
+
+    def __init__(self, doc_ids: List[str], corpus: List[Dict[str, Any]], queries: List[str]):
+        self.doc_ids = doc_ids
+        self.corpus = corpus
+        self.queries = queries
+        self.rng = random.Random(3)
+
+    def random_id(self) -> str:
+        # Skew towards recent documents, like real browsing (doc_ids is oldest first)
+        if self.rng.random() < 0.5:
+            return self.doc_ids[-1 - min(len(self.doc_ids) - 1, int(self.rng.expovariate(1 / 50)))]
+        return self.rng.choice(self.doc_ids)
+
+
+async def op_create(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    body = dict(state.rng.choice(state.corpus))
+    body.pop("ref", None)
+    response = await client.post("/documents/", json=body)
+    if response.status_code == 200:
+        state.doc_ids.append(response.json()["id"])
+    return response
+
+
+async def op_search(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get("/documents/search", params={"q": state.rng.choice(state.queries), "limit": 10})
+
+
+async def op_list(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get("/documents/", params={"skip": state.rng.randint(0, 100), "limit": 20})
+
+
+async def op_get(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get(f"/documents/{state.random_id()}")
+
+
+async def op_related(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get(f"/documents/{state.random_id()}/related")
+
+
+OPERATIONS = {
+    "create": op_create,
+    "search": op_search,
+    "list": op_list,
+    "get": op_get,
+    "related": op_related,
+}
+
+
+async def seed(client: httpx.AsyncClient, count: int, concurrency: int) -> LoadState:
+    """Ingest the synthetic corpus and its citation graph"""
+    corpus = list(generate_documents(count))
+    ids: Dict[int, str] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(doc: Dict[str, Any]) -> None:
+        async with semaphore:
+            body = {k: v for k, v in doc.items() if k != "ref"}
+            response = await client.post("/documents/", json=body)
+            if response.status_code == 200:
+                ids[doc["ref"]] = response.json()["id"]
+
+    async def relate(edge: Dict[str, Any]) -> None:
+        if edge["source"] in ids and edge["target"] in ids:
+            async with semaphore:
+                await client.post("/documents/relationships/", params={
+                    "source_id": ids[edge["source"]],
+                    "target_id": ids[edge["target"]],
+                    "rel_type": edge["rel_type"],
+                    "confidence": edge["confidence"],
+                })
+
+    start = time.perf_counter()
+    await asyncio.gather(*(create(doc) for doc in corpus))
+    await asyncio.gather(*(relate(edge) for edge in generate_citations(count)))
+    print(f"Seeded {len(ids)}/{count} documents in {time.perf_counter() - start:.1f}s")
+    return LoadState([ids[i] for i in sorted(ids)], corpus, search_queries(500))
+
+
+async def existing_state(client: httpx.AsyncClient, count: int) -> LoadState:
+    """Reuse documents already in the API instead of seeding"""
+    response = await client.get("/documents/", params={"limit": 1000})
+    # The API lists newest first; LoadState keeps ids oldest first
+    doc_ids = [doc["id"] for doc in reversed(response.json())]
+    return LoadState(doc_ids, list(generate_documents(min(count, 200))), search_queries(500))
+
+
+async def run_load(
+    client: httpx.AsyncClient, state: LoadState, mix: Dict[str, float],
+    rate: float, duration: float, max_in_flight: int,
+) -> Dict[str, Any]:
+    """
+    Issue requests with Poisson arrivals at the target rate
+
+    Open loop: arrivals do not wait for earlier responses, so a slow server
+    builds up in-flight requests instead of silently lowering the rate.
+    Arrivals beyond max_in_flight are counted as dropped.
+    """
+    names, weights = zip(*mix.items())
+    rng = random.Random(5)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    dropped = 0
+    in_flight = set()
+
+    async def issue(name: str) -> None:
+        start = time.perf_counter()
+        try:
+            response = await OPERATIONS[name](client, state)
+            failed = response.status_code >= 500 or (response.status_code >= 400 and name != "get")
+        except httpx.HTTPError:
+            failed = True
+        latencies[name].append((time.perf_counter() - start) * 1000)
+        if failed:
+            errors[name] += 1
+
+    start = time.perf_counter()
+    next_arrival = start
+    while next_arrival - start < duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            dropped += 1
+        else:
+            task = asyncio.create_task(issue(rng.choices(names, weights=weights)[0]))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_arrival += rng.expovariate(rate)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    elapsed = time.perf_counter() - start
+
+    return summarize(latencies, errors, dropped, elapsed, rate)
+
+
+def summarize(
+    latencies: Dict[str, List[float]], errors: Dict[str, int], dropped: int, elapsed: float, rate: float
+) -> Dict[str, Any]:
+    """Aggregate raw latencies into per-endpoint statistics"""
+    endpoints = {}
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        endpoints[name] = {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 0.50), 2),
+            "p95_ms": round(percentile(values, 0.95), 2),
+            "p99_ms": round(percentile(values, 0.99), 2),
+            "error_rate": round(errors[name] / len(values), 4),
+        }
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "created_at": datetime.now().isoformat(),
+        "target_rate_rps": rate,
+        "elapsed_s": round(elapsed, 2),
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "dropped": dropped,
+        "endpoints": endpoints,
+    }
+
+
+def diff(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Human-readable per-endpoint comparison with a baseline run"""
+    lines = []
+    for name, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        lines.append(
+            f"{name:8s} p50 {before['p50_ms']:8.1f} -> {now['p50_ms']:8.1f} ms   "
+            f"p95 {before['p95_ms']:8.1f} -> {now['p95_ms']:8.1f} ms   "
+            f"p99 {before['p99_ms']:8.1f} -> {now['p99_ms']:8.1f} ms   "
+            f"errors {before['error_rate']:.2%} -> {now['error_rate']:.2%}"
+        )
+    return lines
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    print(f"\n{results['total_requests']} requests in {results['elapsed_s']}s "
+          f"({results['throughput_rps']} req/s, target {results['target_rate_rps']}), dropped {results['dropped']}")
+    print(f"{'endpoint':8s} {'count':>7s} {'rps':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'errors':>8s}")
+    for name, stats in results["endpoints"].items():
+        print(f"{name:8s} {stats['requests']:7d} {stats['throughput_rps']:8.2f} {stats['p50_ms']:9.1f} "
+              f"{stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f} {stats['error_rate']:8.2%}")
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.skip_seed:
+            state = await existing_state(client, args.documents)
+        else:
+            state = await seed(client, args.documents, args.seed_concurrency)
+        if not state.doc_ids:
+            print("No documents available; is the API running and seeded?")
+            return 1
+        results = await run_load(client, state, mix, args.rate, args.duration, args.max_in_flight)
+
+    results["mix"] = mix
+    print_report(results)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.baseline}:")
+        print("\n".join(diff(results, baseline)))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--documents", type=int, default=500, help="Corpus size to seed")
+    parser.add_argument("--skip-seed", action="store_true", help="Use documents already in the API")
+    parser.add_argument("--seed-concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Operation weights")
+    parser.add_argument("--max-in-flight", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", default="benchmarks/results/load-latest.json")
+    parser.add_argument("--baseline", help="Previous results JSON to diff against")
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Run the offline benchmark suite and compare against a baseline
+
+Usage (from backend/):
+    python -m benchmarks.run                                  # all suites
+    python -m benchmarks.run --suite sql --suite routes       # selected suites
+    python -m benchmarks.run --output benchmarks/results/baseline.json
+    python -m benchmarks.run --compare benchmarks/results/baseline.json
+
+Exits non-zero when --compare finds a regression above --threshold.
+"""
+import argparse
+import sys
+
+from benchmarks.bench_components import SUITES
+from benchmarks.harness import compare, load_results, result_key, save_results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES), help="Suite to run (repeatable)")
+    parser.add_argument("--output", default="benchmarks/results/latest.json", help="Where to write JSON results")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown counted as a regression")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations, for smoke runs")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.suite or sorted(SUITES):
+        results.extend(SUITES[name](quick=args.quick))
+
+    for result in results:
+        print(f"{result_key(result):55s} median {result['median_us']:12.2f} us")
+    save_results(results, args.output)
+    print(f"\nResults written to {args.output}")
+
+    if not args.compare:
+        return 0
+    rows = compare(results, load_results(args.compare), args.threshold)
+    print(f"\nComparison with {args.compare}:")
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['benchmark']:55s} {row['baseline_us']:10.2f} -> {row['current_us']:10.2f} us  x{row['ratio']:.2f} {flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Tests for admission control of embedding-heavy requests
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.admission import AdmissionController, Overloaded, admission_scope
+from app.database.memory import InMemoryDocumentStore
+from app.main import app
+from app.routers import document as document_router
+from app.routers.document import get_db
+from benchmarks.fakes import FakeEmbeddingModel
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_by_priority_and_ingest_is_shed_last():
+    controller = AdmissionController("test", max_in_flight=1, max_queued=2, retry_after_s=3)
+    order = []
+    release = asyncio.Event()
+
+    async def request(name, priority, bounded=True):
+        async with controller.admit(priority, bounded):
+            order.append(name)
+            if name == "first":
+                await release.wait()
+
+    first = asyncio.create_task(request("first", "search"))
+    await asyncio.sleep(0)
+    ingest = asyncio.create_task(request("ingest", "ingest", bounded=False))
+    write = asyncio.create_task(request("write", "write"))
+    search = asyncio.create_task(request("search", "search"))
+    await asyncio.sleep(0)
+    assert controller.stats()["waiting"] == {"search": 1, "write": 1, "ingest": 1}
+
+    # The queue is full: a search sheds the waiting write, another write is refused
+    late_search = asyncio.create_task(request("late search", "search"))
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded) as refused:
+        await request("late write", "write")
+    assert refused.value.retry_after_s == 3
+
+    release.set()
+    await asyncio.gather(first, ingest, search, late_search)
+    with pytest.raises(Overloaded):
+        await write
+    # Unbounded ingestion waiters yield to interactive requests
+    assert order == ["first", "search", "late search", "ingest"]
+    assert controller.in_flight == 0 and not controller._waiters
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    controller = AdmissionController("test", max_in_flight=1, max_queued=1)
+    async with controller.admit("search"):
+        waiter = asyncio.create_task(controller.admit("search").__aenter__())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert controller.queued == 0
+    assert controller.in_flight == 0
+
+
+def test_search_answers_503_with_retry_after_when_queue_is_full(monkeypatch):
+    store = InMemoryDocumentStore()
+    store.model = FakeEmbeddingModel()
+    monkeypatch.setattr(document_router, "embedding_admission",
+                        AdmissionController("test", max_in_flight=1, max_queued=0, retry_after_s=2))
+    # A request already holds the only slot and nothing may wait
+    document_router.embedding_admission.in_flight = 1
+    app.dependency_overrides[get_db] = lambda: store
+    try:
+        client = TestClient(app)
+        response = client.get("/documents/search", params={"q": "ai act"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
+
+        document_router.embedding_admission.in_flight = 0
+        assert client.get("/documents/search", params={"q": "ai act"}).status_code == 200
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_slot_is_held_only_while_embedding():
+    controller = AdmissionController("test-scope", max_in_flight=1, max_queued=4)
+    store = InMemoryDocumentStore()
+    store.model = FakeEmbeddingModel()
+    await store.create_document({"title": "AI Act", "content": "risk tiers"})
+    search_by_vector = store.search_by_vector
+    held, searching, overlap = [], 0, 0
+
+    async def slow_search(*args):
+        nonlocal searching, overlap
+        searching += 1
+        overlap = max(overlap, searching)
+        await asyncio.sleep(0.01)
+        searching -= 1
+        return await search_by_vector(*args)
+
+    store.search_by_vector = slow_search
+    encode = store.model.encode
+    store.model.encode = lambda texts: held.append(controller.in_flight) or encode(texts)
+
+    async def search():
+        with admission_scope(controller, "search"):
+            return await store.search_documents("ai act")
+
+    # Two searches with one slot overlap on the database side
+    results = await asyncio.gather(search(), search())
+    assert all(len(documents) == 1 for documents in results)
+    assert held == [1, 1] and overlap == 2 and controller.in_flight == 0
+    # Outside a scope, embedding takes no slot
+    assert len(await store.embed("no scope")) == FakeEmbeddingModel().dimensions
+
+
+@pytest.mark.asyncio
+async def test_in_process_encodes_queue_and_shed():
+    controller = AdmissionController("test-encode", max_in_flight=1, max_queued=1)
+    store = InMemoryDocumentStore()
+    store.model = FakeEmbeddingModel()
+    encode = store.model.encode
+    running, peak = 0, 0
+
+    def blocking_encode(texts):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        time.sleep(0.05)
+        running -= 1
+        return encode(texts)
+
+    store.model.encode = blocking_encode
+
+    async def embed(text):
+        with admission_scope(controller, "search"):
+            return await store.embed(text)
+
+    # The synchronous model runs off the event loop, so the other calls reach the controller while it computes
+    results = await asyncio.gather(*(embed(f"query {i}") for i in range(3)), return_exceptions=True)
+    assert sum(isinstance(result, Overloaded) for result in results) == 1
+    assert sum(isinstance(result, list) for result in results) == 2
+    assert peak == 1
@@ -0,0 +1,232 @@
+"""
+Tests for generational caches and the cached document store
+"""
+import sys
+
+import pytest
+
+from app.core.cache import (
+    GenerationalCache, MemoryCacheBackend, RedisCacheBackend, TaggedCache, create_cache_backend, vector_hash,
+)
+from app.database.cached import CachedDocumentStore, CachedGraphStore
+from app.database.memory import InMemoryDocumentStore, InMemoryGraphStore
+
+
+def _doc(doc_id: str, category: str):
+    return {"id": doc_id, "title": doc_id, "content": "", "tags": [], "category": category,
+            "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00"}
+
+
+class CountingStore(InMemoryDocumentStore):
+    """In-memory store counting searches that reach it"""
+
+    def __init__(self):
+        super().__init__(dimensions=3)
+        self.searches = 0
+
+    async def search_by_vector(self, query_vector, limit=10, category=None):
+        self.searches += 1
+        return await super().search_by_vector(query_vector, limit, category)
+
+    async def search_by_vectors(self, queries):
+        self.searches += len(queries)
+        return await super().search_by_vectors(queries)
+
+
+@pytest.fixture
+def cached():
+    store = CountingStore()
+    store.add(_doc("a", "legal"), [1, 0, 0])
+    store.add(_doc("b", "policy"), [0, 1, 0])
+    cache = GenerationalCache("search-test", MemoryCacheBackend(max_entries=100), ttl_s=60)
+    return CachedDocumentStore(store, cache)
+
+
+@pytest.mark.asyncio
+async def test_repeated_search_is_served_from_cache(cached):
+    first = await cached.search_by_vector([1, 0, 0], 5)
+    first[0]["distance"] = 99  # callers may mutate results
+    second = await cached.search_by_vector([1, 0, 0], 5)
+
+    assert cached.store.searches == 1
+    assert second[0]["id"] == "a" and second[0]["distance"] != 99
+    assert cached.cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_search_only_sends_misses_to_store(cached):
+    await cached.search_by_vector([1, 0, 0], 5)
+    results = await cached.search_by_vectors([([1, 0, 0], 5, None), ([0, 1, 0], 5, "policy")])
+
+    assert cached.store.searches == 2
+    assert [[d["id"] for d in r] for r in results] == [["a", "b"], ["b"]]
+    assert [[d["id"] for d in r] for r in await cached.search_by_vectors([([0, 1, 0], 5, "policy")])] == [["b"]]
+    assert cached.store.searches == 2
+
+
+@pytest.mark.asyncio
+async def test_search_mode_is_part_of_the_key(cached):
+    """Results ranked through a quantized index are not served for exact searches"""
+    await cached.search_by_vector([1, 0, 0], 5)
+    cached.store.quantization = "binary"
+    cached.store._compact = cached.store._quantize(cached.store._vectors)
+    await cached.search_by_vector([1, 0, 0], 5)
+
+    assert cached.store.searches == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_only_affected_categories(cached):
+    await cached.search_by_vector([1, 0, 0], 5, "legal")
+    await cached.search_by_vector([1, 0, 0], 5, "policy")
+    await cached.search_by_vector([1, 0, 0], 5)
+    assert cached.store.searches == 3
+
+    await cached.update_document("b", {"tags": ["x"]})  # category "policy"
+
+    await cached.search_by_vector([1, 0, 0], 5, "legal")  # still cached
+    await cached.search_by_vector([1, 0, 0], 5, "policy")  # invalidated
+    await cached.search_by_vector([1, 0, 0], 5)  # "all" always invalidated
+    assert cached.store.searches == 5
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_bounds_size_and_expires():
+    backend = MemoryCacheBackend(max_entries=2)
+    for key in ("a", "b", "c"):
+        await backend.set(key, key, ttl_s=60)
+    assert len(backend) == 2 and await backend.get("a") is None
+
+    await backend.set("expired", 1, ttl_s=-1)
+    assert await backend.get("expired") is None
+
+
+def test_vector_hash_is_stable_across_input_types():
+    assert vector_hash([0.5, 1.0]) == vector_hash((0.5, 1.0))
+    assert vector_hash([0.5, 1.0]) != vector_hash([1.0, 0.5])
+
+
+class CountingGraph(InMemoryGraphStore):
+    """In-memory graph counting reads that reach it"""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    async def get_document(self, document_id):
+        self.reads += 1
+        return await super().get_document(document_id)
+
+    async def get_related_documents(self, document_id, rel_type=None):
+        self.reads += 1
+        return await super().get_related_documents(document_id, rel_type)
+
+
+@pytest.mark.asyncio
+async def test_graph_cache_reads_through_and_invalidates_on_writes():
+    graph = CachedGraphStore(CountingGraph(), TaggedCache("graph-test", max_entries=100, ttl_s=60))
+    for node_id in ("hub", "a", "b"):
+        await graph.create_document_node(node_id, node_id)
+    await graph.create_relationship("hub", "a", "REFERENCES", 0.5)
+
+    assert [r["related"]["id"] for r in await graph.get_related_documents("hub")] == ["a"]
+    (await graph.get_document("hub"))["title"] = "mutated"  # callers may mutate results
+    assert (await graph.get_document("hub"))["title"] == "hub"
+    await graph.get_related_documents("hub")
+    assert graph.store.reads == 2
+
+    # A new edge, a renamed neighbour and a deleted neighbour each drop the cached list
+    await graph.create_relationship("hub", "b", "AMENDS", 0.9)
+    assert {r["related"]["id"] for r in await graph.get_related_documents("hub")} == {"a", "b"}
+    await graph.create_document_node("a", "renamed")
+    assert {r["related"]["title"] for r in await graph.get_related_documents("hub")} == {"renamed", "b"}
+    await graph.delete_document_node("b")
+    assert [r["related"]["id"] for r in await graph.get_related_documents("hub")] == ["a"]
+    assert graph.store.reads == 5
+    assert (await graph.get_document("hub"))["title"] == "hub" and graph.store.reads == 5
+
+
+def test_tagged_cache_bounds_entries_and_skips_stale_writes():
+    cache = TaggedCache("tagged-test", max_entries=2, ttl_s=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, {"value": key * 100}, [f"tag:{key}"], cache.epoch)
+    assert cache.get("a") is None and cache.get("c") == {"value": "c" * 100}
+    assert cache.stats()["bytes"] > 200 and cache.stats()["evictions"]["size"] == 1
+
+    epoch = cache.epoch
+    cache.invalidate(["tag:b"])
+    cache.set("b", {"value": "stale"}, ["tag:b"], epoch)
+    assert cache.get("b") is None and len(cache) == 1
+
+
+class FakeRedis:
+    """The part of the redis.asyncio client RedisCacheBackend uses, over a dict of bytes"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, px=None):
+        self.data[key] = value.encode()
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b"0")) + 1).encode()
+
+    async def delete(self, key):
+        self.data.pop(key.decode(), None)
+
+    async def scan_iter(self, match):
+        for key in list(self.data):
+            if key.startswith(match.rstrip("*")):
+                yield key.encode()
+
+    def pipeline(self, transaction=True):
+        client, calls = self, []
+
+        class Pipeline:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def incr(self, key):
+                calls.append(key)
+
+            async def execute(self):
+                for key in calls:
+                    await client.incr(key)
+
+        return Pipeline()
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_round_trip_and_invalidation():
+    client = FakeRedis()
+    cache = GenerationalCache("search-redis", RedisCacheBackend("redis://unused", client=client), ttl_s=60)
+    key = await cache.key("legal", "q")
+    assert await cache.get(key) is None
+    await cache.set(key, [{"id": "a"}])
+    assert await cache.get(key) == [{"id": "a"}]
+
+    # Invalidating a scope moves its readers to a new key; other scopes keep theirs
+    other = await cache.key("policy", "q")
+    await cache.invalidate(["legal"])
+    assert await cache.key("legal", "q") != key and await cache.key("policy", "q") == other
+
+    # clear drops entries but keeps the generation counters
+    await cache.clear()
+    assert await cache.get(key) is None
+    assert list(client.data) == ["cache:gen:search-redis:legal"]
+
+
+def test_redis_backend_without_the_package_fails_clearly(monkeypatch):
+    monkeypatch.setitem(sys.modules, "redis", None)
+    monkeypatch.setitem(sys.modules, "redis.asyncio", None)
+    with pytest.raises(RuntimeError, match="redis package"):
+        create_cache_backend("redis", 100)
@@ -0,0 +1,88 @@
+"""
+Tests for MinHash near-duplicate detection and the backfill job
+"""
+import pytest
+
+from app.core.dedup import DUPLICATE_OF, SUPERSEDES, DuplicateDetector, MinHasher
+from app.database.memory import InMemoryDocumentStore, InMemoryGraphStore
+from app.database.signatures import MemorySignatureIndex
+from app.jobs.dedup_backfill import backfill
+from benchmarks.fakes import FakeEmbeddingModel
+
+def _articles(start, stop, text="Providers of high-risk AI systems shall keep records of operation number"):
+    return " ".join(f"Article {i}. {text} {i}." for i in range(start, stop))
+
+
+ACT = _articles(0, 40)
+# The last six articles rewritten: estimated similarity to ACT is about 0.8
+AMENDED = _articles(0, 34) + " " + _articles(34, 40, "Deployers must register each system in the EU database entry")
+
+
+def test_formatting_differences_do_not_change_the_signature():
+    hasher = MinHasher()
+    reformatted = ACT.upper().replace(". ", ".\n\n  ").replace(",", " , ")
+    assert hasher.similarity(hasher.signature(ACT), hasher.signature(reformatted)) == 1.0
+    assert hasher.buckets(hasher.signature(ACT)) == hasher.buckets(hasher.signature(reformatted))
+
+
+def test_similarity_estimates_jaccard():
+    hasher = MinHasher(num_perm=256, bands=32)
+    amended = ACT.replace("operation number 3.", "deployment number 3.")
+    unrelated = " ".join(f"Tax credit {i} applies to renewable energy projects" for i in range(40))
+    assert 0.8 < hasher.similarity(hasher.signature(ACT), hasher.signature(amended)) < 1.0
+    assert hasher.similarity(hasher.signature(ACT), hasher.signature(unrelated)) < 0.1
+
+
+@pytest.mark.asyncio
+async def test_detector_classifies_and_links_matches():
+    detector = DuplicateDetector(MemorySignatureIndex(), duplicate_threshold=0.95, version_threshold=0.6)
+    graph = InMemoryGraphStore()
+    for doc_id in ("original", "copy", "amended"):
+        await graph.create_document_node(doc_id, doc_id)
+
+    assert await detector.index_document("original", ACT) == []
+    copy_matches = await detector.index_document("copy", ACT.replace(" ", "  "))
+    assert [(m["id"], m["relation"]) for m in copy_matches] == [("original", DUPLICATE_OF)]
+
+    matches = await detector.index_document("amended", AMENDED)
+    assert {m["id"] for m in matches} == {"original", "copy"}
+    assert all(m["relation"] == SUPERSEDES for m in matches)
+    assert await detector.link(graph, "amended", matches) == 2
+    assert {r["r"]["type"] for r in await graph.get_related_documents("amended")} == {SUPERSEDES}
+
+    await detector.remove("original")
+    assert "original" not in [m["id"] for m in await detector.find(detector.hasher.signature(ACT))]
+
+
+@pytest.mark.asyncio
+async def test_backfill_links_newer_documents_to_older_ones():
+    store, graph = InMemoryDocumentStore(), InMemoryGraphStore()
+    store.model = FakeEmbeddingModel()
+    for doc_id, created_at, content in [
+        ("old", "2024-01-01T00:00:00", ACT),
+        ("new", "2024-03-01T00:00:00", ACT + " Done."),
+        ("other", "2024-02-01T00:00:00", "Unrelated text about agricultural subsidies"),
+    ]:
+        store.add({"id": doc_id, "title": "Act", "content": content, "tags": [], "category": "legal",
+                   "created_at": created_at, "updated_at": created_at}, [1.0] * store.dimensions)
+        await graph.create_document_node(doc_id, "Act")
+    detector = DuplicateDetector(MemorySignatureIndex())
+
+    stats = await backfill(store, detector, graph, page_size=2)
+    assert stats == {**stats, "documents": 3, "matches": 1, "edges_created": 1}
+    assert [r["related"]["id"] for r in await graph.get_related_documents("new")] == ["old"]
+    assert await graph.get_related_documents("old") == []
+
+    # Re-running finds the same single match
+    assert (await backfill(store, detector, graph))["matches"] == 1
+
+
+def test_detector_is_off_on_the_lancedb_backend(monkeypatch):
+    from app.core.config import settings
+    from app.database import factory
+
+    monkeypatch.setattr(settings, "dedup_enabled", True)
+    monkeypatch.setattr(settings, "vector_backend", "lancedb")
+    assert factory.build_duplicate_detector(InMemoryDocumentStore()) is None
+    monkeypatch.setattr(settings, "vector_backend", "memory")
+    assert isinstance(factory.build_duplicate_detector(InMemoryDocumentStore()).index, MemorySignatureIndex)
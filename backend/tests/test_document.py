@@ -81,6 +81,30 @@ class TestAPI:
         assert response.status_code == 200
         assert isinstance(response.json(), list)
 
+    def test_search_documents_batch(self, client):
+        from app.routers.document import db_manager
+        db_manager.search_documents_batch = AsyncMock(return_value=[[], []])
+
+        response = client.post("/documents/search/batch", json={
+            "queries": [{"q": "privacy"}, {"q": "tax", "limit": 3, "category": "legal"}]
+        })
+        assert response.status_code == 200
+        assert response.json() == [[], []]
+        db_manager.search_documents_batch.assert_awaited_once_with([("privacy", 10, None), ("tax", 3, "legal")])
+
+        assert client.post("/documents/search/batch", json={"queries": []}).status_code == 422
+
+    def test_similar_documents(self, client):
+        from app.routers.document import db_manager
+        db_manager.similar_documents = AsyncMock(return_value={})
+        assert client.get("/documents/missing/similar").status_code == 404
+
+        db_manager.similar_documents = AsyncMock(return_value={"a": [], "b": []})
+        response = client.get("/documents/similar?ids=a&ids=b&category=legal")
+        assert response.status_code == 200
+        assert response.json() == {"a": [], "b": []}
+        db_manager.similar_documents.assert_awaited_once_with(["a", "b"], limit=10, category="legal")
+
     def test_get_nonexistent_document(self, client):
         # Mock for nonexistent document
         from app.routers.document import db_manager
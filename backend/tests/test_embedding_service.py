@@ -0,0 +1,117 @@
+"""
+Tests for the shared embedding sidecar and its client
+"""
+import asyncio
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+
+from app.core.embedding_service import (
+    REQUEST_HEADER, EmbeddingClient, EmbeddingServer, decode_texts, encode_request,
+)
+from app.database.memory import InMemoryDocumentStore
+from benchmarks.fakes import FakeEmbeddingModel
+
+
+class RecordingModel(FakeEmbeddingModel):
+    """Fake model remembering the size of each batch"""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def encode(self, texts):
+        self.batches.append(len(texts))
+        return super().encode(texts)
+
+
+@pytest.fixture
+def sidecar():
+    """Embedding server on a temporary socket, run on its own loop in a thread"""
+    model = RecordingModel()
+    path = os.path.join(tempfile.mkdtemp(), "embeddings.sock")
+    server = EmbeddingServer(model, path, max_batch=64, max_wait_ms=50)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+    yield server, model
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def test_request_frame_round_trips_unicode():
+    texts = ["Règlement (UE) 2016/679", "", "AI Act"]
+    frame = encode_request(texts)
+    assert decode_texts(frame[REQUEST_HEADER.size:], len(texts)) == texts
+
+
+def test_client_matches_in_process_model_and_batches_across_connections(sidecar):
+    server, model = sidecar
+    reference = FakeEmbeddingModel()
+    client = EmbeddingClient(server.socket_path)
+
+    single = client.encode("data protection")
+    np.testing.assert_allclose(single, reference.encode("data protection"), rtol=1e-6)
+    batch = client.encode(["a", "b c", "d e f"])
+    assert batch.shape == (3, reference.dimensions)
+    np.testing.assert_allclose(batch, reference.encode(["a", "b c", "d e f"]), rtol=1e-6)
+
+    # Eight workers sending one text each at the same time share model calls
+    model.batches.clear()
+    clients = [EmbeddingClient(server.socket_path) for _ in range(8)]
+    threads = [threading.Thread(target=c.encode, args=(f"text {i}",)) for i, c in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert sum(model.batches) == 8 and len(model.batches) < 8
+
+    # A store pointed at the sidecar embeds through it
+    store = InMemoryDocumentStore()
+    store.model = client
+    assert len(store.generate_embedding("privacy")) == reference.dimensions
+    for c in [client] + clients:
+        c.close()
+
+
+@pytest.mark.asyncio
+async def test_async_client_pipelines_requests_without_blocking_the_loop(sidecar):
+    server, model = sidecar
+    client = EmbeddingClient(server.socket_path)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    # Concurrent requests of one worker travel together and land in one batch
+    model.batches.clear()
+    running = asyncio.create_task(ticker())
+    vectors = await asyncio.gather(*(client.aencode(f"text {i}") for i in range(8)))
+    running.cancel()
+    assert model.batches == [8]
+    # The loop kept running through the sidecar's 50 ms batch wait
+    assert ticks >= 5
+    np.testing.assert_allclose(vectors[3], FakeEmbeddingModel().encode("text 3"), rtol=1e-6)
+
+    store = InMemoryDocumentStore()
+    store.model = client
+    doc_id = await store.create_document({"title": "GDPR", "content": "privacy"})
+    assert (await store.search_documents("privacy", limit=1))[0]["id"] == doc_id
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_client_reports_unreachable_sidecar():
+    client = EmbeddingClient(os.path.join(tempfile.mkdtemp(), "missing.sock"), timeout_s=1)
+    with pytest.raises(ConnectionError):
+        client.encode("anything")
+    with pytest.raises(ConnectionError):
+        await client.aencode("anything")
@@ -0,0 +1,86 @@
+"""
+Tests for search expanded with graph neighbourhoods
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.expansion import expand_search_results
+from app.database.memory import InMemoryDocumentStore, InMemoryGraphStore
+from app.main import app
+from app.routers.document import get_db, get_graph_db
+from benchmarks.fakes import FakeEmbeddingModel
+
+
+async def _graph():
+    """act <-AMENDS- amendment -REFERENCES-> guideline; act -REFERENCES-> other"""
+    graph = InMemoryGraphStore()
+    for node_id in ("act", "amendment", "guideline", "other"):
+        await graph.create_document_node(node_id, node_id.title())
+    await graph.create_relationship("amendment", "act", "AMENDS", 0.9)
+    await graph.create_relationship("amendment", "guideline", "REFERENCES", 0.5)
+    await graph.create_relationship("act", "other", "REFERENCES", 0.2)
+    return graph
+
+
+@pytest.mark.asyncio
+async def test_neighbourhoods_follow_filters_and_best_paths():
+    graph = await _graph()
+
+    incoming = await graph.get_neighbourhoods(["act"], ["AMENDS"], depth=1, direction="in")
+    assert [(n["node"]["id"], n["rel_types"]) for n in incoming["act"]] == [("amendment", ["AMENDS"])]
+    assert await graph.get_neighbourhoods(["act"], ["AMENDS"], depth=1, direction="out") == {}
+
+    both = await graph.get_neighbourhoods(["act", "missing"], depth=2)
+    assert [n["node"]["id"] for n in both["act"]] == ["amendment", "guideline", "other"]
+    guideline = both["act"][1]
+    assert guideline["depth"] == 2 and guideline["confidence"] == pytest.approx(0.45)
+    assert "missing" not in both
+
+
+def test_expand_merges_neighbours_across_hits():
+    hits = [{"id": "act", "distance": 0.1}, {"id": "other", "distance": 0.4}]
+    neighbourhoods = {
+        "act": [{"node": {"id": "amendment"}, "rel_types": ["AMENDS"], "depth": 1, "confidence": 0.9},
+                {"node": {"id": "other"}, "rel_types": ["REFERENCES"], "depth": 1, "confidence": 0.2}],
+        "other": [{"node": {"id": "amendment"}, "rel_types": ["REFERENCES"], "depth": 2, "confidence": 0.5}],
+    }
+    expanded = expand_search_results(hits, neighbourhoods, rescore=True)
+
+    assert [n["id"] for n in expanded["hits"][0]["neighbours"]] == ["amendment", "other"]
+    # Hits are not repeated in the merged list; neighbours keep their best score
+    assert [(n["id"], n["via"]) for n in expanded["related"]] == [("amendment", ["act", "other"])]
+    assert expanded["related"][0]["score"] == pytest.approx(0.9 * 0.9)
+
+
+def test_expanded_search_endpoint():
+    store = InMemoryDocumentStore()
+    store.model = FakeEmbeddingModel()
+    graph = InMemoryGraphStore()
+
+    async def seed():
+        act = await store.create_document({"title": "AI Act", "content": "risk tiers for AI systems"})
+        amendment = await store.create_document({"title": "Tax code", "content": "withholding rates"})
+        for doc_id, title in ((act, "AI Act"), (amendment, "Tax code")):
+            await graph.create_document_node(doc_id, title)
+        await graph.create_relationship(amendment, act, "AMENDS", 0.8)
+        return act, amendment
+
+    act, amendment = asyncio.run(seed())
+    app.dependency_overrides[get_db] = lambda: store
+    app.dependency_overrides[get_graph_db] = lambda: graph
+    try:
+        client = TestClient(app)
+        response = client.get("/documents/search/expanded", params={
+            "q": "AI Act risk tiers", "limit": 1, "rel_types": "AMENDS", "direction": "in",
+        })
+        assert response.status_code == 200
+        body = response.json()
+        assert body["hits"][0]["document"]["id"] == act
+        assert [n["id"] for n in body["hits"][0]["neighbours"]] == [amendment]
+        assert body["related"][0]["via"] == [act]
+
+        assert client.get("/documents/search/expanded", params={"q": "x", "direction": "up"}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
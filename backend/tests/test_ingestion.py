@@ -0,0 +1,74 @@
+"""
+Tests for asynchronous ingestion jobs
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.ingestion import IngestionQueue, QueueFull
+from app.database.memory import InMemoryDocumentStore, InMemoryGraphStore
+from app.main import app
+from app.routers.document import get_db, get_graph_db
+from benchmarks.fakes import FakeEmbeddingModel
+
+
+@pytest.mark.asyncio
+async def test_queue_retries_failed_steps_and_reports_progress():
+    calls = []
+
+    async def handler(item):
+        calls.append(item["document"])
+        if item["doc_id"] is None:
+            item["doc_id"] = f"id-{item['document']}"
+        if item["document"] == "flaky" and item["attempts"] < 2:
+            raise RuntimeError("graph unavailable")
+        if item["document"] == "broken":
+            raise RuntimeError("always fails")
+
+    queue = IngestionQueue(handler, concurrency=2, max_queued=3, max_attempts=2, retry_backoff_s=0)
+    job = queue.submit(["ok", "flaky", "broken"])
+    assert job["status"] == "queued" and job["progress"] == 0.0
+    with pytest.raises(QueueFull):
+        queue.submit(["one too many"])
+
+    await queue.join()
+    job = queue.status(job["id"])
+    assert job["status"] == "failed" and job["progress"] == 1.0
+    assert (job["completed"], job["failed"]) == (2, 1)
+    # The retried document kept the ID from its first attempt
+    assert job["document_ids"] == ["id-ok", "id-flaky", "id-broken"]
+    assert calls.count("flaky") == 2 and job["errors"] == ["document 2: always fails"]
+    await queue.stop()
+
+
+def test_async_create_and_bulk_endpoints():
+    store = InMemoryDocumentStore()
+    store.model = FakeEmbeddingModel()
+    graph = InMemoryGraphStore()
+    app.dependency_overrides[get_db] = lambda: store
+    app.dependency_overrides[get_graph_db] = lambda: graph
+    try:
+        with TestClient(app) as client:
+            response = client.post("/documents/bulk", json=[
+                {"title": f"Doc {i}", "content": f"body {i}"} for i in range(5)
+            ])
+            assert response.status_code == 202
+            job_id = response.json()["id"]
+            assert response.headers["Location"] == f"/documents/jobs/{job_id}"
+
+            single = client.post("/documents/?async=true", json={"title": "One", "content": "body"})
+            assert single.status_code == 202 and single.json()["total"] == 1
+
+            for _ in range(100):
+                job = client.get(f"/documents/jobs/{job_id}").json()
+                if job["status"] == "succeeded":
+                    break
+                time.sleep(0.02)
+            assert job["status"] == "succeeded" and job["progress"] == 1.0
+            assert all(doc_id in graph.nodes for doc_id in job["document_ids"])
+            assert job_id in [j["id"] for j in client.get("/documents/jobs").json()]
+            assert client.get("/documents/jobs/missing").status_code == 404
+            assert client.post("/documents/bulk", json=[]).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,78 @@
+"""
+Tests for the kNN graph job
+"""
+import numpy as np
+import pytest
+
+from app.database.memory import InMemoryDocumentStore, InMemoryGraphStore
+from app.jobs.knn_graph import KnnGraphJob, blocked_top_k, normalize_rows
+
+
+def test_blocked_top_k_matches_full_sort():
+    rng = np.random.default_rng(0)
+    corpus = normalize_rows(rng.standard_normal((300, 16)).astype(np.float32))
+    rows = np.arange(0, 300, 7)
+
+    indices, scores = blocked_top_k(corpus[rows], corpus, k=5, block_size=8, self_rows=rows)
+
+    full = corpus[rows] @ corpus.T
+    full[np.arange(len(rows)), rows] = -np.inf
+    assert np.array_equal(indices, np.argsort(-full, axis=1)[:, :5])
+    assert np.allclose(scores, np.sort(full, axis=1)[:, ::-1][:, :5])
+
+
+def _add(store, graph, doc_id, vector, updated_at="2024-01-01T00:00:00"):
+    store.add({"id": doc_id, "title": doc_id, "content": "", "tags": [], "category": "c",
+               "created_at": updated_at, "updated_at": updated_at}, vector)
+    graph.nodes.setdefault(doc_id, {"id": doc_id, "title": doc_id})
+
+
+async def _targets(graph, doc_id):
+    return {r["related"]["id"]: r["r"]["confidence"] for r in await graph.get_related_documents(doc_id, "RELATED_TO")}
+
+
+@pytest.mark.asyncio
+async def test_full_then_incremental_run(tmp_path):
+    store, graph = InMemoryDocumentStore(dimensions=3), InMemoryGraphStore()
+    _add(store, graph, "a", [1, 0, 0])
+    _add(store, graph, "a2", [1, 0.1, 0])
+    _add(store, graph, "b", [0, 1, 0])
+    _add(store, graph, "c", [0, 0, 1])
+    graph.nodes["manual"] = {"id": "manual"}
+    await graph.create_relationship("a", "manual", "REFERENCES")
+    job = KnnGraphJob(store, graph, k=2, min_similarity=0.5, state_path=str(tmp_path / "state.json"))
+
+    stats = await job.run()
+    assert stats["mode"] == "full" and stats["sources"] == 4
+    assert await _targets(graph, "a") == {"a2": pytest.approx(0.995, abs=1e-3)}
+    assert await _targets(graph, "c") == {}
+    assert len(await graph.get_related_documents("a", "REFERENCES")) == 1
+
+    # A new document near "c" only recomputes itself and its neighbours
+    _add(store, graph, "c2", [0, 0.1, 1], updated_at="2024-02-01T00:00:00")
+    stats = await job.run()
+    assert stats["mode"] == "incremental" and stats["sources"] == 3
+    assert set(await _targets(graph, "c")) == {"c2"}
+    assert set(await _targets(graph, "c2")) == {"c"}
+
+    assert (await job.run())["sources"] == 0
+
+
+@pytest.mark.asyncio
+async def test_incremental_run_drops_edges_to_a_document_that_moved_away(tmp_path):
+    store, graph = InMemoryDocumentStore(dimensions=3), InMemoryGraphStore()
+    _add(store, graph, "a", [1, 0, 0])
+    _add(store, graph, "a2", [1, 0.1, 0])
+    _add(store, graph, "b", [0, 1, 0])
+    _add(store, graph, "c", [0, 0, 1])
+    job = KnnGraphJob(store, graph, k=1, min_similarity=0.5, state_path=str(tmp_path / "state.json"))
+    await job.run()
+    assert set(await _targets(graph, "a")) == {"a2"}
+    assert await graph.relationship_sources("RELATED_TO", "knn", ["a2"]) == ["a"]
+
+    # "a2" is rewritten towards "c"; "a" is no longer among its neighbours but still points at it
+    assert await store.update_document("a2", {"vector": [0, 0.1, 1]})
+    stats = await job.run()
+    assert stats["sources"] == 3
+    assert await _targets(graph, "a") == {}
+    assert set(await _targets(graph, "a2")) == {"c"}
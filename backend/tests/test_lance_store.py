@@ -0,0 +1,80 @@
+"""
+Tests for the LanceDB document store
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("lancedb")
+
+from app.database.lance import LanceDocumentStore, sql_literal
+from benchmarks.fakes import FakeEmbeddingModel
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LanceDocumentStore(uri=str(tmp_path / "lancedb"))
+    store.model = FakeEmbeddingModel()
+    return store
+
+
+def test_sql_literal_escapes_quotes():
+    assert sql_literal("O'Brien") == "'O''Brien'"
+
+
+@pytest.mark.asyncio
+async def test_crud_and_filtered_search(store):
+    assert await store.connect()
+    legal = await store.create_document({"title": "AI Act", "content": "risk tiers", "category": "legal"})
+    policy = await store.create_document({"title": "O'Brien memo", "content": "policy", "category": "policy"})
+
+    assert (await store.get_document(legal))["title"] == "AI Act"
+    assert [d["id"] for d in await store.list_documents()] == [policy, legal]
+
+    results = await store.search_by_vector(store.generate_embedding("AI Act risk tiers"), limit=2)
+    assert results[0]["id"] == legal and results[0]["distance"] == pytest.approx(0.0, abs=1e-5)
+    assert [d["id"] for d in await store.search_by_vector([1.0] * 384, 5, "policy")] == [policy]
+
+    batches = [batch async for batch in store.iter_vectors(batch_size=1)]
+    assert sorted(ids[0] for ids, _, _ in batches) == sorted([legal, policy])
+    assert batches[0][1].shape == (1, 384)
+
+    similar = await store.similar_documents([legal, "missing"], limit=5)
+    assert list(similar) == [legal] and [d["id"] for d in similar[legal]] == [policy]
+
+    assert await store.update_document(legal, {"tags": ["EU"]})
+    assert (await store.get_document(legal))["tags"] == ["EU"]
+
+    assert await store.delete_document(policy)
+    assert not await store.delete_document(policy)
+    assert await store.get_document(policy) is None
+
+
+@pytest.mark.asyncio
+async def test_list_pages_are_newest_first(store):
+    assert await store.connect()
+    docs = [{"id": f"doc-{i}", "title": f"t{i}", "content": "c" * 1000, "tags": [f"tag-{i}"],
+             "category": "legal" if i % 2 else "policy",
+             "created_at": f"2024-01-{i + 1:02d}T00:00:00", "updated_at": f"2024-01-{i + 1:02d}T00:00:00"}
+            for i in range(12)]
+    await store.add_documents(docs, [[float(i + 1)] * 384 for i in range(12)])
+
+    pages = [await store.list_documents(skip=skip, limit=5) for skip in (0, 5, 10, 15)]
+    assert [[d["id"] for d in page] for page in pages] == [
+        [f"doc-{i}" for i in range(11, 6, -1)], [f"doc-{i}" for i in range(6, 1, -1)], ["doc-1", "doc-0"], []
+    ]
+    assert pages[0][0]["tags"] == ["tag-11"] and len(pages[0][0]["content"]) == 1000
+    assert [d["id"] for d in await store.list_documents(skip=1, limit=2, category="legal")] == ["doc-9", "doc-7"]
+
+
+@pytest.mark.asyncio
+async def test_vector_index_keeps_recall(store):
+    """IVF-PQ with refine returns the exact nearest neighbour for an indexed vector"""
+    assert await store.connect()
+    vectors = np.random.default_rng(3).standard_normal((2000, 384)).astype(np.float32)
+    docs = [{"id": str(i), "title": "t", "content": "c", "tags": [], "category": "legal",
+             "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00"} for i in range(2000)]
+    await store.add_documents(docs, vectors.tolist())
+    await store.create_vector_index()
+
+    results = await store.search_by_vector(vectors[42].tolist(), limit=5, category="legal")
+    assert results[0]["id"] == "42"
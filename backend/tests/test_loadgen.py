@@ -0,0 +1,46 @@
+"""
+Tests for the synthetic corpus and the load generator's bookkeeping
+"""
+import pytest
+
+from benchmarks.corpus import REGIONS, TOPICS, generate_citations, generate_documents, search_queries
+from benchmarks.loadgen import LoadState, parse_mix, percentile, summarize
+
+
+def test_corpus_is_deterministic_and_well_formed():
+    documents = list(generate_documents(200))
+    assert documents == list(generate_documents(200))
+    assert [doc["ref"] for doc in documents] == list(range(200))
+    regions, topics = {name for name, _ in REGIONS}, {name for name, _ in TOPICS}
+    for doc in documents:
+        assert doc["metadata"]["region"] in regions and doc["metadata"]["topic"] in topics
+        assert doc["tags"] == [doc["metadata"]["topic"], doc["metadata"]["region"]]
+        assert len(doc["content"].split()) >= 50
+    assert search_queries(20) == search_queries(20)
+
+    # Newer documents cite older ones, each at most once
+    edges = generate_citations(200)
+    assert edges and all(edge["target"] < edge["source"] for edge in edges)
+    pairs = [(edge["source"], edge["target"]) for edge in edges]
+    assert len(pairs) == len(set(pairs))
+
+
+def test_random_id_favours_recent_documents():
+    state = LoadState([f"doc-{i}" for i in range(1000)], [], [])
+    picks = [int(state.random_id().split("-")[1]) for _ in range(4000)]
+    newest = sum(1 for index in picks if index >= 900)
+    oldest = sum(1 for index in picks if index < 100)
+    assert newest > 3 * oldest
+
+
+def test_mix_parsing_and_summary():
+    assert parse_mix("create=1, search=6") == {"create": 1.0, "search": 6.0}
+    with pytest.raises(ValueError):
+        parse_mix("create=1,delete=2")
+
+    values = [float(v) for v in range(1, 101)]
+    assert (percentile(values, 0.5), percentile(values, 0.99), percentile([], 0.5)) == (50.0, 99.0, 0.0)
+    summary = summarize({"search": [30.0, 10.0, 20.0, 40.0]}, {"search": 1}, dropped=2, elapsed=2.0, rate=5)
+    assert summary["total_requests"] == 4 and summary["throughput_rps"] == 2.0 and summary["dropped"] == 2
+    assert summary["endpoints"]["search"]["p50_ms"] == 20.0
+    assert summary["endpoints"]["search"]["error_rate"] == 0.25
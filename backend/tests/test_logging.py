@@ -0,0 +1,74 @@
+"""
+Tests for structured, queue-based logging
+"""
+import json
+import logging
+
+from app.core.logging import (
+    JsonFormatter,
+    RouteSamplingFilter,
+    current_route,
+    get_logger,
+    truncate,
+)
+
+
+def test_truncate_long_strings():
+    """Long strings are shortened, nested values included"""
+    assert truncate("short", 10) == "short"
+    assert truncate("x" * 30, 10).startswith("x" * 10 + "...")
+    nested = truncate({"content": "y" * 30, "tags": ["z" * 30]}, 10)
+    assert len(nested["content"]) < 30
+    assert len(nested["tags"][0]) < 30
+
+
+def test_json_formatter_includes_fields_and_route():
+    """Records are rendered as one JSON object with structured fields"""
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, "Document added", None, None)
+    record.fields = {"doc_id": "abc"}
+    record.route = "/documents/"
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["msg"] == "Document added"
+    assert entry["doc_id"] == "abc"
+    assert entry["route"] == "/documents/"
+    assert entry["level"] == "INFO"
+
+
+def test_json_formatter_keeps_core_keys_over_fields():
+    """A field named like a core key is kept under a prefixed name"""
+    record = logging.LogRecord("app.test", logging.WARNING, __file__, 1, "Import failed", None, None)
+    record.fields = {"msg": "row 3 invalid", "level": 2, "logger": "csv", "ts": 0, "rows": 10}
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert (entry["msg"], entry["level"], entry["logger"]) == ("Import failed", "WARNING", "app.test")
+    assert entry["ts"] != 0 and entry["rows"] == 10
+    assert (entry["field_msg"], entry["field_level"], entry["field_logger"], entry["field_ts"]) == (
+        "row 3 invalid", 2, "csv", 0
+    )
+
+
+def test_route_sampling_filter():
+    """Sampling applies per route prefix and never drops warnings"""
+    sampler = RouteSamplingFilter({"/health": 0.0, "/documents": 1.0})
+    assert sampler.keep(logging.INFO, "/health/ping") is False
+    assert sampler.keep(logging.WARNING, "/health/ping") is True
+    assert sampler.keep(logging.INFO, "/documents/search") is True
+    assert sampler.keep(logging.INFO, None) is True
+
+
+def test_route_sampling_filter_tags_record_with_route():
+    """The filter stamps records with the current request route"""
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, "msg", None, None)
+    token = current_route.set("/documents/search")
+    try:
+        assert RouteSamplingFilter().filter(record) is True
+    finally:
+        current_route.reset(token)
+    assert record.route == "/documents/search"
+
+
+def test_get_logger_is_child_of_app_logger():
+    """Module loggers share the application's queue handler"""
+    assert get_logger("app.database.vector").name == "app.database.vector"
+    assert get_logger("benchmarks").name == "app.benchmarks"
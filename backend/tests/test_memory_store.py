@@ -0,0 +1,147 @@
+"""
+Tests for the in-memory document and graph stores
+"""
+import numpy as np
+import pytest
+
+from app.database.memory import InMemoryDocumentStore, InMemoryGraphStore
+from benchmarks.fakes import FakeEmbeddingModel
+
+
+@pytest.fixture
+def store():
+    store = InMemoryDocumentStore()
+    store.model = FakeEmbeddingModel()
+    return store
+
+
+@pytest.mark.asyncio
+async def test_crud_round_trip(store):
+    doc_id = await store.create_document({"title": "AI Act", "content": "Risk tiers", "tags": ["AI"]})
+    doc = await store.get_document(doc_id)
+    assert doc["title"] == "AI Act" and doc["category"] == "general"
+
+    # Returned documents are copies
+    doc["tags"].append("mutated")
+    assert (await store.get_document(doc_id))["tags"] == ["AI"]
+
+    assert await store.update_document(doc_id, {"category": "legal"})
+    assert (await store.get_document(doc_id))["category"] == "legal"
+    assert await store.list_documents(category="legal") != []
+
+    assert await store.delete_document(doc_id)
+    assert await store.get_document(doc_id) is None
+    assert not await store.delete_document(doc_id)
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_by_cosine_and_filters_category():
+    store = InMemoryDocumentStore(dimensions=3)
+    for doc_id, vector, category in [
+        ("x", [1, 0, 0], "legal"),
+        ("y", [0, 1, 0], "legal"),
+        ("xy", [1, 1, 0], "policy"),
+    ]:
+        store.add({"id": doc_id, "title": doc_id, "content": "", "tags": [], "category": category,
+                   "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00"}, vector)
+
+    results = await store.search_by_vector([1, 0.1, 0], limit=3)
+    assert [d["id"] for d in results] == ["x", "xy", "y"]
+    assert results[0]["distance"] == pytest.approx(1 - 1 / np.sqrt(1.01), abs=1e-5)
+
+    assert [d["id"] for d in await store.search_by_vector([1, 0, 0], 3, "policy")] == ["xy"]
+    assert await store.search_by_vector([1, 0, 0], 3, "missing") == []
+
+
+@pytest.mark.asyncio
+async def test_batch_search_matches_single_searches(store):
+    for i in range(50):
+        await store.create_document({"title": f"Doc {i}", "content": f"body {i}", "category": ["a", "b"][i % 2]})
+    queries = [("privacy", 5, None), ("tax law", 3, "b"), ("anything", 4, "missing")]
+
+    batched = await store.search_documents_batch(queries)
+    single = [await store.search_documents(q, limit, category) for q, limit, category in queries]
+    assert [[d["id"] for d in r] for r in batched] == [[d["id"] for d in r] for r in single]
+    assert [len(r) for r in batched] == [5, 3, 0]
+    assert "distance" not in batched[0][0]
+
+
+@pytest.mark.asyncio
+async def test_similar_documents_use_stored_vectors():
+    store = InMemoryDocumentStore(dimensions=3)
+    for doc_id, vector, category in [
+        ("x", [1, 0, 0], "legal"),
+        ("x2", [1, 0, 0], "legal"),
+        ("xy", [1, 1, 0], "policy"),
+        ("z", [0, 0, 1], "legal"),
+    ]:
+        store.add({"id": doc_id, "title": doc_id, "content": "", "tags": [], "category": category,
+                   "created_at": "", "updated_at": ""}, vector)
+
+    results = await store.similar_documents(["x", "z", "missing"], limit=2)
+    assert set(results) == {"x", "z"}
+    assert [d["id"] for d in results["x"]] == ["x2", "xy"]
+    assert "z" not in [d["id"] for d in results["z"]] and len(results["z"]) == 2
+
+    filtered = await store.similar_documents(["x"], limit=5, category="policy")
+    assert [d["id"] for d in filtered["x"]] == ["xy"]
+
+
+@pytest.mark.asyncio
+async def test_delete_keeps_matrix_consistent():
+    """Swap-removal must keep ids and vectors aligned, including across growth"""
+    store = InMemoryDocumentStore(dimensions=4)
+    vectors = np.eye(4, dtype=np.float32)
+    for i in range(2000):
+        store.add({"id": str(i), "title": "", "content": "", "tags": [], "category": "c",
+                   "created_at": "", "updated_at": ""}, vectors[i % 4])
+    for i in range(0, 2000, 2):
+        await store.delete_document(str(i))
+
+    assert len(store) == 1000
+    results = await store.search_by_vector([0, 1, 0, 0], limit=5)
+    assert all(int(d["id"]) % 4 == 1 for d in results)
+
+
+@pytest.mark.parametrize("quantization", ["halfvec", "binary"])
+@pytest.mark.asyncio
+async def test_quantized_search_reranks_candidates_exactly(quantization):
+    """Compact candidates are reranked with exact float32 distances, across growth and deletes"""
+    rng = np.random.default_rng(3)
+    vectors = rng.standard_normal((1500, 128)).astype(np.float32)
+    exact = InMemoryDocumentStore(dimensions=128)
+    store = InMemoryDocumentStore(dimensions=128, quantization=quantization, rerank_factor=20)
+    for i, vector in enumerate(vectors):
+        doc = {"id": str(i), "title": "", "content": "", "tags": [], "category": ["a", "b"][i % 2],
+               "created_at": "", "updated_at": ""}
+        exact.add(doc, vector)
+        store.add(dict(doc), vector)
+    for i in range(0, 1500, 3):
+        await exact.delete_document(str(i))
+        await store.delete_document(str(i))
+
+    assert store.search_mode == quantization
+    query = vectors[7] + 0.1 * rng.standard_normal(128).astype(np.float32)
+    expected = await exact.search_by_vector(query.tolist(), 5, "b")
+    results = await store.search_by_vector(query.tolist(), 5, "b")
+    assert [d["id"] for d in results] == [d["id"] for d in expected]
+    assert results[0]["distance"] == pytest.approx(expected[0]["distance"], abs=1e-5)
+    assert await store.search_by_vectors([(query.tolist(), 5, "b")]) == [results]
+
+
+@pytest.mark.asyncio
+async def test_graph_store_relationships_and_delete():
+    graph = InMemoryGraphStore()
+    await graph.create_document_node("a", "A", {"region": "EU"})
+    await graph.create_document_node("b", "B", {"region": "US"})
+    assert not await graph.create_relationship("a", "missing", "REFERENCES")
+    assert await graph.create_relationship("a", "b", "AMENDS", confidence=0.8)
+
+    related = await graph.get_related_documents("a")
+    assert related[0]["related"]["id"] == "b"
+    assert related[0]["r"]["type"] == "AMENDS" and related[0]["r"]["confidence"] == 0.8
+    assert await graph.get_related_documents("a", "REFERENCES") == []
+    assert [n["id"] for n in await graph.search_documents({"region": "EU"})] == ["a"]
+
+    assert await graph.delete_document_node("b")
+    assert await graph.get_related_documents("a") == []
@@ -0,0 +1,52 @@
+"""
+Tests for the metrics subsystem and /metrics endpoint
+"""
+from fastapi.testclient import TestClient
+
+from app.core.metrics import Counter, Histogram, REQUEST_SECONDS
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_histogram_buckets_and_render():
+    """Observations land in cumulative buckets with sum and count"""
+    histogram = Histogram("test_seconds", "test", ("query",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, query="a")
+    histogram.observe(0.5, query="a")
+    histogram.observe(5.0, query="a")
+
+    lines = histogram.render()
+    assert 'test_seconds_bucket{query="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{query="a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{query="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{query="a"} 3' in lines
+    assert histogram.count(query="a") == 3
+
+
+def test_histogram_time_context():
+    """time() records one observation per block"""
+    histogram = Histogram("timed_seconds", "test")
+    with histogram.time():
+        pass
+    assert histogram.count() == 1
+
+
+def test_counter_labels():
+    """Counters track values per label set"""
+    counter = Counter("test_total", "test", ("route",))
+    counter.inc(route="/a")
+    counter.inc(2, route="/a")
+    assert counter.value(route="/a") == 3
+    assert counter.value(route="/b") == 0
+
+
+def test_metrics_endpoint_reports_route_latency():
+    """Requests are recorded by route template and exposed in Prometheus format"""
+    client.get("/health/ping")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE http_request_seconds histogram" in response.text
+    assert REQUEST_SECONDS.count(method="GET", route="/health/ping", status="200") >= 1
@@ -0,0 +1,58 @@
+"""
+Tests for the opt-in request profiling middleware
+"""
+import os
+import pstats
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiling import ProfilingMiddleware, requested_mode
+
+
+def _client(tmp_path, enabled=True):
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        return {"total": sum(i * i for i in range(20000))}
+
+    app.add_middleware(ProfilingMiddleware, enabled=enabled, output_dir=str(tmp_path))
+    return TestClient(app)
+
+
+def test_requested_mode_from_header_and_query():
+    """The profiler is selected by header or query flag"""
+    assert requested_mode({"headers": [(b"x-profile", b"1")]}) == "cprofile"
+    assert requested_mode({"headers": [(b"x-profile", b"sampling")]}) == "sampling"
+    assert requested_mode({"headers": [], "query_string": b"profile=1"}) == "cprofile"
+    assert requested_mode({"headers": [], "query_string": b"profile=0"}) is None
+    assert requested_mode({"headers": []}) is None
+
+
+def test_cprofile_writes_pstats_and_timing_headers(tmp_path):
+    """A flagged request is profiled and reports wall and CPU time"""
+    response = _client(tmp_path).get("/work", headers={"X-Profile": "1"})
+
+    assert response.status_code == 200
+    assert float(response.headers["x-profile-wall-ms"]) >= 0
+    assert float(response.headers["x-profile-cpu-ms"]) >= 0
+    path = response.headers["x-profile-file"]
+    assert path.endswith(".pstats") and os.path.exists(path)
+    assert pstats.Stats(path).total_calls > 0
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    """Sampling mode writes flamegraph-compatible collapsed stacks"""
+    response = _client(tmp_path).get("/work?profile=sampling")
+
+    path = response.headers["x-profile-file"]
+    assert path.endswith(".collapsed") and os.path.exists(path)
+
+
+def test_disabled_by_config(tmp_path):
+    """Without PROFILING_ENABLED the flag is ignored"""
+    response = _client(tmp_path, enabled=False).get("/work", headers={"X-Profile": "1"})
+
+    assert "x-profile-file" not in response.headers
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,115 @@
+"""
+Tests for SQL/Cypher builders and row conversion helpers
+"""
+from datetime import datetime
+
+import pytest
+
+from sqlalchemy.engine import result_tuple
+
+from app.database.graph import (
+    build_metadata_search_query,
+    build_neighbourhood_query,
+    build_related_query,
+    build_relationship_sources_query,
+    build_replace_relationships_queries,
+    records_to_nodes,
+)
+from app.database.vector import (
+    build_batch_search_query,
+    build_list_query,
+    build_search_query,
+    build_similar_query,
+    row_to_document,
+    to_pgvector,
+)
+
+
+def test_row_to_document_accepts_sqlalchemy_rows():
+    """Rows are converted through their mapping, tags parsed and dates formatted"""
+    columns = ["id", "title", "content", "tags", "category", "created_at", "updated_at"]
+    row = result_tuple(columns)(
+        ("doc-1", "Title", "Body", '["AI"]', "legal", datetime(2024, 1, 1), datetime(2024, 1, 2))
+    )
+
+    doc = row_to_document(row)
+    assert doc["tags"] == ["AI"]
+    assert doc["created_at"] == "2024-01-01T00:00:00"
+    assert doc["updated_at"] == "2024-01-02T00:00:00"
+
+
+def test_build_search_query_with_category():
+    """Search SQL binds the vector as a pgvector literal and filters by category"""
+    query, params = build_search_query([0.5, 0.25], limit=5, category="legal")
+    assert "WHERE category = :category" in query
+    assert params == {"query_vector": "[0.5,0.25]", "category": "legal", "limit": 5}
+
+
+def test_build_search_query_quantized_reranks_candidates():
+    """Quantized search orders candidates by the compact distance, then by exact distance"""
+    query, params = build_search_query([0.5, 0.25], limit=5, category="legal", quantization="binary", rerank_factor=8)
+    assert "binary_quantize(vector)" in query and "<~>" in query
+    assert query.strip().endswith("ORDER BY distance LIMIT :limit")
+    assert params == {"query_vector": "[0.5,0.25]", "category": "legal", "candidates": 40, "limit": 5}
+
+    query, _ = build_search_query([0.5, 0.25], limit=5, quantization="halfvec")
+    assert "halfvec(384)" in query and "WHERE" not in query
+
+
+def test_build_neighbourhood_query_filters_types_depth_and_direction():
+    """One UNWIND over all hits; relationship types are validated before interpolation"""
+    query = build_neighbourhood_query(["AMENDS", "REFERENCES"], depth=2, direction="in")
+    assert "UNWIND $ids AS id" in query
+    assert "<-[rels:AMENDS|REFERENCES*1..2]-" in query
+    assert "[..$limit]" in query
+    assert "-[rels*1..1]-" in build_neighbourhood_query()
+
+    with pytest.raises(ValueError):
+        build_neighbourhood_query(["AMENDS]->() DETACH DELETE (x"])
+
+
+def test_build_batch_search_query_binds_parallel_arrays():
+    """Batch search binds one array element per query, with NULL for no category"""
+    query, params = build_batch_search_query([([0.5, 0.25], 5, "legal"), ([1.0, 0.0], 3, None)])
+    assert "CROSS JOIN LATERAL" in query and "WITH ORDINALITY" in query
+    assert params == {
+        "query_vectors": ["[0.5,0.25]", "[1.0,0.0]"],
+        "limits": [5, 3],
+        "categories": ["legal", None],
+    }
+
+
+def test_build_similar_query_excludes_sources():
+    """Similar-document SQL searches with the stored vectors and skips each source"""
+    query, params = build_similar_query(["a", "b"], limit=4, category="legal")
+    assert "vector <=> s.vector" in query and "id <> s.id" in query
+    assert "AND category = :category" in query
+    assert params == {"doc_ids": ["a", "b"], "limit": 4, "category": "legal"}
+
+
+def test_build_list_query_without_category():
+    """List SQL only filters when a category is given"""
+    query, params = build_list_query(skip=10, limit=20)
+    assert "WHERE" not in query
+    assert params == {"skip": 10, "limit": 20}
+
+
+def test_to_pgvector():
+    assert to_pgvector([1.0, -0.5]) == "[1.0,-0.5]"
+
+
+def test_cypher_builders_and_mapping():
+    """Cypher builders parameterize filters and map records to nodes"""
+    query, params = build_metadata_search_query({"region": "EU"}, limit=3)
+    assert "d.region = $region" in query and "LIMIT 3" in query
+    assert params == {"region": "EU"}
+    assert ":AMENDS" in build_related_query("AMENDS")
+    assert records_to_nodes([{"d": {"id": "1"}}]) == [{"id": "1"}]
+
+
+def test_replace_relationships_queries_only_touch_their_origin():
+    delete_query, create_query = build_replace_relationships_queries("RELATED_TO")
+    assert "UNWIND $source_ids" in delete_query and "[r:RELATED_TO {origin: $origin}]" in delete_query
+    assert "UNWIND $edges AS edge" in create_query and "MERGE (source)-[r:RELATED_TO {origin: $origin}]->(target)" in create_query
+    sources_query = build_relationship_sources_query("RELATED_TO")
+    assert "UNWIND $target_ids" in sources_query and "[:RELATED_TO {origin: $origin}]" in sources_query
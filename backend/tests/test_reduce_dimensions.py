@@ -0,0 +1,69 @@
+"""
+Tests for PCA projections, coarse-to-fine search and the backfill job
+"""
+import numpy as np
+import pytest
+
+from app.core.projection import Projection, load_projection
+from app.database.memory import InMemoryDocumentStore
+from app.database.vector import build_search_query
+from app.jobs.reduce_dimensions import backfill, fit_projection
+
+
+def _add(store, vectors):
+    for i, vector in enumerate(vectors):
+        store.add({"id": str(i), "title": "", "content": "", "tags": [], "category": ["a", "b"][i % 2],
+                   "created_at": "", "updated_at": ""}, vector)
+
+
+def _corpus(rows=1200, dims=64, rank=12, seed=5):
+    """Vectors concentrated in a low-rank subspace plus a little noise"""
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, dims))
+    return (rng.standard_normal((rows, rank)) @ basis + 0.05 * rng.standard_normal((rows, dims))).astype(np.float32)
+
+
+def test_projection_fit_save_and_load(tmp_path):
+    vectors = _corpus()
+    projection = Projection.fit(vectors, 12)
+    assert projection.dimensions == 12
+    assert projection.explained_variance.sum() > 0.99
+    assert np.allclose(np.linalg.norm(projection.project(vectors[:5]), axis=1), 1.0, atol=1e-5)
+
+    path = str(tmp_path / "projection.npz")
+    projection.save(path)
+    loaded = load_projection(path, 12)
+    assert loaded.fingerprint == projection.fingerprint
+    assert load_projection(path, 16) is None
+    assert load_projection(path, 0) is None
+
+
+@pytest.mark.asyncio
+async def test_backfill_switches_store_to_coarse_to_fine_search():
+    vectors = _corpus()
+    exact = InMemoryDocumentStore(dimensions=64)
+    store = InMemoryDocumentStore(dimensions=64, rerank_factor=10)
+    _add(exact, vectors)
+    _add(store, vectors)
+
+    projection = await fit_projection(store, 12, sample_size=500)
+    stats = await backfill(store, projection, batch_size=100)
+    assert stats["documents"] == 1200
+    assert store.search_mode == f"pca12-{projection.fingerprint}"
+
+    # Documents written after the backfill are projected on the way in
+    _add(store, vectors[:1])
+    query = (vectors[11] + 0.1 * vectors[3]).tolist()
+    expected = await exact.search_by_vector(query, 5, "b")
+    results = await store.search_by_vector(query, 5, "b")
+    assert [d["id"] for d in results] == [d["id"] for d in expected]
+    assert results[0]["distance"] == pytest.approx(expected[0]["distance"], abs=1e-5)
+
+
+def test_build_search_query_reduced_keeps_unprojected_rows():
+    query, params = build_search_query([0.5, 0.25], limit=5, category="legal", rerank_factor=4,
+                                       reduced_vector=[1.0])
+    assert "vector_reduced <=> CAST(:reduced_vector AS vector)" in query
+    assert "vector_reduced IS NULL" in query and "UNION ALL" in query
+    assert params == {"query_vector": "[0.5,0.25]", "reduced_vector": "[1.0]", "category": "legal",
+                      "candidates": 20, "limit": 5}
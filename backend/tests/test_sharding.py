@@ -0,0 +1,144 @@
+"""
+Tests for sharded document storage and rebalancing
+"""
+import pytest
+
+from app.database.memory import InMemoryDocumentStore
+from app.database.sharded import ShardedDocumentStore, ShardRouter, jump_hash, stable_hash
+from app.jobs.rebalance_shards import rebalance
+from benchmarks.fakes import FakeEmbeddingModel
+
+TOPICS = ["data protection", "artificial intelligence", "cyber security", "consumer credit", "medical devices"]
+
+
+def make_sharded(shards, **router_options):
+    store = ShardedDocumentStore(shards, ShardRouter(len(shards), **router_options))
+    store.model = FakeEmbeddingModel()
+    return store
+
+
+async def add_corpus(store, count=30):
+    ids = []
+    for i in range(count):
+        ids.append(await store.create_document({
+            "title": f"{TOPICS[i % len(TOPICS)]} act {i}",
+            "content": f"rules on {TOPICS[i % len(TOPICS)]} number {i}",
+            "category": "law" if i % 2 else "regulation",
+            "metadata": {"region": "eu" if i % 3 else "us"},
+        }))
+    return ids
+
+
+def test_jump_hash_moves_only_keys_for_the_new_shard():
+    keys = [stable_hash(f"doc-{i}") for i in range(5000)]
+    before = [jump_hash(key, 4) for key in keys]
+    after = [jump_hash(key, 5) for key in keys]
+    moved = [(b, a) for b, a in zip(before, after) if b != a]
+    assert all(a == 4 for _, a in moved)
+    assert 0.15 < len(moved) / len(keys) < 0.25
+
+
+@pytest.mark.asyncio
+async def test_scatter_gather_matches_a_single_store_and_routes_by_id():
+    shards = [InMemoryDocumentStore() for _ in range(3)]
+    store = make_sharded(shards, strategy="region", regions={"us": 2})
+    reference = InMemoryDocumentStore()
+    reference.model = store.model
+    ids = await add_corpus(store)
+    for doc_id in ids:
+        doc = await store.get_document(doc_id)
+        await reference.create_document(dict(doc, vector=(await store.get_vectors([doc_id]))[doc_id]))
+
+    # Region placement: every "us" document lives on shard 2, and reads by ID go straight there
+    us_ids = {doc_id for i, doc_id in enumerate(ids) if i % 3 == 0}
+    assert us_ids <= set(shards[2]._documents)
+    assert all(store.router.owner(doc_id) == 2 for doc_id in us_ids)
+    assert all(sum(doc_id in shard._documents for shard in shards) == 1 for doc_id in ids)
+
+    for query, category in [("data protection rules", None), ("medical devices", "law")]:
+        expected = await reference.search_documents(query, limit=7, category=category)
+        found = await store.search_documents(query, limit=7, category=category)
+        assert [doc["id"] for doc in found] == [doc["id"] for doc in expected]
+    batch = await store.search_documents_batch([("cyber security", 3, None), ("consumer credit", 4, "law")])
+    assert [len(results) for results in batch] == [3, 4]
+
+    page = await store.list_documents(skip=5, limit=10)
+    newest = await store.list_documents(limit=30)
+    assert [doc["created_at"] for doc in newest] == sorted((doc["created_at"] for doc in newest), reverse=True)
+    assert page == newest[5:15]
+
+    similar = await store.similar_documents([ids[0]], limit=5)
+    assert len(similar[ids[0]]) == 5 and ids[0] not in {doc["id"] for doc in similar[ids[0]]}
+    assert await store.update_document(ids[1], {"content": "rewritten"})
+    assert (await store.get_document(ids[1]))["content"] == "rewritten"
+    assert await store.delete_document(ids[1]) and await store.get_document(ids[1]) is None
+
+
+@pytest.mark.asyncio
+async def test_rebalance_after_adding_a_shard():
+    old_shards = [InMemoryDocumentStore() for _ in range(2)]
+    ids = await add_corpus(make_sharded(old_shards), count=60)
+    grown = make_sharded(old_shards + [InMemoryDocumentStore()])
+    grown.previous_shards = 2
+
+    # Documents now owned by the new shard are still found through the fallback
+    plan = await rebalance(grown, batch_size=7, dry_run=True)
+    assert set(plan["misplaced"]) <= {"0->2", "1->2"} and sum(plan["misplaced"].values()) > 0
+    assert None not in [await grown.get_document(doc_id) for doc_id in ids]
+
+    stats = await rebalance(grown, batch_size=7)
+    assert stats["moved"] == plan["misplaced"]
+    assert await grown.misplaced() == {}
+    assert sum(len(shard._documents) for shard in grown.shards) == len(ids)
+    for doc_id in ids:
+        assert doc_id in grown.shards[grown.router.owner(doc_id)]._documents
+    assert len(await grown.search_documents("data protection", limit=10)) == 10
+
+
+@pytest.mark.asyncio
+async def test_missing_documents_cost_at_most_the_previous_owner():
+    shards = [InMemoryDocumentStore() for _ in range(3)]
+    store = make_sharded(shards)
+    reads = []
+    for index, shard in enumerate(shards):
+        get = shard.get_document
+        shard.get_document = lambda doc_id, index=index, get=get: reads.append(index) or get(doc_id)
+
+    assert await store.get_document("missing") is None
+    assert reads == [store.router.owner("missing")]
+
+    # While a rebalance is pending, a miss also tries the shard the ID hashed to before
+    store.previous_shards = 2
+    moved = next(f"doc-{i}" for i in range(1000) if store.router.owner(f"doc-{i}") == 2)
+    reads.clear()
+    assert await store.get_document(moved) is None
+    assert reads == [2, jump_hash(stable_hash(moved), 2)]
+
+
+@pytest.mark.asyncio
+async def test_move_does_not_lose_writes_made_during_the_copy():
+    old_shards = [InMemoryDocumentStore() for _ in range(2)]
+    await add_corpus(make_sharded(old_shards), count=40)
+    store = make_sharded(old_shards + [InMemoryDocumentStore()])
+    store.previous_shards = 2
+    moves = await store.misplaced()
+    (source, target), doc_ids = next(iter(moves.items()))
+    updated, deleted = doc_ids[0], doc_ids[1]
+    import_documents = store.shards[target].import_documents
+    first = True
+
+    async def racing_import(export):
+        # Writes land on the source while the batch is between export and import
+        nonlocal first
+        if first:
+            first = False
+            assert await store.update_document(updated, {"content": "amended during the move"})
+            assert await store.delete_document(deleted)
+        return await import_documents(export)
+
+    store.shards[target].import_documents = racing_import
+    assert await store.move_documents(source, target, doc_ids) == len(doc_ids) - 1
+    assert (await store.get_document(updated))["content"] == "amended during the move"
+    assert await store.get_document(deleted) is None
+    assert not set(doc_ids) & set(store.shards[source]._documents)
+    assert set(store.shards[target]._documents) == set(doc_ids) - {deleted}
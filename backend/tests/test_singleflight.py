@@ -0,0 +1,118 @@
+"""
+Tests for single-flight coalescing
+"""
+import asyncio
+
+import pytest
+
+from app.core.consistency import require_primary_reads
+from app.core.metrics import COALESCED_CALLS
+from app.core.singleflight import SingleFlight
+from app.database.coalescing import CoalescingDocumentStore
+from app.database.memory import InMemoryDocumentStore
+from benchmarks.fakes import FakeEmbeddingModel
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight("test-shared")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"value": [1]}
+
+    results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+    assert calls == 1
+    assert all(r == {"value": [1]} for r in results)
+    # Each caller owns its copy
+    results[0]["value"].append(2)
+    assert results[1] == {"value": [1]}
+    assert COALESCED_CALLS.value(operation="test-shared", role="follower") == 4
+    assert len(flight) == 0
+
+    # Finished calls are not cached
+    await flight.do("k", work)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_and_cancelled_leader_does_not_fail_followers():
+    flight = SingleFlight("test-errors")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(flight.do("e", fail), flight.do("e", fail), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    leader = asyncio.ensure_future(flight.do("c", slow))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flight.do("c", slow))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == "ok"
+
+
+@pytest.mark.asyncio
+async def test_store_coalesces_search_including_embedding():
+    inner = InMemoryDocumentStore()
+    inner.model = FakeEmbeddingModel()
+    await inner.create_document({"title": "AI Act", "content": "risk"})
+    encodes = 0
+    encode = inner.model.encode
+
+    def counting_encode(texts):
+        nonlocal encodes
+        encodes += 1
+        return encode(texts)
+
+    inner.model.encode = counting_encode
+    store = CoalescingDocumentStore(inner)
+    results = await asyncio.gather(*(store.search_documents("ai act") for _ in range(3)))
+    assert encodes == 1
+    assert all(r[0]["title"] == "AI Act" and "distance" not in r[0] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_reads_after_a_write_do_not_join_older_reads():
+    inner = InMemoryDocumentStore()
+    inner.model = FakeEmbeddingModel()
+    doc_id = await inner.create_document({"title": "AI Act", "content": "draft"})
+    get = inner.get_document
+    reads = 0
+
+    async def slow_get(requested_id):
+        nonlocal reads
+        reads += 1
+        doc = await get(requested_id)
+        await asyncio.sleep(0.02)
+        return doc
+
+    inner.get_document = slow_get
+    store = CoalescingDocumentStore(inner)
+
+    # A read started before the update must not answer the read issued after it
+    before = asyncio.ensure_future(store.get_document(doc_id))
+    await asyncio.sleep(0.005)
+    assert await store.update_document(doc_id, {"content": "adopted"})
+    after = await store.get_document(doc_id)
+    assert (await before)["content"] == "draft" and after["content"] == "adopted"
+
+    # A read that must see the request's writes only joins reads on the primary
+    async def read_your_writes():
+        require_primary_reads()
+        return await store.get_document(doc_id)
+
+    reads = 0
+    plain = asyncio.ensure_future(store.get_document(doc_id))
+    await asyncio.sleep(0.005)
+    await asyncio.gather(plain, asyncio.create_task(read_your_writes()), asyncio.create_task(read_your_writes()))
+    assert reads == 2
@@ -0,0 +1,75 @@
+"""
+Tests for the slow-query log and its admin endpoint
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.slow_queries import SlowQueryLog, is_read_only, redact_params, slow_query_log
+from app.main import app
+
+
+def test_redact_params_hides_text_and_vectors():
+    """Text and embeddings are reduced to their shape; numbers are kept"""
+    redacted = redact_params({"query_vector": [0.1] * 384, "title": "secret", "limit": 10})
+    assert redacted == {"query_vector": "<list len=384>", "title": "<str len=6>", "limit": 10}
+
+
+def test_is_read_only():
+    """Only statements without write keywords are re-run for plans"""
+    assert is_read_only("SELECT id, updated_at FROM documents OFFSET :skip")
+    assert not is_read_only("UPDATE documents SET title = :title")
+    assert not is_read_only("MERGE (d:Document {id: $id}) SET d += $metadata")
+
+
+def test_fast_queries_are_not_recorded():
+    """Statements under the threshold are ignored"""
+    log = SlowQueryLog(threshold_ms=100, explain_sample_rate=1.0)
+    assert log.observe("postgres", "get_document", "SELECT 1", {}, 0.01) is None
+    assert log.recent() == []
+
+
+@pytest.mark.asyncio
+async def test_slow_read_captures_plan_in_background():
+    """A sampled slow read gets its plan attached once capture finishes"""
+    log = SlowQueryLog(threshold_ms=1, explain_sample_rate=1.0)
+
+    async def explain():
+        return {"Plan": {"Node Type": "Index Scan"}}
+
+    entry = log.observe("postgres", "search_documents", "SELECT 1", {"limit": 5}, 0.5, explain)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert entry["plan"] == {"Plan": {"Node Type": "Index Scan"}}
+    assert entry["duration_ms"] == 500.0
+
+
+@pytest.mark.asyncio
+async def test_slow_write_is_not_re_executed():
+    """Write statements are logged without calling the explain function"""
+    log = SlowQueryLog(threshold_ms=1, explain_sample_rate=1.0)
+    called = []
+
+    async def explain():
+        called.append(True)
+
+    log.observe("postgres", "insert_document", "INSERT INTO documents VALUES (:id)", {"id": "x"}, 0.5, explain)
+    await asyncio.sleep(0)
+    assert called == []
+    assert log.recent()[0]["plan"] is None
+
+
+def test_admin_endpoint_lists_recent_entries():
+    """Recent entries are queryable and filterable by engine"""
+    slow_query_log.clear()
+    slow_query_log.entries.append({"engine": "neo4j", "name": "get_related_documents"})
+    slow_query_log.entries.append({"engine": "postgres", "name": "search_documents"})
+
+    client = TestClient(app)
+    response = client.get("/admin/slow-queries?engine=neo4j")
+    assert response.status_code == 200
+    assert [e["name"] for e in response.json()] == ["get_related_documents"]
+
+    assert client.delete("/admin/slow-queries").json() == {"success": True}
+    assert client.get("/admin/slow-queries").json() == []
@@ -0,0 +1,69 @@
+"""
+Tests for request tracing spans
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.tracing import NOOP_SPAN, Tracer, TracingMiddleware, span
+
+
+class MemoryExporter:
+    """Collect exported traces in memory"""
+
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(spans)
+
+
+def test_child_spans_are_noop_without_trace():
+    """Instrumented code outside a sampled trace gets the shared no-op span"""
+    assert span("sql.get_document") is NOOP_SPAN
+
+
+def test_unsampled_trace_is_noop():
+    """A zero sample rate never records traces"""
+    tracer = Tracer(MemoryExporter(), sample_rate=0.0)
+    assert tracer.start_trace("http.request") is NOOP_SPAN
+
+
+def test_nested_spans_share_trace_and_parent():
+    """Spans opened inside a root span are linked through contextvars"""
+    exporter = MemoryExporter()
+    tracer = Tracer(exporter, sample_rate=1.0)
+
+    root = tracer.start_trace("http.request")
+    with root:
+        with span("embedding.encode", batch_size=1):
+            with span("sql.search_documents") as s:
+                s.set_attribute("rows", 3)
+    tracer.finish_trace(root)
+    tracer.shutdown()
+
+    spans = {s["name"]: s for s in exporter.traces[0]}
+    assert spans["sql.search_documents"]["parent_id"] == spans["embedding.encode"]["span_id"]
+    assert spans["embedding.encode"]["parent_id"] == spans["http.request"]["span_id"]
+    assert spans["sql.search_documents"]["attributes"]["rows"] == 3
+    assert len({s["trace_id"] for s in exporter.traces[0]}) == 1
+
+
+def test_middleware_exports_route_span_and_header():
+    """Sampled requests return their trace id and export the route template"""
+    exporter = MemoryExporter()
+    tracer = Tracer(exporter, sample_rate=1.0)
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        with span("lookup"):
+            return {"id": item_id}
+
+    app.add_middleware(TracingMiddleware, tracer_instance=tracer)
+    response = TestClient(app).get("/items/42")
+    tracer.shutdown()
+
+    assert "x-trace-id" in response.headers
+    root = [s for s in exporter.traces[0] if s["parent_id"] is None][0]
+    assert root["attributes"]["route"] == "/items/{item_id}"
+    assert root["attributes"]["status_code"] == 200
@@ -0,0 +1,185 @@
+"""
+Tests for version deltas, chunking and the versioned document store
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.chunking import split_chunks
+from app.core.versioning import apply_delta, diff_texts, make_delta
+from app.database.memory import InMemoryDocumentStore, InMemoryGraphStore
+from app.database.versions import MemoryVersionStore, VersionedDocumentStore
+from app.main import app
+from app.routers.document import get_db, get_graph_db
+from benchmarks.fakes import FakeEmbeddingModel
+
+CONTENT = "\n\n".join(
+    f"Article {i}. The provider shall keep logs. Records are retained for {i} years." for i in range(1, 6)
+)
+
+
+class CountingModel(FakeEmbeddingModel):
+    """Fake model counting the texts it embeds"""
+
+    def __init__(self):
+        super().__init__()
+        self.texts = 0
+
+    def encode(self, texts):
+        self.texts += 1 if isinstance(texts, str) else len(texts)
+        return super().encode(texts)
+
+
+@pytest.fixture
+def store():
+    inner = InMemoryDocumentStore()
+    inner.model = CountingModel()
+    return VersionedDocumentStore(inner, MemoryVersionStore())
+
+
+def test_delta_round_trip_on_random_edits():
+    rng = random.Random(3)
+    sentences = [f"Sentence {i} about data protection." for i in range(200)]
+    for _ in range(20):
+        edited = list(sentences)
+        for _ in range(rng.randint(1, 5)):
+            position = rng.randrange(len(edited))
+            rng.choice([lambda: edited.pop(position), lambda: edited.insert(position, "New clause."),
+                        lambda: edited.__setitem__(position, "Amended clause.")])()
+        base, target = " ".join(edited), " ".join(sentences)
+        delta = make_delta(base, target)
+        assert apply_delta(base, delta) == target
+        assert len(delta) < len(target) / 10
+
+
+def test_split_chunks_keeps_unchanged_paragraphs_identical():
+    amended = CONTENT.replace("retained for 3 years", "retained for 5 years")
+    before, after = split_chunks(CONTENT), split_chunks(amended)
+    assert len(before) == 5 and sum(a != b for a, b in zip(before, after)) == 1
+    assert all(len(chunk) <= 40 for chunk in split_chunks("One. Two two. " * 20, max_chars=40))
+
+
+@pytest.mark.asyncio
+async def test_update_only_embeds_changed_chunks_and_keeps_history(store):
+    model = store.model
+    doc_id = await store.create_document({"title": "AI Act", "content": CONTENT, "category": "legal"})
+    assert model.texts == 6  # title + 5 paragraphs
+
+    amended = CONTENT.replace("retained for 3 years", "retained for 5 years")
+    assert await store.update_document(doc_id, {"content": amended})
+    assert model.texts == 7
+    assert await store.update_document(doc_id, {"tags": ["EU"]})
+    assert model.texts == 7
+
+    history = await store.document_versions(doc_id)
+    assert [v["version"] for v in history] == [3, 2, 1]
+    assert history[2]["stored_bytes"] < history[2]["content_bytes"] / 4
+    assert (await store.get_document_version(doc_id, 1))["content"] == CONTENT
+    assert (await store.get_document_version(doc_id, 3))["tags"] == ["EU"]
+    assert await store.get_document_version(doc_id, 4) is None
+
+    diff = await store.diff_versions(doc_id, 1, 3)
+    assert diff["added"] == 1 and diff["removed"] == 1
+    assert "+Records are retained for 5 years." in diff["diff"]
+
+    changes = await store.changed_since(datetime.now() - timedelta(minutes=1))
+    assert [(c["doc_id"], c["version"]) for c in changes] == [(doc_id, 2), (doc_id, 1)]
+
+    assert await store.delete_document(doc_id)
+    assert await store.document_versions(doc_id) is None
+
+
+def test_version_endpoints(store):
+    app.dependency_overrides[get_db] = lambda: store
+    try:
+        client = TestClient(app)
+        doc_id = asyncio.run(store.create_document({"title": "AI Act", "content": CONTENT}))
+        asyncio.run(store.update_document(doc_id, {"content": CONTENT + "\n\nArticle 6. New article."}))
+
+        versions = client.get(f"/documents/{doc_id}/versions").json()
+        assert [v["version"] for v in versions] == [2, 1]
+        assert client.get(f"/documents/{doc_id}/versions/1").json()["content"] == CONTENT
+        diff = client.get(f"/documents/{doc_id}/diff").json()
+        assert diff["from_version"] == 1 and diff["to_version"] == 2 and diff["added"] == 2
+        assert client.get(f"/documents/{doc_id}/diff?from_version=9").status_code == 404
+        assert len(client.get("/documents/changes", params={"since": "2000-01-01T00:00:00"}).json()) == 1
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_diff_texts_counts_sentences():
+    result = diff_texts("A. B. C.", "A. C. D.")
+    assert (result["added"], result["removed"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_keep_a_consistent_history(store):
+    doc_id = await store.create_document({"title": "AI Act", "content": CONTENT})
+    get = store.store.get_document
+
+    async def slow_get(requested_id):
+        doc = await get(requested_id)
+        await asyncio.sleep(0.001)
+        return doc
+
+    # Every update reads the same version before any of them writes
+    store.store.get_document = slow_get
+    texts = [CONTENT + f"\n\nArticle {6 + i}. Amendment {i}." for i in range(5)]
+    assert all(await asyncio.gather(*(store.update_document(doc_id, {"content": t}) for t in texts)))
+
+    history = await store.document_versions(doc_id)
+    assert [v["version"] for v in history] == [6, 5, 4, 3, 2, 1]
+    rebuilt = [(await store.get_document_version(doc_id, v))["content"] for v in range(1, 7)]
+    assert rebuilt[0] == CONTENT and sorted(rebuilt[1:]) == sorted(texts)
+
+
+@pytest.mark.asyncio
+async def test_embed_chunks_job_re_embeds_documents_stored_before_versioning(store):
+    from app.jobs.embed_chunks import embed_chunks
+
+    legacy = await store.store.create_document({"title": "GDPR", "content": CONTENT})
+    chunked = await store.create_document({"title": "AI Act", "content": CONTENT})
+    legacy_vector = (await store.get_vectors([legacy]))[legacy]
+
+    stats = await embed_chunks(store, page_size=1)
+    assert (stats["documents"], stats["embedded"], stats["skipped"]) == (2, 1, 1)
+    vectors = await store.get_vectors([legacy, chunked])
+    expected, _ = await store.embed_chunks("GDPR", CONTENT)
+    assert vectors[legacy] != legacy_vector
+    assert vectors[legacy] == pytest.approx(expected, abs=1e-6)
+    assert len(await store.versions.get_chunks(legacy)) == 6
+    assert (await embed_chunks(store))["embedded"] == 0
+
+
+def test_lancedb_backend_refuses_versioning(monkeypatch):
+    from app.core.config import settings
+    from app.database import factory
+
+    monkeypatch.setattr(settings, "vector_backend", "lancedb")
+    with pytest.raises(ValueError, match="VERSIONING_ENABLED"):
+        factory.create_version_store(InMemoryDocumentStore())
+
+    monkeypatch.setattr(settings, "vector_backend", "memory")
+    assert isinstance(factory.create_version_store(InMemoryDocumentStore()), MemoryVersionStore)
+
+
+def test_update_of_a_document_deleted_meanwhile_is_a_404(store):
+    update_document = store.update_document
+
+    async def update_then_lose(doc_id, update_data):
+        updated = await update_document(doc_id, update_data)
+        await store.delete_document(doc_id)
+        return updated
+
+    store.update_document = update_then_lose
+    app.dependency_overrides[get_db] = lambda: store
+    app.dependency_overrides[get_graph_db] = lambda: InMemoryGraphStore()
+    try:
+        doc_id = asyncio.run(store.create_document({"title": "AI Act", "content": CONTENT}))
+        response = TestClient(app).put(f"/documents/{doc_id}", json={"content": "Repealed."})
+        assert response.status_code == 404
+    finally:
+        app.dependency_overrides.clear()